@@ -1,5 +1,6 @@
 #!/usr/bin/python3
 import os
+import sys
 from dotenv import load_dotenv
 from langchain import hub
 from langchain.agents import AgentExecutor, create_react_agent
@@ -12,6 +13,10 @@ from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain.chains import create_history_aware_retriever, create_retrieval_chain
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
+# Shared RAG helpers
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "RAG"))
+from rerank import CrossEncoderReranker, RerankingRetriever
+
 # Load environment variables
 load_dotenv()
 api_key = os.getenv("GITHUB_TOKEN")
@@ -47,6 +52,16 @@ retriever = db.as_retriever(
     }
 )
 
+# RERANK=1 rescores up to 20 candidates with a cross-encoder and keeps the best 3,
+# fetching fewer when that would take longer than RERANK_BUDGET_MS
+if os.getenv("RERANK") == "1":
+    retriever = RerankingRetriever(
+        base_retriever=retriever,
+        reranker=CrossEncoderReranker(),
+        k=3,
+        latency_budget_ms=float(os.getenv("RERANK_BUDGET_MS", "200"))
+    )
+
 # Create the LangChain chat model
 model = ChatOpenAI(
     model="gpt-4o",
@@ -1,5 +1,6 @@
 #!/usr/bin/python3
 import os
+import sys
 from dotenv import load_dotenv
 from langchain import hub
 from langchain.agents import AgentExecutor, create_react_agent
@@ -13,6 +14,15 @@ from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain.chains import create_history_aware_retriever, create_retrieval_chain
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
+# Shared RAG helpers live next to the book pipelines
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "RAG"))
+from bm25_index import BM25Index, chroma_bm25_dir, has_bm25
+from chroma_hnsw import hnsw_metadata
+from embedding_daemon import daemon_or_local
+from hybrid_retriever import HybridRetriever
+from query_cache import QueryCachedEmbeddings
+from rerank import CrossEncoderReranker, RerankingRetriever
+
 # Load environment variables
 load_dotenv()
 
@@ -23,30 +33,47 @@ persistent_directory = os.path.join(current_dir, "chroma_db")
 # Check if the chroma vector store already exists
 if os.path.exists(persistent_directory):
     print("[+] Loading existing vector store...")
-    embeddings = HuggingFaceEmbeddings(
+    # Use the embedding daemon when one is running instead of loading the model here,
+    # and reuse the vector of any question that has been asked before
+    embeddings = QueryCachedEmbeddings(daemon_or_local(lambda: HuggingFaceEmbeddings(
         model_name="all-MiniLM-L6-v2",
         model_kwargs={'device': 'cpu'},
         encode_kwargs={'normalize_embeddings': True}
-    )
+    ), "all-MiniLM-L6-v2", normalize_embeddings=True), path=os.path.join(current_dir, "query_embeddings.json"))
     db = Chroma(
         persist_directory=persistent_directory,
         embedding_function=embeddings,
         collection_name="cv_collection",
-        collection_metadata={"hnsw:space": "cosine"}
+        collection_metadata=hnsw_metadata("cosine")
     )
 else:
     raise FileNotFoundError(
         f"[-] The directory {persistent_directory} does not exist!!"
     )
 
-# Create a retriever to query the vector store
-retriever = db.as_retriever(
-    search_type="similarity",
-    search_kwargs={
-        "k": 3,
-        "score_threshold": 0.5
-    }
-)
+# Create a retriever to query the vector store, fused with keyword search when
+# meta_cv_rag.py has written the BM25 index
+bm25_path = chroma_bm25_dir(persistent_directory, "cv_collection")
+if has_bm25(bm25_path):
+    retriever = HybridRetriever(vectorstore=db, bm25=BM25Index(bm25_path), k=3)
+else:
+    retriever = db.as_retriever(
+        search_type="similarity",
+        search_kwargs={
+            "k": 3,
+            "score_threshold": 0.5
+        }
+    )
+
+# RERANK=1 rescores up to 20 candidates with a cross-encoder and keeps the best 3,
+# fetching fewer when that would take longer than RERANK_BUDGET_MS
+if os.getenv("RERANK") == "1":
+    retriever = RerankingRetriever(
+        base_retriever=retriever,
+        reranker=CrossEncoderReranker(cache_folder=os.path.join(current_dir, "embedding_cache")),
+        k=3,
+        latency_budget_ms=float(os.getenv("RERANK_BUDGET_MS", "200"))
+    )
 
 # Choose either Groq or Ollama - uncomment your preferred option
 
@@ -150,6 +177,7 @@ while True:
     try:
         query = input("You>> ").strip()
         if query.lower() == "exit":
+            print(f"Query embedding cache: {embeddings.hits} hits, {embeddings.misses} misses")
             break
             
         print("-"*50)
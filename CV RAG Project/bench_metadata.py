@@ -0,0 +1,124 @@
+#!/usr/bin/python3
+"""Micro-benchmark for candidate metadata extraction.
+
+Compares the single-pass extractor in cv_metadata.py against the original
+multi-regex implementation on the PDFs in cvs/ and on a synthetic corpus.
+
+    python bench_metadata.py --synthetic 10000 --repeat 3
+"""
+import argparse
+import os
+import random
+import re
+import time
+
+from langchain_community.document_loaders import PyPDFLoader
+
+from cv_metadata import extract_candidate_info
+
+
+def legacy_extract_candidate_info(text, filename):
+    """The original implementation: six regexes, recompiled on every call"""
+    info = {"source": filename}
+
+    name_patterns = [
+        r"Name:\s*(.+)",
+        r"Resume\s*of\s*(.+)",
+        r"Personal\s*Details[\s\S]*?Name[^a-zA-Z0-9]*([a-zA-Z ]+)",
+        r"^([A-Z][a-z]+ [A-Z][a-z]+)$"
+    ]
+
+    for pattern in name_patterns:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            info["candidate_name"] = match.group(1).strip()
+            break
+
+    skills_match = re.search(r"Skills:([\s\S]+?)(?=\n\n|\Z)", text, re.IGNORECASE)
+    if skills_match:
+        info["skills"] = skills_match.group(1).strip()
+
+    certs_match = re.search(r"Certifications:([\s\S]+?)(?=\n\n|\Z)", text, re.IGNORECASE)
+    if certs_match:
+        info["certifications"] = certs_match.group(1).strip()
+
+    return info
+
+
+FIRST_NAMES = ["Allan", "John", "Mark", "Grace", "Amina", "Peter", "Wanjiru", "Brian", "Faith", "Kevin"]
+LAST_NAMES = ["Mbugua", "Kimotho", "Gitonga", "Otieno", "Njeri", "Mwangi", "Achieng", "Kariuki"]
+SKILLS = ["Python", "Django", "MySQL", "Linux", "Bash", "CCNA", "Hashcat", "Burp Suite",
+          "Power BI", "Flask", "JavaScript", "Penetration Testing", "Network Design"]
+FILLER = ("Provided first level support of network troubleshooting on laptops, desktops "
+          "and printers. Installed and configured operating systems and application software.")
+
+
+def synthetic_cv(rng):
+    """Generate one CV-shaped text with the sections real CVs in cvs/ have"""
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    header = name.upper() if rng.random() < 0.5 else name
+    lines = [f"{header}   Contact: +2547{rng.randrange(10**7, 10**8)}", "EXPERIENCE"]
+    for _ in range(rng.randint(2, 6)):
+        lines.append(f"ICT Support Intern   Jan {rng.randint(2015, 2024)}")
+        lines.extend([FILLER] * rng.randint(1, 4))
+    lines += ["", "EDUCATION", "Jomo Kenyatta University of Agriculture and Technology",
+              "BSc Information Technology", "CERTIFICATIONS"]
+    lines += [f"Certified {rng.choice(SKILLS)} Analyst" for _ in range(rng.randint(1, 4))]
+    lines += ["PROJECTS"] + [FILLER] * rng.randint(1, 5)
+    lines += ["SKILLS AND TECHNOLOGIES",
+              "Technical skills: " + ", ".join(rng.sample(SKILLS, rng.randint(3, 8))),
+              "Soft skills: Communication, Teamwork"]
+    return "\n".join(lines)
+
+
+def load_cv_texts(pdfs_dir):
+    texts = []
+    for filename in sorted(os.listdir(pdfs_dir)):
+        if filename.endswith(".pdf"):
+            pages = PyPDFLoader(os.path.join(pdfs_dir, filename)).load()
+            texts.append((filename, "\n".join(p.page_content for p in pages)))
+    return texts
+
+
+def time_extractor(extract, corpus, repeat):
+    """Best-of-repeat wall time for running extract over the whole corpus"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for filename, text in corpus:
+            extract(text, filename)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def report(label, corpus, repeat):
+    if not corpus:
+        print(f"{label}: no CVs")
+        return
+    chars = sum(len(text) for _, text in corpus)
+    legacy = time_extractor(legacy_extract_candidate_info, corpus, repeat)
+    single = time_extractor(extract_candidate_info, corpus, repeat)
+    names = sum("candidate_name" in extract_candidate_info(t, f) for f, t in corpus)
+    print(f"{label}: {len(corpus)} CVs, {chars / 1e6:.1f}M chars")
+    print(f"  legacy      {legacy * 1000:9.1f} ms  {len(corpus) / legacy:10.0f} CVs/s")
+    print(f"  single-pass {single * 1000:9.1f} ms  {len(corpus) / single:10.0f} CVs/s"
+          f"  ({legacy / single:.2f}x, names found {names}/{len(corpus)})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CV metadata extraction")
+    parser.add_argument("--synthetic", type=int, default=10000, help="number of synthetic CVs")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement (best is kept)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    report("cvs/", load_cv_texts(os.path.join(current_dir, "cvs")), args.repeat)
+
+    rng = random.Random(args.seed)
+    synthetic = [(f"synthetic_{i}.pdf", synthetic_cv(rng)) for i in range(args.synthetic)]
+    report("synthetic", synthetic, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/python3
+"""Benchmark for the int8 ONNX embedding backend against HuggingFaceEmbeddings.
+
+Each backend runs in its own subprocess, so startup time and peak RSS are
+measured from a clean interpreter. Reported per backend:
+
+- load: seconds to import the backend and load the model;
+- query latency: p50/p95 of single embed_query calls (the per-turn hot path);
+- throughput: chunks/s embedding every chunk stored in faiss_index;
+- peak RSS in MB.
+
+--check also compares the ONNX vectors of every faiss_index chunk with the
+fp32 vectors stored in the index and fails below MIN_COSINE_SIMILARITY.
+
+    python bench_onnx_embeddings.py --queries 200 --check
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(current_dir), "RAG"))
+
+CACHE_FOLDER = os.path.join(current_dir, "embedding_cache")
+INDEX_DIR = os.path.join(current_dir, "faiss_index")
+QUERIES = [
+    "who has a CCNA certification?",
+    "which candidate knows Django?",
+    "computer science degree",
+    "experience with penetration testing",
+    "what does Mark Gitonga know about cloud security?",
+]
+
+
+def load_backend(backend):
+    if backend == "onnx":
+        from onnx_embeddings import OnnxMiniLMEmbeddings
+        return OnnxMiniLMEmbeddings(cache_folder=CACHE_FOLDER)
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(
+        model_name="all-MiniLM-L6-v2",
+        model_kwargs={'device': 'cpu'},
+        encode_kwargs={'normalize_embeddings': True},
+        cache_folder=CACHE_FOLDER
+    )
+
+
+def load_index(embeddings):
+    """Return (texts, stored vectors) for every chunk in faiss_index"""
+    from faiss_index import load_faiss
+
+    vectorstore = load_faiss(INDEX_DIR, embeddings)
+    vectors = vectorstore.index.reconstruct_n(0, vectorstore.index.ntotal)
+    texts = [vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]).page_content
+             for i in range(vectorstore.index.ntotal)]
+    return texts, vectors
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+def run_worker(backend, num_queries):
+    """Measure one backend in this process and print the results as JSON"""
+    started = time.perf_counter()
+    embeddings = load_backend(backend)
+    embeddings.embed_query("warm up")
+    load_time = time.perf_counter() - started
+
+    latencies = []
+    for i in range(num_queries):
+        start = time.perf_counter()
+        embeddings.embed_query(QUERIES[i % len(QUERIES)])
+        latencies.append(time.perf_counter() - start)
+
+    texts, _ = load_index(embeddings)
+    start = time.perf_counter()
+    embeddings.embed_documents(texts)
+    throughput = len(texts) / (time.perf_counter() - start)
+
+    print(json.dumps({
+        "backend": backend,
+        "load_s": load_time,
+        "query_p50_ms": percentile(latencies, 50) * 1000,
+        "query_p95_ms": percentile(latencies, 95) * 1000,
+        "chunks_per_s": throughput,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def check_tolerance():
+    """Compare ONNX vectors with the fp32 vectors stored in faiss_index"""
+    import numpy as np
+    from onnx_embeddings import MIN_COSINE_SIMILARITY, OnnxMiniLMEmbeddings
+
+    embeddings = OnnxMiniLMEmbeddings(cache_folder=CACHE_FOLDER)
+    texts, stored = load_index(embeddings)
+    vectors = embeddings.encode(texts)
+    stored = stored / np.linalg.norm(stored, axis=1, keepdims=True)
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    similarity = (stored * vectors).sum(axis=1)
+    print(f"Cosine similarity to faiss_index vectors over {len(texts)} chunks: "
+          f"min {similarity.min():.4f}, mean {similarity.mean():.4f} "
+          f"(tolerance {MIN_COSINE_SIMILARITY})")
+    return bool(similarity.min() >= MIN_COSINE_SIMILARITY)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ONNX int8 vs PyTorch embeddings")
+    parser.add_argument("--backends", default="torch,onnx", help="comma-separated: torch, onnx")
+    parser.add_argument("--queries", type=int, default=200, help="single-query calls to time")
+    parser.add_argument("--check", action="store_true", help="check ONNX vectors against faiss_index")
+    parser.add_argument("--worker", choices=["torch", "onnx"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.queries)
+        return
+
+    print(f"{'backend':8} {'load s':>8} {'p50 ms':>8} {'p95 ms':>8} {'chunks/s':>10} {'RSS MB':>8}")
+    for backend in args.backends.split(","):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", backend, "--queries", str(args.queries)],
+            capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{backend:8} {result['load_s']:8.2f} {result['query_p50_ms']:8.2f} "
+              f"{result['query_p95_ms']:8.2f} {result['chunks_per_s']:10.1f} {result['peak_rss_mb']:8.0f}")
+
+    if args.check and not check_tolerance():
+        sys.exit("ONNX vectors are outside the documented tolerance")
+
+
+if __name__ == "__main__":
+    main()
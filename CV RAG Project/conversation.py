@@ -1,7 +1,7 @@
 #!/usr/bin/python3
 import os
+import sys
 from dotenv import load_dotenv
-from langchain_community.vectorstores import FAISS
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain.chains import RetrievalQA
 from langchain_groq import ChatGroq
@@ -24,31 +24,78 @@ CV_PROMPT = PromptTemplate(
     Answer:"""
 )
 
-embeddings = HuggingFaceEmbeddings(
-    model_name="all-MiniLM-L6-v2",
-    model_kwargs={'device': 'cpu'},
-    encode_kwargs={'normalize_embeddings': True},
-    cache_folder="./embedding_cache"
+# Shared RAG helpers live next to the book pipelines
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "RAG"))
+from embedding_daemon import daemon_or_local
+from query_cache import QueryCachedEmbeddings
+from faiss_index import index_version, load_faiss
+from answer_cache import SemanticAnswerCache
+from filtered_search import filtered_search
+from bm25_index import BM25_DIR, BM25Index, has_bm25
+from hybrid_retriever import hybrid_search
+from name_matcher import NameMatcher
+
+# EMBEDDINGS_BACKEND=onnx encodes queries with the int8 ONNX graph instead of PyTorch
+USE_ONNX = os.getenv("EMBEDDINGS_BACKEND") == "onnx"
+EMBEDDING_MODEL = "all-MiniLM-L6-v2-onnx-int8" if USE_ONNX else "all-MiniLM-L6-v2"
+
+def load_embeddings():
+    if USE_ONNX:
+        from onnx_embeddings import OnnxMiniLMEmbeddings
+        return OnnxMiniLMEmbeddings(cache_folder="./embedding_cache")
+    return HuggingFaceEmbeddings(
+        model_name="all-MiniLM-L6-v2",
+        model_kwargs={'device': 'cpu'},
+        encode_kwargs={'normalize_embeddings': True},
+        cache_folder="./embedding_cache"
+    )
+
+# Use the embedding daemon when one is running instead of loading the model here,
+# and reuse the vector of any question that has been asked before
+embeddings = QueryCachedEmbeddings(
+    daemon_or_local(load_embeddings, EMBEDDING_MODEL, normalize_embeddings=True),
+    path="./query_embeddings.json"
 )
 
-vectorstore = FAISS.load_local("faiss_index", embeddings, allow_dangerous_deserialization=True)
+def load_index():
+    """(Re)open faiss_index with its keyword index and name matcher"""
+    global vectorstore, bm25, name_matcher, loaded_version
+    # Read before loading: a save that lands mid-load then triggers another reload
+    loaded_version = index_version("faiss_index")
+    # Reads flat, IVF, PQ, HNSW and scalar-quantized indexes alike
+    vectorstore = load_faiss("faiss_index", embeddings)
+    # Keyword index written next to the vectors by save_faiss
+    bm25_path = os.path.join("faiss_index", BM25_DIR)
+    bm25 = BM25Index(bm25_path) if has_bm25(bm25_path) else None
+    # Candidate names are compiled once, so spotting one in a question doesn't scan the corpus
+    name_matcher = NameMatcher.from_docstore(vectorstore.docstore)
+
+def reload_if_changed():
+    """Pick up a faiss_index rewritten by create_vector.py since it was loaded"""
+    if index_version("faiss_index") != loaded_version:
+        print("[+] faiss_index changed on disk, reloading it")
+        load_index()
+
+load_index()
+# A rephrased question that retrieves the same chunks reuses the earlier answer;
+# the cache follows the loaded index, so it empties itself when that is reloaded
+answer_cache = SemanticAnswerCache(
+    threshold=float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95")),
+    ttl=float(os.getenv("ANSWER_CACHE_TTL", "3600")),
+    version=lambda: loaded_version
+)
 
 def get_relevant_documents(query):
     """Improved document retrieval with name filtering"""
     # Check if query mentions a specific name
-    name_matches = []
-    for doc in vectorstore.docstore._dict.values():
-        if "candidate_name" in doc.metadata:
-            if doc.metadata["candidate_name"].lower() in query.lower():
-                name_matches.append(doc.metadata["source"])
+    name_matches = name_matcher.match(query)
     
     if name_matches:
         # If name found, only search that person's documents
-        return vectorstore.similarity_search(
-            query,
-            k=3,
-            filter=lambda doc: doc.metadata["source"] in name_matches
-        )
+        return [doc for doc, _ in filtered_search(vectorstore, query, {"source": sorted(name_matches)}, k=3)]
+    elif bm25 is not None:
+        # General search, with exact skill and certification terms counted too
+        return [doc for doc, _ in hybrid_search(vectorstore, bm25, query, k=3)]
     else:
         # General search
         return vectorstore.similarity_search(query, k=3)
@@ -60,33 +107,48 @@ llm = ChatGroq(
 )
 
 def ask_question(query):
+    reload_if_changed()
     docs = get_relevant_documents(query)
-    
-    # Create context string
-    context = "\n\n".join([
-        f"Document {i+1} ({doc.metadata.get('source', 'Unknown')} - {doc.metadata.get('candidate_name', 'Unknown')}):\n{doc.page_content}"
-        for i, doc in enumerate(docs)
-    ])
-    
-    # Generate answer
-    result = llm.invoke(CV_PROMPT.format(context=context, question=query))
-    
+    # Already computed (and cached) by the retrieval above
+    query_vector = embeddings.embed_query(query)
+    chunk_ids = [doc.id or doc.page_content for doc in docs]
+
+    cached = answer_cache.lookup(query_vector, chunk_ids)
+    if cached is not None:
+        answer, sources = cached
+    else:
+        # Create context string
+        context = "\n\n".join([
+            f"Document {i+1} ({doc.metadata.get('source', 'Unknown')} - {doc.metadata.get('candidate_name', 'Unknown')}):\n{doc.page_content}"
+            for i, doc in enumerate(docs)
+        ])
+
+        # Generate answer
+        answer = llm.invoke(CV_PROMPT.format(context=context, question=query)).content
+
+        sources = []
+        for doc in docs:
+            source = doc.metadata.get("source", "Unknown")
+            if source not in [s for s, _ in sources]:
+                sources.append((source, doc.metadata.get('candidate_name', 'Unknown')))
+        answer_cache.store(query_vector, chunk_ids, answer, sources)
+
     print("\nQuestion:", query)
-    print("Answer:", textwrap.fill(result.content, width=80))
-    
+    print("Answer:", textwrap.fill(answer, width=80))
+    if cached is not None:
+        print("(cached answer)")
+
     print("\nSources:")
-    seen_sources = set()
-    for doc in docs:
-        source = doc.metadata.get("source", "Unknown")
-        if source not in seen_sources:
-            print(f"- {source} ({doc.metadata.get('candidate_name', 'Unknown')})")
-            seen_sources.add(source)
+    for source, candidate_name in sources:
+        print(f"- {source} ({candidate_name})")
 
 if __name__ == "__main__":
     print("CV Query System - Type 'quit' to exit")
     while True:
         query = input("\nEnter question: ").strip()
         if query.lower() == 'quit':
+            print(f"Query embedding cache: {embeddings.hits} hits, {embeddings.misses} misses")
+            print(f"Answer cache: {answer_cache.hits} hits, {answer_cache.misses} misses")
             break
         ask_question(query)
 
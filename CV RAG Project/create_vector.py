@@ -1,82 +1,195 @@
 #!/usr/bin/python3
 import os
-import re
+import sys
+import uuid
+import argparse
 from dotenv import load_dotenv
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
 from langchain_community.embeddings import HuggingFaceEmbeddings
+from ingest_pipeline import run_pipeline
+from cv_metadata import extract_candidate_info
+from index_manifest import diff_manifest, file_sha256, load_manifest, save_manifest
+
+# Shared RAG helpers live next to the book pipelines
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(current_dir), "RAG"))
+from chunk_dedup import dedup_documents
+from vector_cache import CachedEmbeddings
+from adaptive_batching import BucketedEmbeddings
+from token_splitter import MiniLMTokenSplitter
+from faiss_index import (INDEX_TYPES, compress_vectorstore, flatten_vectorstore,
+                         load_faiss, load_index_params, save_faiss)
 
 load_dotenv()
 
-def extract_candidate_info(text, filename):
-    """Enhanced information extraction from CV text"""
-    info = {"source": filename}
-    
-    # Name extraction with multiple patterns
-    name_patterns = [
-        r"Name:\s*(.+)",
-        r"Resume\s*of\s*(.+)",
-        r"Personal\s*Details[\s\S]*?Name[^a-zA-Z0-9]*([a-zA-Z ]+)",
-        r"^([A-Z][a-z]+ [A-Z][a-z]+)$"
-    ]
-    
-    for pattern in name_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            info["candidate_name"] = match.group(1).strip()
-            break
-    
-    # Extract skills section
-    skills_match = re.search(r"Skills:([\s\S]+?)(?=\n\n|\Z)", text, re.IGNORECASE)
-    if skills_match:
-        info["skills"] = skills_match.group(1).strip()
-    
-    # Extract certifications section
-    certs_match = re.search(r"Certifications:([\s\S]+?)(?=\n\n|\Z)", text, re.IGNORECASE)
-    if certs_match:
-        info["certifications"] = certs_match.group(1).strip()
-    
+def attach_candidate_info(pages, filename):
+    """Extract candidate metadata from a CV's pages and attach it to each page"""
+    full_text = "\n".join([p.page_content for p in pages])
+
+    # Extract and add metadata
+    info = extract_candidate_info(full_text, filename)
+    for page in pages:
+        page.metadata.update(info)
+        # Add candidate name to page content for better retrieval
+        if "candidate_name" in info:
+            page.page_content = f"Candidate: {info['candidate_name']}\n{page.page_content}"
+
+    print(f"Processed {filename} - Name: {info.get('candidate_name', 'Not found')}")
     return info
 
-current_dir = os.path.dirname(os.path.abspath(__file__))
-pdfs_dir = os.path.join(current_dir, "cvs")
-
-documents = []
-
-for file_path in [os.path.join(pdfs_dir, f) for f in os.listdir(pdfs_dir) if f.endswith('.pdf')]:
-    try:
-        loader = PyPDFLoader(file_path)
-        pages = loader.load()
-        full_text = "\n".join([p.page_content for p in pages])
-        
-        # Extract and add metadata
-        info = extract_candidate_info(full_text, os.path.basename(file_path))
-        for page in pages:
-            page.metadata.update(info)
-            # Add candidate name to page content for better retrieval
-            if "candidate_name" in info:
-                page.page_content = f"Candidate: {info['candidate_name']}\n{page.page_content}"
-        
-        documents.extend(pages)
-        print(f"Processed {os.path.basename(file_path)} - Name: {info.get('candidate_name', 'Not found')}")
-    except Exception as e:
-        print(f"Error processing {os.path.basename(file_path)}: {str(e)}")
-
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=1000,
-    chunk_overlap=200,
-    add_start_index=True
-)
-
-texts = text_splitter.split_documents(documents)
-
-embeddings = HuggingFaceEmbeddings(
-    model_name="all-MiniLM-L6-v2",
-    model_kwargs={'device': 'cpu'},
-    encode_kwargs={'normalize_embeddings': True}
-)
-
-vectorstore = FAISS.from_documents(texts, embeddings)
-vectorstore.save_local("faiss_index")
-print("Vector store created with enhanced metadata")
\ No newline at end of file
+def dedup_chunks(chunks):
+    """Drop duplicate chunks of one CV before they are embedded"""
+    kept, stats = dedup_documents(chunks)
+    if stats["exact"] or stats["near"]:
+        print(f"Dropped {stats['exact']} exact and {stats['near']} near-duplicate chunks")
+    return kept
+
+def build_serial(file_paths, text_splitter, embeddings, vectorstore=None, dedup=True):
+    """Load, split and embed every CV one after the other.
+
+    Duplicates are only dropped within a CV, so deleting one CV from the index
+    never removes text that another CV still relies on.
+    Returns (vectorstore, {filename: [docstore ids]}).
+    """
+    texts = []
+    file_ids = {}
+
+    for file_path in file_paths:
+        try:
+            loader = PyPDFLoader(file_path)
+            pages = loader.load()
+            attach_candidate_info(pages, os.path.basename(file_path))
+            chunks = text_splitter.split_documents(pages)
+            texts.extend(dedup_chunks(chunks) if dedup else chunks)
+            file_ids[os.path.basename(file_path)] = []
+        except Exception as e:
+            print(f"Error processing {os.path.basename(file_path)}: {str(e)}")
+
+    if not texts:
+        return vectorstore, file_ids
+
+    ids = [str(uuid.uuid4()) for _ in texts]
+    for doc_id, text in zip(ids, texts):
+        file_ids.setdefault(text.metadata["source"], []).append(doc_id)
+
+    if vectorstore is None:
+        vectorstore = FAISS.from_documents(texts, embeddings, ids=ids)
+    else:
+        vectorstore.add_documents(texts, ids=ids)
+    return vectorstore, file_ids
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the CV FAISS index")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="overlap parsing, splitting, embedding and index writes")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="PDF parser processes for --pipeline (default: CPUs - 1)")
+    parser.add_argument("--queue-size", type=int, default=4,
+                        help="bound on each inter-stage queue for --pipeline")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="ignore the manifest and re-embed every CV")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="embed duplicate and near-duplicate chunks too")
+    parser.add_argument("--token-chunks", action="store_true",
+                        help="size chunks in model tokens so none exceed MiniLM's 256-token window")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default=None,
+                        help="FAISS index to build (default: keep the current one, flat for a new index)")
+    args = parser.parse_args()
+
+    pdfs_dir = os.path.join(current_dir, "cvs")
+    file_paths = [os.path.join(pdfs_dir, f) for f in os.listdir(pdfs_dir) if f.endswith('.pdf')]
+    index_dir = "faiss_index"
+
+    if args.token_chunks:
+        text_splitter = MiniLMTokenSplitter(overlap_tokens=50,
+                                            cache_folder=os.path.join(current_dir, "embedding_cache"))
+        chunk_size, chunk_overlap = text_splitter.chunk_tokens, text_splitter.overlap_tokens
+    else:
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=1000,
+            chunk_overlap=200,
+            add_start_index=True
+        )
+        chunk_size, chunk_overlap = 1000, 200
+
+    # Reuse vectors already computed by any other store builder; cache misses
+    # are embedded in length buckets with a calibrated batch size
+    embeddings = CachedEmbeddings(BucketedEmbeddings(HuggingFaceEmbeddings(
+        model_name="all-MiniLM-L6-v2",
+        model_kwargs={'device': 'cpu'},
+        encode_kwargs={'normalize_embeddings': True}
+    )))
+
+    # Anything that changes the vectors of unchanged files invalidates the manifest
+    settings = {
+        "model_name": embeddings.model_name,
+        "normalize_embeddings": embeddings.normalize,
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+        "dedup": not args.no_dedup,
+    }
+    if args.token_chunks:
+        settings["chunk_unit"] = "tokens"
+    hashes = {os.path.basename(path): file_sha256(path) for path in file_paths}
+
+    manifest = None if args.rebuild else load_manifest(index_dir)
+    if manifest is not None and (manifest.get("settings") != settings
+                                 or not os.path.exists(os.path.join(index_dir, "index.faiss"))):
+        print("[+] Index settings changed or index missing, rebuilding from scratch")
+        manifest = None
+
+    current_type = load_index_params(index_dir).get("index_type", "flat")
+    index_type = args.index_type or current_type
+
+    vectorstore = None
+    indexed = {}
+    to_index = file_paths
+    if manifest is not None:
+        added, changed, removed, unchanged = diff_manifest(manifest, hashes)
+        print(f"[+] {len(added)} new, {len(changed)} changed, {len(removed)} removed, "
+              f"{len(unchanged)} unchanged CVs")
+        if not (added or changed or removed) and index_type == current_type:
+            print("Vector store is up to date")
+            return
+
+        vectorstore = load_faiss(index_dir, embeddings, editable=True)
+        if current_type != "flat":
+            # Trained and graph indexes can't be edited in place; work on exact vectors
+            flatten_vectorstore(vectorstore, embeddings)
+        stale_ids = [doc_id for name in changed + removed for doc_id in manifest["files"][name]["ids"]]
+        if stale_ids:
+            vectorstore.delete(stale_ids)
+        indexed = {name: manifest["files"][name]["ids"] for name in unchanged}
+        to_index = [path for path in file_paths if os.path.basename(path) in set(added + changed)]
+
+    if args.pipeline:
+        vectorstore, file_ids = run_pipeline(
+            to_index, attach_candidate_info, text_splitter, embeddings,
+            workers=args.workers, queue_size=args.queue_size, vectorstore=vectorstore,
+            dedup=None if args.no_dedup else dedup_chunks
+        )
+    else:
+        vectorstore, file_ids = build_serial(to_index, text_splitter, embeddings, vectorstore,
+                                             dedup=not args.no_dedup)
+
+    if vectorstore is None:
+        print("No CVs could be processed.")
+        return
+
+    indexed.update(file_ids)
+    params = None
+    if index_type != "flat":
+        params = compress_vectorstore(vectorstore, embeddings, index_type)
+        print(f"[+] Built {params['factory']} index, search params {params['search']}")
+    save_faiss(vectorstore, index_dir, params)
+    # Files that failed to parse are left out so the next run retries them
+    save_manifest(index_dir, settings, {
+        name: {"sha256": hashes[name], "ids": ids} for name, ids in indexed.items()
+    })
+    print(f"Embedding cache: {embeddings.cache.hits} hits, {embeddings.cache.misses} misses")
+    print("Vector store created with enhanced metadata")
+
+if __name__ == "__main__":
+    main()
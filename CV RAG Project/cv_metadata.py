@@ -0,0 +1,129 @@
+#!/usr/bin/python3
+"""Single-pass candidate metadata extraction for CV text.
+
+Every field we care about (name lines, section headers and the blank lines
+that end inline sections) is folded into one compiled pattern that is built
+once at import time. Only the first-line name check runs separately, as an
+anchored match. extract_candidate_info walks the text with a single
+finditer call and cuts the sections out of the match positions, so the cost
+per CV does not grow with the number of fields we extract.
+"""
+import re
+
+# Header keyword -> metadata key. Keywords mapped to None are only used to end
+# the previous section (e.g. PROJECTS after CERTIFICATIONS).
+SECTION_KEYWORDS = {
+    "skills": "skills",
+    "skill": "skills",
+    "certifications": "certifications",
+    "certification": "certifications",
+    "certificates": "certifications",
+    "education": "education",
+    "qualifications": "education",
+    "experience": "experience",
+    "employment": "experience",
+    "history": "experience",
+    "projects": None,
+    "summary": None,
+    "profile": None,
+    "objective": None,
+    "references": None,
+    "referees": None,
+    "languages": None,
+    "interests": None,
+    "hobbies": None,
+    "achievements": None,
+    "awards": None,
+    "publications": None,
+    "contact": None,
+    "details": None,
+}
+
+# Lines that look like a name at the top of a CV but are not one
+_NOT_NAMES = {"curriculum vitae", "resume", "personal details", "personal information"}
+
+_KEYWORDS = "|".join(sorted(SECTION_KEYWORDS, key=len, reverse=True))
+
+# Matched once at the start of the CV: "Allan Kariuki Mbugua   Contact: ..." or
+# "JOHN NDUNGU KIMOTHO (254)..."
+_LEAD_NAME = re.compile(r"\s*(?P<lead>[A-Z][A-Za-z'-]*(?: [A-Z][A-Za-z'-]*){1,2})(?![A-Za-z])")
+
+# Every alternative starts with a literal newline, which lets the regex engine
+# jump from line to line instead of trying each branch at every character.
+_SCANNER = re.compile(
+    # "Name: ..." / "Full name - ..."
+    r"\n[ \t]*(?i:(?:full[ \t]+)?name)[ \t]*[:\-][ \t]*(?P<name>[^\n]*\S)"
+    # "Resume of ..."
+    r"|\n[ \t]*(?i:resume[ \t]+of)[ \t]+(?P<resume_of>[^\n]*\S)"
+    # Section header, either on its own line ("EDUCATION", "Professional Experience",
+    # "SKILLS AND TECHNOLOGY") or inline ("Technical skills: Python, ...")
+    r"|\n[ \t]*(?:[A-Za-z]+[ \t]+){0,2}?(?i:(?P<section>" + _KEYWORDS + r")"
+    r"(?:[ \t]+(?:and|&)[ \t]+[A-Za-z]+)?)[ \t]*"
+    r"(?:(?P<inline>:)|(?=\n)|\Z)"
+    # A line that is just "First Last" anywhere in the document
+    r"|\n[ \t]*(?P<title>[A-Z][a-z]+ [A-Z][a-z]+)[ \t]*(?=\n|\Z)"
+    # Blank line, which ends an inline section
+    r"|\n(?P<blank>[ \t]*)(?=\n|\Z)"
+)
+
+# Higher priority name sources win over lower ones
+_NAME_GROUPS = ("name", "resume_of", "lead", "title")
+
+
+def _clean_name(name):
+    name = " ".join(name.split())
+    return name.title() if name.isupper() else name
+
+
+def extract_candidate_info(text, filename):
+    """Extract name, skills, certifications, education and experience from CV text"""
+    info = {"source": filename}
+    names = {}
+    sections = {}
+
+    lead = _LEAD_NAME.match(text)
+    if lead:
+        candidate = _clean_name(lead.group("lead"))
+        if candidate.lower() not in _NOT_NAMES:
+            names["lead"] = candidate
+
+    # The leading newline lets the first line match like every other line
+    text = "\n" + text
+    current = None  # (metadata key or None, content start, inline?)
+
+    def close(end):
+        key, start, _ = current
+        if key is not None:
+            content = text[start:end].strip()
+            if content:
+                sections.setdefault(key, []).append(content)
+
+    for match in _SCANNER.finditer(text):
+        if match.group("section") is not None:
+            if current is not None:
+                close(match.start())
+            key = SECTION_KEYWORDS[match.group("section").lower()]
+            current = (key, match.end(), match.group("inline") is not None)
+        elif match.group("blank") is not None:
+            # Blank lines only end inline sections that already have content
+            if current is not None and current[2] and text[current[1]:match.start()].strip():
+                close(match.start())
+                current = None
+        else:
+            group = match.lastgroup
+            candidate = _clean_name(match.group(group))
+            if candidate.lower() not in _NOT_NAMES:
+                names.setdefault(group, candidate)
+
+    if current is not None:
+        close(len(text))
+
+    for group in _NAME_GROUPS:
+        if group in names:
+            info["candidate_name"] = names[group]
+            break
+
+    for key, parts in sections.items():
+        info[key] = "\n".join(parts)
+
+    return info
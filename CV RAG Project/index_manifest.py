@@ -0,0 +1,61 @@
+#!/usr/bin/python3
+"""Content-hash manifest kept next to index.faiss and its docstore.
+
+The manifest records, for every indexed CV, the SHA-256 of the PDF and the
+docstore ids of the chunks it produced. Comparing it with the files on disk
+tells create_vector.py which CVs need re-embedding and which vectors have to
+be deleted from the existing index.
+"""
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def file_sha256(path, block_size=1 << 20):
+    """Hash a file in fixed-size blocks so large PDFs are never fully read into memory"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(index_dir):
+    """Return the manifest stored in index_dir, or None if there is none"""
+    path = os.path.join(index_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(index_dir, settings, files):
+    """Write the manifest atomically so an interrupted run never leaves it half written"""
+    os.makedirs(index_dir, exist_ok=True)
+    path = os.path.join(index_dir, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": MANIFEST_VERSION, "settings": settings, "files": files},
+                  f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def diff_manifest(manifest, hashes):
+    """Compare manifest entries with {filename: sha256} of the files on disk.
+
+    Returns (added, changed, removed, unchanged) lists of filenames.
+    """
+    indexed = manifest["files"]
+    added = sorted(name for name in hashes if name not in indexed)
+    changed = sorted(name for name in hashes
+                     if name in indexed and indexed[name]["sha256"] != hashes[name])
+    removed = sorted(name for name in indexed if name not in hashes)
+    unchanged = sorted(name for name in hashes
+                       if name in indexed and indexed[name]["sha256"] == hashes[name])
+    return added, changed, removed, unchanged
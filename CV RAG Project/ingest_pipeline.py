@@ -0,0 +1,173 @@
+#!/usr/bin/python3
+"""Staged ingestion pipeline for the CV FAISS index.
+
+Parsing, metadata extraction, splitting, embedding and index writes each run
+as their own stage and hand work to the next one through a bounded queue.
+When a stage falls behind, the queue in front of it fills up and the stages
+upstream block, so only a handful of CVs are ever held in memory at once.
+PDF parsing runs in a process pool, which lets parsing of file N+1 overlap
+with embedding of file N.
+"""
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_community.vectorstores import FAISS
+
+_DONE = object()
+
+
+class _StageFailed:
+    """End marker carrying the error that stopped a stage early"""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def parse_pdf(file_path):
+    """Parse one PDF into page documents (runs inside a worker process)"""
+    return PyPDFLoader(file_path).load()
+
+
+def _report_error(file_path, error):
+    print(f"Error processing {os.path.basename(file_path)}: {str(error)}")
+
+
+def _parse_stage(file_paths, outbox, workers, max_pending):
+    """Feed PDFs to the process pool, keeping at most max_pending in flight"""
+    context = multiprocessing.get_context("spawn")
+    end = _DONE
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            pending = deque()
+
+            def emit_oldest():
+                file_path, future = pending.popleft()
+                try:
+                    pages = future.result()
+                except Exception as e:
+                    _report_error(file_path, e)
+                    return
+                # Blocks while downstream is full, which stops new submissions
+                outbox.put((file_path, pages))
+
+            for file_path in file_paths:
+                # submit raises BrokenProcessPool once a worker has died
+                pending.append((file_path, pool.submit(parse_pdf, file_path)))
+                if len(pending) >= max_pending:
+                    emit_oldest()
+            while pending:
+                emit_oldest()
+    except Exception as e:
+        end = _StageFailed(e)
+    finally:
+        # Always end the stream, or the stages downstream wait forever
+        outbox.put(end)
+
+
+def _stage(fn, inbox, outbox, timings, name):
+    """Apply fn to every (file_path, payload) item until the end marker"""
+    while True:
+        item = inbox.get()
+        if item is _DONE or isinstance(item, _StageFailed):
+            outbox.put(item)
+            return
+        file_path, payload = item
+        start = time.perf_counter()
+        try:
+            result = fn(file_path, payload)
+        except Exception as e:
+            _report_error(file_path, e)
+            continue
+        finally:
+            timings[name] += time.perf_counter() - start
+        outbox.put((file_path, result))
+
+
+def run_pipeline(file_paths, enrich, text_splitter, embeddings,
+                 workers=None, queue_size=4, vectorstore=None, dedup=None):
+    """Index CV PDFs into a FAISS vector store with overlapping stages.
+
+    enrich(pages, filename) attaches metadata to the parsed pages of one CV,
+    text_splitter splits them and embeddings embeds the resulting chunks.
+    queue_size bounds every inter-stage queue as well as the number of PDFs
+    parsed ahead of the embedding stage. dedup, if given, filters each CV's
+    chunks before they are embedded. Chunks are appended to vectorstore when
+    one is given. Returns (vectorstore, {filename: [docstore ids]}).
+    """
+    workers = workers or max(1, (os.cpu_count() or 2) - 1)
+    parsed = queue.Queue(maxsize=queue_size)
+    enriched = queue.Queue(maxsize=queue_size)
+    split = queue.Queue(maxsize=queue_size)
+    embedded = queue.Queue(maxsize=queue_size)
+    timings = {"metadata": 0.0, "split": 0.0, "embed": 0.0, "write": 0.0}
+
+    def enrich_stage(file_path, pages):
+        enrich(pages, os.path.basename(file_path))
+        return pages
+
+    def split_stage(file_path, pages):
+        chunks = text_splitter.split_documents(pages)
+        return dedup(chunks) if dedup else chunks
+
+    def embed_stage(file_path, chunks):
+        vectors = embeddings.embed_documents([c.page_content for c in chunks])
+        return chunks, vectors
+
+    threads = [
+        threading.Thread(target=_parse_stage,
+                         args=(file_paths, parsed, workers, queue_size)),
+        threading.Thread(target=_stage,
+                         args=(enrich_stage, parsed, enriched, timings, "metadata")),
+        threading.Thread(target=_stage,
+                         args=(split_stage, enriched, split, timings, "split")),
+        threading.Thread(target=_stage,
+                         args=(embed_stage, split, embedded, timings, "embed")),
+    ]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+
+    # The index write stage runs on the calling thread
+    started = time.perf_counter()
+    file_ids = {}
+    failed = None
+    while True:
+        item = embedded.get()
+        if item is _DONE:
+            break
+        if isinstance(item, _StageFailed):
+            failed = item.error
+            break
+        file_path, (chunks, vectors) = item
+        if not chunks:
+            # Everything was deduplicated away; still record the file as indexed
+            file_ids[os.path.basename(file_path)] = []
+            continue
+        start = time.perf_counter()
+        text_embeddings = list(zip([c.page_content for c in chunks], vectors))
+        metadatas = [c.metadata for c in chunks]
+        ids = [str(uuid.uuid4()) for _ in chunks]
+        if vectorstore is None:
+            vectorstore = FAISS.from_embeddings(text_embeddings, embeddings,
+                                                metadatas=metadatas, ids=ids)
+        else:
+            vectorstore.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+        timings["write"] += time.perf_counter() - start
+        file_ids[os.path.basename(file_path)] = ids
+
+    for thread in threads:
+        thread.join()
+    if failed is not None:
+        raise RuntimeError("PDF parsing stopped before every CV was read") from failed
+
+    print(f"Pipeline indexed {len(file_ids)} files in {time.perf_counter() - started:.2f}s "
+          f"(stage busy time: " +
+          ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items()) + ")")
+    return vectorstore, file_ids
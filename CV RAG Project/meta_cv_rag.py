@@ -1,66 +1,105 @@
 import os
+import sys
+import argparse
+import hashlib
+import itertools
 import PyPDF2
 import chromadb
 from chromadb.config import Settings
+from chromadb.errors import NotFoundError
 from chromadb.utils import embedding_functions
-from typing import List, Dict
+from typing import Dict, Iterable, Iterator, List
+
+# Shared RAG helpers live next to the book pipelines
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "RAG"))
+from bm25_index import BM25Writer, chroma_bm25_dir
+from chroma_hnsw import collection_hnsw_params, hnsw_metadata
+from vector_cache import CachedEmbeddingFunction
 
 # Configuration
 CV_DIRECTORY = "./cvs"  # Path to your CVs directory
 CHROMA_DB_PATH = "./chroma_db"  # Path to store ChromaDB
 COLLECTION_NAME = "cv_collection"
+SYNC_BATCH_SIZE = 64  # Documents per upsert/delete call when syncing
 
 # Initialize ChromaDB client
 client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
 
-# Use sentence-transformers embedding model
-sentence_transformer_ef = embedding_functions.SentenceTransformerEmbeddingFunction(
+# Use sentence-transformers embedding model, reusing vectors cached by other builders
+sentence_transformer_ef = CachedEmbeddingFunction(
+    embedding_functions.SentenceTransformerEmbeddingFunction(model_name="all-MiniLM-L6-v2"),
     model_name="all-MiniLM-L6-v2"
 )
 
+def iter_pdf_pages(pdf_path: str) -> Iterator[str]:
+    """Lazily yield the text of each page of a PDF file."""
+    with open(pdf_path, "rb") as file:
+        reader = PyPDF2.PdfReader(file)
+        for page in reader.pages:
+            yield page.extract_text() or ""
+
 def extract_text_from_pdf(pdf_path: str) -> str:
-    """Extract text from a PDF file."""
-    text = ""
+    """Extract the whole text of a PDF file as one string."""
+    pages = []
     try:
-        with open(pdf_path, "rb") as file:
-            reader = PyPDF2.PdfReader(file)
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
+        for page_text in iter_pdf_pages(pdf_path):
+            pages.append(page_text)
     except Exception as e:
         print(f"Error reading {pdf_path}: {str(e)}")
-    return text.strip()
+    # A single join keeps this linear in the number of pages
+    return "\n".join(pages).strip()
 
-def process_cvs(cv_directory: str) -> List[Dict]:
-    """Process all CVs in the directory and return structured data."""
-    cv_data = []
+def iter_cvs(cv_directory: str) -> Iterator[Dict]:
+    """Lazily yield structured data for each CV in the directory, one CV at a time.
+
+    Each CV is stored and content-hashed as a single Chroma document, so its
+    full text is still joined into one string; only the number of CVs held
+    in memory is bounded.
+    """
     for filename in os.listdir(cv_directory):
         if filename.lower().endswith(".pdf"):
             filepath = os.path.join(cv_directory, filename)
             text = extract_text_from_pdf(filepath)
             if text:  # Only add if text was extracted successfully
-                cv_data.append({
+                yield {
                     "filename": filename,
                     "text": text,
                     "metadata": {"source": filename}
-                })
-    return cv_data
+                }
+
+def process_cvs(cv_directory: str) -> List[Dict]:
+    """Process all CVs in the directory and return structured data."""
+    return list(iter_cvs(cv_directory))
+
+def create_chroma_collection(cv_data: Iterable[Dict], **hnsw_params):
+    """Create or reset ChromaDB collection and add CV documents.
 
-def create_chroma_collection(cv_data: List[Dict]):
-    """Create or reset ChromaDB collection and add CV documents."""
+    cv_data is consumed lazily (e.g. iter_cvs) and added SYNC_BATCH_SIZE CVs at
+    a time, so only one batch of CV text is held in memory. hnsw_params (M,
+    construction_ef, search_ef) override the HNSW settings; any left out keep
+    what the previous collection used, e.g. from chroma_hnsw.py.
+    """
     # Delete collection if it already exists
     try:
+        existing = client.get_collection(COLLECTION_NAME)
+    except (NotFoundError, ValueError):  # Older chromadb raises ValueError
+        existing = None  # Collection didn't exist
+    previous = {}
+    if existing is not None:
+        previous = collection_hnsw_params(existing)
         client.delete_collection(COLLECTION_NAME)
-    except:
-        pass  # Collection didn't exist
+    for key, value in previous.items():
+        if key != "space" and hnsw_params.get(key) is None:
+            hnsw_params[key] = value
     
     # Create new collection
     collection = client.create_collection(
         name=COLLECTION_NAME,
         embedding_function=sentence_transformer_ef,
-        metadata={"hnsw:space": "cosine"}  # Using cosine similarity
+        metadata=hnsw_metadata("cosine", **hnsw_params)  # Using cosine similarity
     )
     
-    # Prepare documents, ids and metadatas
+    # Prepare documents, ids and metadatas, adding them a batch at a time
     documents = []
     metadatas = []
     ids = []
@@ -69,32 +108,140 @@ def create_chroma_collection(cv_data: List[Dict]):
         documents.append(cv["text"])
         metadatas.append(cv["metadata"])
         ids.append(str(idx))
+        if len(ids) >= SYNC_BATCH_SIZE:
+            collection.add(documents=documents, metadatas=metadatas, ids=ids)
+            documents, metadatas, ids = [], [], []
     
-    # Add to collection
-    collection.add(
-        documents=documents,
-        metadatas=metadatas,
-        ids=ids
-    )
+    # Add the rest to collection
+    if ids:
+        collection.add(
+            documents=documents,
+            metadatas=metadatas,
+            ids=ids
+        )
     
     return collection
 
+def content_id(text: str) -> str:
+    """Derive a stable document id from the CV text itself."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def sync_chroma_collection(cv_data: Iterable[Dict], **hnsw_params):
+    """Bring the collection in line with cv_data, embedding only new or changed CVs.
+
+    Documents are keyed by a hash of their text, so an unchanged CV keeps its id
+    across runs and is skipped. cv_data is consumed lazily; only the ids seen so
+    far and one batch of CV text are held in memory. hnsw_params only apply when
+    the collection is first created. Returns the collection and a dict of counts.
+    """
+    collection = client.get_or_create_collection(
+        name=COLLECTION_NAME,
+        embedding_function=sentence_transformer_ef,
+        metadata=hnsw_metadata("cosine", **hnsw_params)
+    )
+
+    existing = collection.get(include=["metadatas"])
+    existing_metadata = dict(zip(existing["ids"], existing["metadatas"]))
+
+    stats = {"skipped": 0, "added": 0, "updated": 0, "removed": 0}
+    seen = {}  # doc id -> filename
+    to_add = []
+    to_update = []
+
+    def flush_add():
+        collection.upsert(
+            ids=[content_id(cv["text"]) for cv in to_add],
+            documents=[cv["text"] for cv in to_add],
+            metadatas=[cv["metadata"] for cv in to_add]
+        )
+        stats["added"] += len(to_add)
+        to_add.clear()
+
+    def flush_update():
+        collection.update(
+            ids=[doc_id for doc_id, _ in to_update],
+            metadatas=[metadata for _, metadata in to_update]
+        )
+        stats["updated"] += len(to_update)
+        to_update.clear()
+
+    for cv in cv_data:
+        doc_id = content_id(cv["text"])
+        if doc_id in seen:
+            print(f"Skipping {cv['filename']}: same content as {seen[doc_id]}")
+            continue
+        seen[doc_id] = cv["filename"]
+        if doc_id not in existing_metadata:
+            to_add.append(cv)
+            if len(to_add) >= SYNC_BATCH_SIZE:
+                flush_add()
+        elif existing_metadata[doc_id] != cv["metadata"]:
+            # Same text under a new filename only needs its metadata rewritten, not re-embedded
+            to_update.append((doc_id, cv["metadata"]))
+            if len(to_update) >= SYNC_BATCH_SIZE:
+                flush_update()
+        else:
+            stats["skipped"] += 1
+    if to_add:
+        flush_add()
+    if to_update:
+        flush_update()
+
+    to_remove = [doc_id for doc_id in existing_metadata if doc_id not in seen]
+    for start in range(0, len(to_remove), SYNC_BATCH_SIZE):
+        collection.delete(ids=to_remove[start:start + SYNC_BATCH_SIZE])
+    stats["removed"] = len(to_remove)
+    return collection, stats
+
 def main():
-    # Process all CVs
+    parser = argparse.ArgumentParser(description="Load CVs into ChromaDB")
+    parser.add_argument("--sync", action="store_true",
+                        help="only embed new or changed CVs instead of recreating the collection")
+    parser.add_argument("--hnsw-m", type=int, default=None, help="HNSW graph neighbours per node")
+    parser.add_argument("--construction-ef", type=int, default=None, help="HNSW candidate list size while building")
+    parser.add_argument("--search-ef", type=int, default=None, help="HNSW candidate list size while querying")
+    args = parser.parse_args()
+    hnsw_params = {"M": args.hnsw_m, "construction_ef": args.construction_ef, "search_ef": args.search_ef}
+
+    # CVs are read lazily while they are embedded, so only a batch is in memory
     print("Processing CVs...")
-    cv_data = process_cvs(CV_DIRECTORY)
+    cvs = iter_cvs(CV_DIRECTORY)
+    first = next(cvs, None)
     
-    if not cv_data:
+    if first is None:
         print("No CVs found or could be processed.")
         return
     
-    print(f"Processed {len(cv_data)} CVs")
+    processed = 0
+
+    def counted():
+        nonlocal processed
+        for cv in itertools.chain([first], cvs):
+            processed += 1
+            yield cv
+
+    cv_data = counted()
+    
+    if args.sync:
+        print("Syncing ChromaDB collection...")
+        collection, stats = sync_chroma_collection(cv_data, **hnsw_params)
+        print(f"Skipped {stats['skipped']}, added {stats['added']}, "
+              f"updated {stats['updated']}, removed {stats['removed']} documents")
+    else:
+        # Create ChromaDB collection
+        print("Creating ChromaDB collection...")
+        collection = create_chroma_collection(cv_data, **hnsw_params)
     
-    # Create ChromaDB collection
-    print("Creating ChromaDB collection...")
-    collection = create_chroma_collection(cv_data)
+    print(f"Processed {processed} CVs")
     
     # Verify
+    # Keyword index for the hybrid retriever in agent_cv.py, read back a page at a time
+    bm25 = BM25Writer(chroma_bm25_dir(CHROMA_DB_PATH, COLLECTION_NAME))
+    for offset in range(0, collection.count(), SYNC_BATCH_SIZE):
+        page = collection.get(include=["documents"], limit=SYNC_BATCH_SIZE, offset=offset)
+        bm25.add(page["ids"], page["documents"])
+    bm25.close()
+
     print(f"Collection '{COLLECTION_NAME}' created with {collection.count()} items")
     print("Sample query test:")
     results = collection.query(
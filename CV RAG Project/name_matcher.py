@@ -0,0 +1,111 @@
+#!/usr/bin/python3
+"""Aho-Corasick matcher from candidate names to the CVs they belong to.
+
+get_relevant_documents used to lowercase every document's candidate_name and
+test it against the query on every question. NameMatcher instead compiles the
+names once into an automaton. Each name is registered in full and under each
+of its parts ("Allan Kariuki Mbugua" also answers to "allan" and "mbugua"),
+and every pattern maps to the set of CV sources carrying it. A query is then
+scanned in a single pass, so detecting names costs O(len(query)) however many
+CVs are indexed.
+
+Names and queries are normalized the same way: lowercased, with anything
+other than letters and digits treated as a word break. Patterns only match on
+whole words, so "mark" is found in "Mark's CV" but not in "market".
+"""
+import re
+from collections import deque
+
+_NON_WORD = re.compile(r"[\W_]+")
+# Name parts shorter than this are too ambiguous to use as an alias
+MIN_ALIAS_LENGTH = 3
+
+
+def normalize_name(text):
+    return " ".join(_NON_WORD.sub(" ", text.lower()).split())
+
+
+def name_aliases(name):
+    """The normalized full name plus each of its parts"""
+    full = normalize_name(name)
+    if not full:
+        return set()
+    return {full} | {part for part in full.split() if len(part) >= MIN_ALIAS_LENGTH}
+
+
+class NameMatcher:
+    """Multi-pattern name automaton that maps matched names to CV sources."""
+
+    def __init__(self):
+        self._goto = [{}]       # state -> {char: state}
+        self._sources = [set()]  # state -> sources of the pattern ending there
+        self._fail = [0]
+        self._output = [set()]   # state -> sources of every pattern ending there, via fail links
+        self._stale = False
+
+    def add(self, name, source):
+        """Register a candidate name (and its aliases) for source"""
+        for alias in name_aliases(name):
+            state = 0
+            # Spaces around the pattern anchor it to word boundaries in the padded query
+            for char in f" {alias} ":
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._sources.append(set())
+                state = next_state
+            if source not in self._sources[state]:
+                self._sources[state].add(source)
+                self._stale = True
+
+    def add_documents(self, documents):
+        """Register the candidate names of newly indexed chunks"""
+        for doc in documents:
+            name = doc.metadata.get("candidate_name")
+            if name:
+                self.add(name, doc.metadata.get("source"))
+
+    @classmethod
+    def from_docstore(cls, docstore):
+        """Build the matcher from every (candidate_name, source) pair in a FAISS docstore"""
+        matcher = cls()
+        if hasattr(docstore, "distinct"):
+            pairs = docstore.distinct("candidate_name", "source")
+        else:
+            pairs = {(doc.metadata.get("candidate_name"), doc.metadata.get("source"))
+                     for doc in docstore._dict.values()}
+        for name, source in pairs:
+            if name:
+                matcher.add(name, source)
+        return matcher
+
+    def _link(self):
+        """(Re)compute failure links breadth-first after names were added"""
+        self._fail = [0] * len(self._goto)
+        self._output = [set(sources) for sources in self._sources]
+        pending = deque(self._goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for char, next_state in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] |= self._output[self._fail[next_state]]
+                pending.append(next_state)
+        self._stale = False
+
+    def match(self, query):
+        """Sources of every candidate named in query"""
+        if self._stale:
+            self._link()
+        found = set()
+        state = 0
+        for char in f" {normalize_name(query)} ":
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            found |= self._output[state]
+        return found
@@ -0,0 +1,139 @@
+#!/usr/bin/python3
+"""Length-bucketed, self-tuning batching for sentence-transformers embeddings.
+
+HuggingFaceEmbeddings hands every list of chunks to SentenceTransformer.encode
+with one fixed batch size, so a short chunk batched with long ones is padded to
+the longest and the batch size is never matched to the machine.
+BucketedEmbeddings instead:
+
+- measures each chunk in tokens and groups chunks into length buckets;
+- sorts every bucket by length so each batch is padded only to its own
+  longest chunk (the tokenizer pads per batch);
+- picks the batch size for each bucket from a short calibration run the first
+  time the bucket is seen: after one untimed warm-up encode, every candidate
+  size is timed on the same small sample spread across the bucket, and the
+  size that gives the most chunks/s is kept;
+- returns the vectors in the order the texts were given.
+"""
+import time
+
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_BUCKET_EDGES = (32, 64, 128, 256)  # Upper token length of each bucket
+DEFAULT_BATCH_SIZES = (8, 16, 32, 64)
+_CHARS_PER_TOKEN = 4  # Fallback estimate when the model exposes no tokenizer
+
+
+class BucketedEmbeddings(Embeddings):
+    """Wrap a HuggingFaceEmbeddings instance with length-bucketed adaptive batching."""
+
+    def __init__(self, embeddings, bucket_edges=DEFAULT_BUCKET_EDGES,
+                 batch_sizes=DEFAULT_BATCH_SIZES, calibration_size=64):
+        self.embeddings = embeddings
+        self.bucket_edges = tuple(sorted(bucket_edges))
+        self.batch_sizes = tuple(sorted(batch_sizes))
+        self.calibration_size = calibration_size
+        self.tuned_batch_size = {}  # bucket index -> calibrated batch size
+        self._warmed_up = False
+        self.real_tokens = 0
+        self.padded_tokens = 0
+
+    # CachedEmbeddings keys its cache on these, so expose the wrapped model's
+    @property
+    def model_name(self):
+        return self.embeddings.model_name
+
+    @property
+    def encode_kwargs(self):
+        return getattr(self.embeddings, "encode_kwargs", {})
+
+    @property
+    def padding_efficiency(self):
+        """Share of the tokens fed to the model that were not padding"""
+        return self.real_tokens / self.padded_tokens if self.padded_tokens else 1.0
+
+    def token_lengths(self, texts):
+        client = getattr(self.embeddings, "client", None)
+        tokenizer = getattr(client, "tokenizer", None)
+        if tokenizer is None:
+            return [max(1, len(t) // _CHARS_PER_TOKEN) for t in texts]
+        max_length = getattr(client, "max_seq_length", None) or self.bucket_edges[-1]
+        encoded = tokenizer(texts, add_special_tokens=True, truncation=True, max_length=max_length)
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    def _bucket(self, length):
+        for index, edge in enumerate(self.bucket_edges):
+            if length <= edge:
+                return index
+        return len(self.bucket_edges) - 1
+
+    def _encode(self, texts, batch_size):
+        client = getattr(self.embeddings, "client", None)
+        if client is None:
+            return [list(v) for start in range(0, len(texts), batch_size)
+                    for v in self.embeddings.embed_documents(texts[start:start + batch_size])]
+        kwargs = {k: v for k, v in self.encode_kwargs.items() if k != "batch_size"}
+        # Same preprocessing as HuggingFaceEmbeddings.embed_documents
+        texts = [t.replace("\n", " ") for t in texts]
+        vectors = client.encode(texts, batch_size=batch_size, show_progress_bar=False, **kwargs)
+        return vectors.tolist()
+
+    def _calibrate(self, texts):
+        """Return (best batch size, vectors for texts) after timing each candidate on texts"""
+        if not self._warmed_up:
+            # The first encode pays for lazy initialisation; keep it out of the timings
+            self._encode(texts[:self.batch_sizes[0]], self.batch_sizes[0])
+            self._warmed_up = True
+        best_size, best_rate, best_vectors = None, 0.0, None
+        for batch_size in self.batch_sizes:
+            if batch_size > len(texts) and best_size is not None:
+                break
+            started = time.perf_counter()
+            vectors = self._encode(texts, batch_size)
+            rate = len(texts) / max(time.perf_counter() - started, 1e-9)
+            if rate > best_rate:
+                best_size, best_rate, best_vectors = batch_size, rate, vectors
+        return best_size, best_vectors
+
+    def _count_padding(self, lengths, batch_size):
+        for start in range(0, len(lengths), batch_size):
+            batch = lengths[start:start + batch_size]
+            self.real_tokens += sum(batch)
+            self.padded_tokens += max(batch) * len(batch)
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        lengths = self.token_lengths(texts)
+        buckets = {}
+        for index, length in enumerate(lengths):
+            buckets.setdefault(self._bucket(length), []).append(index)
+
+        results = [None] * len(texts)
+        for bucket, indices in sorted(buckets.items()):
+            indices.sort(key=lambda i: lengths[i], reverse=True)
+            rest = indices
+            batch_size = self.tuned_batch_size.get(bucket)
+            if batch_size is None and len(indices) >= min(self.calibration_size, self.batch_sizes[-1]):
+                # Every candidate is timed on the same sample, spread evenly over the
+                # bucket's lengths; it is embedded for real, so its vectors are kept
+                size = min(self.calibration_size, len(indices))
+                picked = {indices[n * len(indices) // size] for n in range(size)}
+                sample = [i for i in indices if i in picked]
+                batch_size, vectors = self._calibrate([texts[i] for i in sample])
+                self.tuned_batch_size[bucket] = batch_size
+                for i, vector in zip(sample, vectors):
+                    results[i] = vector
+                self._count_padding([lengths[i] for i in sample], batch_size)
+                rest = [i for i in indices if i not in picked]
+            if batch_size is None:
+                # Too few texts to calibrate on yet; use the model's usual batch size
+                batch_size = self.encode_kwargs.get("batch_size", 32)
+            if rest:
+                vectors = self._encode([texts[i] for i in rest], batch_size)
+                for i, vector in zip(rest, vectors):
+                    results[i] = vector
+                self._count_padding([lengths[i] for i in rest], batch_size)
+        return results
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
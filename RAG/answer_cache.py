@@ -0,0 +1,84 @@
+#!/usr/bin/python3
+"""Semantic cache of LLM answers for the question-answering scripts.
+
+Retrieval costs milliseconds; the LLM call after it costs seconds. Recruiters
+tend to ask the same few questions over and over in slightly different words,
+so SemanticAnswerCache keeps each answer with:
+
+    the query embedding        normalized, compared by cosine similarity
+    the retrieved chunk ids    an answer only holds for the context it saw
+
+A new question reuses an answer when it retrieved exactly the same chunks and
+its embedding is at least threshold similar to the cached question. Entries
+expire after ttl seconds and the least recently used go first beyond maxsize.
+Given version (a callable returning the version of the index the answers
+came from), the cache empties itself the first time that version changes.
+
+    cached = cache.lookup(vector, chunk_ids)
+    if cached is None:
+        cache.store(vector, chunk_ids, answer, sources)
+"""
+import threading
+import time
+from collections import OrderedDict
+from itertools import count
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """LRU/TTL cache of answers keyed by query embedding and retrieved chunk ids."""
+
+    def __init__(self, threshold=0.95, maxsize=256, ttl=3600, version=None):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (vector, chunk ids, answer, sources, stored at)
+        self._keys = count()
+        self._version = version() if version else None
+
+    def _check_version(self):
+        if self.version is None:
+            return
+        current = self.version()
+        if current != self._version:
+            self._entries.clear()
+            self._version = current
+
+    def lookup(self, vector, chunk_ids):
+        """(answer, sources) cached for a similar question over the same chunks, or None"""
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        chunk_ids = frozenset(chunk_ids)
+        now = time.monotonic()
+        with self._lock:
+            self._check_version()
+            for key in [key for key, entry in self._entries.items() if now - entry[4] > self.ttl]:
+                del self._entries[key]
+            candidates = [key for key, entry in self._entries.items() if entry[1] == chunk_ids]
+            if candidates:
+                similarities = np.stack([self._entries[key][0] for key in candidates]) @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    self._entries.move_to_end(candidates[best])
+                    self.hits += 1
+                    _, _, answer, sources, _ = self._entries[candidates[best]]
+                    return answer, sources
+            self.misses += 1
+        return None
+
+    def store(self, vector, chunk_ids, answer, sources):
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            self._check_version()
+            self._entries[next(self._keys)] = (vector / (np.linalg.norm(vector) or 1.0), frozenset(chunk_ids),
+                                               answer, sources, time.monotonic())
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,151 @@
+#!/usr/bin/python3
+"""Answer a file of queries against one persisted store in batches.
+
+query_rag.py, part_two_rag_basics.py and deep_seek_query.py answer a single
+question per launch. For evaluation runs over thousands of questions that
+means loading the model and the store, then searching, once per question.
+This script loads both once and, for every batch of queries:
+
+    1. embeds the whole batch in one embed_documents call
+    2. searches it in one call: a single (batch x dim) index.search for FAISS,
+       one collection.query with all the query embeddings for Chroma
+    3. writes one JSON line per query as soon as the batch is done
+
+Input is JSONL with a "query" field (and optionally an "id" carried through);
+bare JSON strings are accepted too. Each output line is
+
+    {"id": ..., "query": ..., "results": [{"rank": 1, "score": 0.71, "source": ..., "content": ...}, ...]}
+
+where score is the store's relevance score (0..1, higher is better), as
+printed by deep_seek_query.py. Throughput is reported on stderr so stdout can
+be piped.
+
+    python batch_query.py questions.jsonl --store faiss_db --k 3 --output answers.jsonl
+"""
+import argparse
+import json
+import sys
+import time
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from federated_retriever import STORES, open_vectorstore
+
+DEFAULT_BATCH_SIZE = 256
+
+
+def _faiss_batch(store, vectors, k):
+    if store._normalize_L2:
+        faiss.normalize_L2(vectors)
+    distances, positions = store.index.search(vectors, k)
+    relevance = store._select_relevance_score_fn()
+    results = []
+    for row_distances, row_positions in zip(distances, positions):
+        hits = []
+        for distance, position in zip(row_distances, row_positions):
+            if position == -1:
+                continue  # Fewer than k vectors reachable (small store or IVF probes)
+            doc = store.docstore.search(store.index_to_docstore_id[int(position)])
+            if not isinstance(doc, Document):
+                raise ValueError(f"Could not find document for position {position}, got {doc}")
+            hits.append((doc, float(relevance(float(distance)))))
+        results.append(hits)
+    return results
+
+
+def _chroma_batch(store, vectors, k):
+    found = store._collection.query(query_embeddings=vectors, n_results=k,
+                                    include=["documents", "metadatas", "distances"])
+    relevance = store._select_relevance_score_fn()
+    return [[(Document(id=doc_id, page_content=text, metadata=metadata or {}), float(relevance(distance)))
+             for doc_id, text, metadata, distance in zip(ids, texts, metadatas, distances)]
+            for ids, texts, metadatas, distances in zip(found["ids"], found["documents"],
+                                                        found["metadatas"], found["distances"])]
+
+
+def batch_search(store, queries, k=4):
+    """[(Document, relevance score)] for each query, embedded and searched as one batch"""
+    if not queries:
+        return []
+    embeddings = store.embedding_function if isinstance(store, FAISS) else store.embeddings
+    vectors = np.asarray(embeddings.embed_documents(list(queries)), dtype=np.float32)
+    if isinstance(store, FAISS):
+        return _faiss_batch(store, vectors, k)
+    return _chroma_batch(store, vectors, k)
+
+
+def read_queries(lines):
+    """(id, query) for each non-empty JSONL line; the id defaults to the line number"""
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if isinstance(record, str):
+            yield number, record
+        else:
+            yield record.get("id", number), record["query"]
+
+
+def run(store, records, output, k=4, batch_size=DEFAULT_BATCH_SIZE):
+    """Search records ((id, query) pairs) in batches, writing JSONL to output; returns the count"""
+    count = 0
+    batch = []
+
+    def flush():
+        for (query_id, query), hits in zip(batch, batch_search(store, [query for _, query in batch], k)):
+            output.write(json.dumps({"id": query_id, "query": query, "results": [
+                {"rank": rank, "score": score, "source": doc.metadata.get("source", "Unknown"),
+                 "content": doc.page_content}
+                for rank, (doc, score) in enumerate(hits, 1)]}) + "\n")
+        output.flush()
+        batch.clear()
+
+    for record in records:
+        batch.append(record)
+        count += 1
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return count
+
+
+def main():
+    from langchain_huggingface import HuggingFaceEmbeddings
+    from embedding_daemon import daemon_or_local
+
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of queries against a vector store")
+    parser.add_argument("queries", help="JSONL file of queries, - for stdin")
+    parser.add_argument("--store", default="faiss_db", choices=list(STORES))
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--output", help="JSONL file for the results (default stdout)")
+    args = parser.parse_args()
+
+    embeddings = daemon_or_local(lambda: HuggingFaceEmbeddings(
+        model_name="all-MiniLM-L6-v2",
+        model_kwargs={'device': 'cpu'},
+        encode_kwargs={'normalize_embeddings': True}
+    ), "all-MiniLM-L6-v2", normalize_embeddings=True)
+    store = open_vectorstore(args.store, embeddings)
+
+    source = sys.stdin if args.queries == "-" else open(args.queries, "r", encoding="utf-8")
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    started = time.perf_counter()
+    try:
+        count = run(store, read_queries(source), output, k=args.k, batch_size=args.batch_size)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+    elapsed = time.perf_counter() - started
+    print(f"[+] {count} queries in {elapsed:.2f}s ({count / elapsed if elapsed else 0:.1f} queries/s)",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
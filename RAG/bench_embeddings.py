@@ -0,0 +1,105 @@
+#!/usr/bin/python3
+"""Benchmark for embedding throughput on the CV and Odyssey corpora.
+
+Embeds the chunks the builders produce with plain HuggingFaceEmbeddings and
+with BucketedEmbeddings, and reports chunks/s for each. The vector cache is
+not involved, so every run measures real model time.
+
+    python bench_embeddings.py --corpus cvs,odyssey --repeat 2
+"""
+import argparse
+import os
+import time
+
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from adaptive_batching import BucketedEmbeddings
+from streaming_splitter import StreamingCharacterTextSplitter
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_cv_chunks():
+    pdfs_dir = os.path.join(os.path.dirname(current_dir), "CV RAG Project", "cvs")
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    chunks = []
+    for filename in sorted(os.listdir(pdfs_dir)):
+        if filename.endswith(".pdf"):
+            pages = PyPDFLoader(os.path.join(pdfs_dir, filename)).load()
+            chunks.extend(doc.page_content for doc in text_splitter.split_documents(pages))
+    return chunks
+
+
+def load_odyssey_chunks():
+    file_path = os.path.join(current_dir, "books", "odyssey.txt")
+    text_splitter = StreamingCharacterTextSplitter(chunk_size=1000, chunk_overlap=0)
+    return [doc.page_content for doc in text_splitter.split_file(file_path)]
+
+
+CORPORA = {
+    "cvs": load_cv_chunks,
+    "odyssey": load_odyssey_chunks,
+}
+
+
+def time_embeddings(embeddings, chunks, repeat):
+    """Best-of-repeat wall time for embedding all chunks"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        embeddings.embed_documents(chunks)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def report(label, chunks, base, repeat):
+    if not chunks:
+        print(f"{label}: no chunks")
+        return
+    print(f"{label}: {len(chunks)} chunks, {sum(map(len, chunks)) / 1e6:.2f}M chars")
+    baseline = time_embeddings(base, chunks, repeat)
+    print(f"  default batching  {baseline:8.2f} s  {len(chunks) / baseline:8.1f} chunks/s")
+
+    # A fresh wrapper per corpus, so its first run includes calibration
+    bucketed = BucketedEmbeddings(base)
+    first = time_embeddings(bucketed, chunks, 1)
+    tuned = time_embeddings(bucketed, chunks, repeat)
+    print(f"  bucketed (tuned)  {tuned:8.2f} s  {len(chunks) / tuned:8.1f} chunks/s"
+          f"  ({baseline / tuned:.2f}x, first run with calibration {first:.2f} s)")
+    sizes = ", ".join(f"<={bucketed.bucket_edges[b]}: {size}"
+                      for b, size in sorted(bucketed.tuned_batch_size.items()))
+    print(f"  batch size per token bucket: {sizes or 'none calibrated'}")
+    print(f"  padding efficiency: {bucketed.padding_efficiency:.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding batching strategies")
+    parser.add_argument("--corpus", default="cvs,odyssey",
+                        help=f"comma-separated corpora ({', '.join(CORPORA)})")
+    parser.add_argument("--limit", type=int, default=None, help="only embed the first N chunks")
+    parser.add_argument("--repeat", type=int, default=2, help="runs per measurement (best is kept)")
+    args = parser.parse_args()
+
+    base = HuggingFaceEmbeddings(
+        model_name="all-MiniLM-L6-v2",
+        model_kwargs={'device': 'cpu'},
+        encode_kwargs={'normalize_embeddings': True}
+    )
+    # Warm up the model so the first corpus isn't charged for lazy initialization
+    base.embed_documents(["warm up"])
+
+    for name in args.corpus.split(","):
+        if name not in CORPORA:
+            parser.error(f"unknown corpus: {name}")
+        try:
+            chunks = CORPORA[name]()
+        except FileNotFoundError as e:
+            print(f"{name}: skipped ({e})")
+            continue
+        report(name, chunks[:args.limit], base, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
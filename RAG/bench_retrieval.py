@@ -0,0 +1,279 @@
+#!/usr/bin/python3
+"""Recall and latency benchmark for the FAISS and Chroma stores.
+
+Every backend a corpus has in build_indexes.py is built into a scratch
+directory from the same chunks and vectors. FAISS backends can also be built
+as compressed index types from faiss_index.py. A fixed query set then runs
+against each one:
+
+    books   the Odyssey questions asked by the scripts in RAG/
+    cvs     the CV questions from the conversation.py transcript
+
+Queries are embedded once up front, so only index search is timed. For each
+backend the harness reports:
+
+    recall@k      overlap with exact brute-force search over the same vectors
+    latency_ms    p50/p95/p99 of single queries on one thread
+    qps           queries per second with N threads searching concurrently
+    size_bytes    the store's size on disk
+    load_s        time to open the store from disk and answer a first query
+
+The results are printed as a table and written as JSON so runs can be compared.
+
+    python bench_retrieval.py --corpus books --k 4 --threads 1,4,8 --output retrieval-books.json
+    python bench_retrieval.py --corpus cvs --faiss-index-types flat,hnsw,sq8
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import chromadb
+import numpy as np
+from chromadb.api.client import SharedSystemClient
+from langchain_huggingface import HuggingFaceEmbeddings
+
+from adaptive_batching import BucketedEmbeddings
+from build_indexes import TARGETS, ChromaTarget, FaissTarget, iter_chunk_batches
+from chunk_dedup import Deduplicator
+from faiss_index import INDEX_TYPES, compress_vectorstore, load_faiss, save_faiss
+from vector_cache import CachedEmbeddings
+
+QUERIES = {
+    "books": [
+        "Who had gone off to the Ethiopians?",
+        "Who is Odysseus?",
+        "Who is Penelope's son?",
+        "What happened to Odysseus' men on the island of the Cyclops?",
+        "Who kept Odysseus on her island for seven years?",
+        "How do the suitors treat Telemachus?",
+        "What does Athena advise Telemachus to do?",
+        "Who recognises Odysseus when he returns to Ithaca?",
+    ],
+    "cvs": [
+        "what do you know?",
+        "who is your prefered candidate for a data analyst role?",
+        "name the prefered candidate from the three in a role for web development?",
+        "just mention the name between Allan, John and Mark who is the most prefered candidate  for a role in Backend development?",
+        "between Allan, John and Mark who is the most prefered candidate for a role in Computer Networking?",
+        "Mention job roles John can apply?",
+        "computer science degree",
+    ],
+}
+
+
+def load_chunks(corpus, token_chunks=False, batch_size=256):
+    """The chunks build_indexes.py writes, with their ids and metadata, from the same batched path"""
+    ids, texts, metadatas = [], [], []
+    for batch_ids, batch_texts, batch_metadatas in iter_chunk_batches(corpus, Deduplicator(), batch_size,
+                                                                      token_chunks):
+        ids.extend(batch_ids)
+        texts.extend(batch_texts)
+        metadatas.extend(batch_metadatas)
+    return ids, texts, metadatas
+
+
+def exact_neighbours(vectors, queries, k):
+    """Brute-force top-k by cosine similarity (the vectors are unit length)"""
+    scores = queries @ vectors.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+class FaissBackend:
+    def __init__(self, path, embeddings):
+        self.path = path
+        self.embeddings = embeddings
+        self.store = None
+
+    def load(self):
+        self.store = load_faiss(self.path, self.embeddings)
+
+    def search(self, vector, k):
+        docs = self.store.similarity_search_with_score_by_vector(vector, k=k)
+        return [doc.metadata["chunk_id"] for doc, _ in docs]
+
+
+class ChromaBackend:
+    def __init__(self, path, collection_name):
+        self.path = path
+        self.collection_name = collection_name
+        self.collection = None
+
+    def load(self):
+        # Without this the client of the build would be reused and nothing read from disk
+        SharedSystemClient.clear_system_cache()
+        self.collection = chromadb.PersistentClient(path=self.path).get_collection(self.collection_name)
+
+    def search(self, vector, k):
+        return self.collection.query(query_embeddings=[vector], n_results=k, include=[])["ids"][0]
+
+
+def build_backends(corpus, target_names, index_types, out_dir, ids, texts, vectors, metadatas, embeddings,
+                   batch_size=256):
+    """Write every backend to out_dir and return {name: (backend, build_s)}"""
+    backends = {}
+    for name in target_names:
+        kind, _, collection_name, space = TARGETS[corpus][name]
+        path = os.path.join(out_dir, name)
+        started = time.perf_counter()
+        if kind == "faiss":
+            target = FaissTarget(path, embeddings)
+        else:
+            target = ChromaTarget(path, collection_name, space)
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            target.add(texts[start:end], vectors[start:end], metadatas[start:end], ids[start:end])
+        target.finish()
+        if kind == "chroma":
+            backends[name] = (ChromaBackend(path, collection_name), time.perf_counter() - started)
+            continue
+        build_s = time.perf_counter() - started
+        for index_type in index_types:
+            if index_type == "flat":
+                backends[name] = (FaissBackend(path, embeddings), build_s)
+                continue
+            variant = f"{name}:{index_type}"
+            variant_path = os.path.join(out_dir, variant.replace(":", "-"))
+            started = time.perf_counter()
+            params = compress_vectorstore(target.store, embeddings, index_type)
+            save_faiss(target.store, variant_path, params)
+            backends[variant] = (FaissBackend(variant_path, embeddings), build_s + time.perf_counter() - started)
+    return backends
+
+
+def measure(backend, query_vectors, truth_ids, k, repeat, threads):
+    started = time.perf_counter()
+    backend.load()
+    # Chroma reads its HNSW segment lazily, so the first query is part of loading
+    backend.search(query_vectors[0], k)
+    load_s = time.perf_counter() - started
+
+    hits = 0
+    for vector, expected in zip(query_vectors, truth_ids):
+        hits += len(set(backend.search(vector, k)) & set(expected))
+    recall = hits / (len(query_vectors) * k)
+
+    latencies = []
+    for _ in range(repeat):
+        for vector in query_vectors:
+            start = time.perf_counter()
+            backend.search(vector, k)
+            latencies.append(time.perf_counter() - start)
+    p50, p95, p99 = (float(np.percentile(latencies, p)) * 1000 for p in (50, 95, 99))
+
+    qps = {}
+    workload = query_vectors * repeat
+    for n in threads:
+        with ThreadPoolExecutor(max_workers=n) as pool:
+            start = time.perf_counter()
+            list(pool.map(lambda vector: backend.search(vector, k), workload))
+            qps[str(n)] = len(workload) / (time.perf_counter() - start)
+
+    return {
+        f"recall@{k}": round(recall, 4),
+        "latency_ms": {"p50": round(p50, 3), "p95": round(p95, 3), "p99": round(p99, 3)},
+        "qps": {n: round(value, 1) for n, value in qps.items()},
+        "size_bytes": directory_size(backend.path),
+        "load_s": round(load_s, 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark recall and latency of the FAISS and Chroma stores")
+    parser.add_argument("--corpus", choices=sorted(TARGETS), default="books")
+    parser.add_argument("--targets", default=None,
+                        help="comma-separated backends from build_indexes.py (default: all for the corpus)")
+    parser.add_argument("--faiss-index-types", default="flat",
+                        help=f"comma-separated index types for FAISS backends ({', '.join(INDEX_TYPES)})")
+    parser.add_argument("--queries", default=None,
+                        help="file with one query per line (default: the built-in set for the corpus)")
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=20, help="passes over the query set per measurement")
+    parser.add_argument("--threads", default="1,4,8", help="comma-separated thread counts for QPS")
+    parser.add_argument("--token-chunks", action="store_true", help="benchmark token-sized chunks")
+    parser.add_argument("--batch-size", type=int, default=256,
+                        help="chunks per batch, as passed to build_indexes.py")
+    parser.add_argument("--work-dir", default=None, help="keep the built stores here (default: a temp dir)")
+    parser.add_argument("--output", default=None, help="write the JSON results to this file")
+    args = parser.parse_args()
+
+    available = TARGETS[args.corpus]
+    target_names = args.targets.split(",") if args.targets else list(available)
+    unknown = [name for name in target_names if name not in available]
+    if unknown:
+        parser.error(f"unknown targets for {args.corpus}: {', '.join(unknown)} "
+                     f"(choose from {', '.join(available)})")
+    index_types = args.faiss_index_types.split(",")
+    unknown = [t for t in index_types if t not in INDEX_TYPES]
+    if unknown:
+        parser.error(f"unknown index types: {', '.join(unknown)} (choose from {', '.join(INDEX_TYPES)})")
+    threads = [int(n) for n in args.threads.split(",")]
+
+    if args.queries:
+        with open(args.queries, "r", encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        queries = QUERIES[args.corpus]
+
+    embeddings = CachedEmbeddings(BucketedEmbeddings(HuggingFaceEmbeddings(
+        model_name="all-MiniLM-L6-v2",
+        model_kwargs={'device': 'cpu'},
+        encode_kwargs={'normalize_embeddings': True}
+    )))
+    ids, texts, metadatas = load_chunks(args.corpus, args.token_chunks, args.batch_size)
+    print(f"[+] {len(ids)} chunks, {len(queries)} queries")
+    vectors = embeddings.embed_documents(texts)
+    query_vectors = [embeddings.embed_query(q) for q in queries]
+    k = min(args.k, len(ids))
+    truth = exact_neighbours(np.asarray(vectors, dtype=np.float32), np.asarray(query_vectors, dtype=np.float32), k)
+    truth_ids = [[ids[i] for i in row] for row in truth]
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="bench-retrieval-")
+    try:
+        backends = build_backends(args.corpus, target_names, index_types, work_dir,
+                                  ids, texts, vectors, metadatas, embeddings, batch_size=args.batch_size)
+        results = {}
+        for name, (backend, build_s) in backends.items():
+            results[name] = {**measure(backend, query_vectors, truth_ids, k, args.repeat, threads),
+                             "build_s": round(build_s, 3)}
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"{'backend':<22} {'recall':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          + " ".join(f"{'qps@' + str(n):>9}" for n in threads) + f" {'size MB':>8} {'load s':>7}")
+    for name, r in results.items():
+        print(f"{name:<22} {r[f'recall@{k}']:>7.3f} {r['latency_ms']['p50']:>8.3f} "
+              f"{r['latency_ms']['p95']:>8.3f} {r['latency_ms']['p99']:>8.3f} "
+              + " ".join(f"{r['qps'][str(n)]:>9.1f}" for n in threads)
+              + f" {r['size_bytes'] / 1e6:>8.2f} {r['load_s']:>7.3f}")
+
+    report = {
+        "corpus": args.corpus,
+        "k": k,
+        "chunks": len(ids),
+        "queries": queries,
+        "repeat": args.repeat,
+        "token_chunks": args.token_chunks,
+        "machine": {"platform": platform.platform(), "cpus": os.cpu_count()},
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "backends": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"[+] Results written to {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
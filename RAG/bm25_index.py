@@ -0,0 +1,211 @@
+#!/usr/bin/python3
+"""Compact on-disk BM25 inverted index, written next to the vector stores.
+
+Exact terms ("CCNA", "Django", "Hashcat") are where MiniLM embeddings are
+weakest, so every store built at ingest also gets a bm25/ directory:
+
+    header.json         document count, average length and the k1/b used
+    ids.npy             document id of each row, fixed-width bytes
+    terms.npy           the vocabulary, sorted, fixed-width utf-8 bytes
+    term_starts.npy     where each term's postings start (terms + 1)
+    post_rows.npy       int32 row of each posting, grouped by term
+    post_scores.npy     float32 BM25 contribution of the term to that row
+
+Scores are computed at build time, so a query only looks its terms up in the
+mapped vocabulary (binary search), reads their posting slices and sums them.
+That touches the postings of the query terms and nothing else, which keeps a
+lookup well under a millisecond for CV-sized corpora.
+
+For FAISS folders the rows are the index positions and the ids the docstore
+ids. Chroma stores keep theirs in bm25_<collection>/ inside the persist
+directory.
+"""
+import json
+import os
+import re
+import shutil
+import uuid
+from array import array
+from collections import Counter
+
+import numpy as np
+
+BM25_DIR = "bm25"
+FORMAT_VERSION = 1
+SPILL_BLOCK = 1 << 20  # Postings sorted into place per block when the index is closed
+MAX_TERM_LENGTH = 64  # Longer tokens are noise (URLs, hashes) and would widen terms.npy
+# Keeps skill names like c++, c#, node.js and scikit-learn in one token
+_TOKEN = re.compile(r"[0-9a-z][0-9a-z+#]*(?:[.\-][0-9a-z+#]+)*")
+
+
+def tokenize(text):
+    return [t for t in _TOKEN.findall(text.lower()) if len(t) <= MAX_TERM_LENGTH]
+
+
+def chroma_bm25_dir(persist_directory, collection_name):
+    return os.path.join(persist_directory, f"{BM25_DIR}_{collection_name}")
+
+
+def has_bm25(path):
+    return os.path.exists(os.path.join(path, "header.json"))
+
+
+class BM25Writer:
+    """Build a BM25 index batch by batch, holding only the vocabulary and doc lengths.
+
+    add() tokenizes a batch and appends its (term, row, tf) postings to a spill
+    file; close() computes the final scores and lays the postings out by term
+    with a counting sort over that file, a block at a time. Memory therefore
+    grows with the vocabulary and one int per document, never with the text.
+    Like the docstore, the directory is filled beside the old one and swapped
+    in by rename, so running readers keep a consistent copy.
+    """
+
+    def __init__(self, path, k1=1.2, b=0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.count = 0
+        self._terms = {}  # term -> number in order of first appearance
+        self._df = []  # documents containing each term, by term number
+        self._lengths = array("i")
+        self._id_width = 1
+        self._tmp = f"{path.rstrip(os.sep)}.tmp-{uuid.uuid4().hex[:8]}"
+        os.makedirs(self._tmp)
+        self._ids_file = open(os.path.join(self._tmp, "ids.txt"), "w", encoding="utf-8")
+        self._spill = open(os.path.join(self._tmp, "postings.bin"), "wb")
+
+    def add(self, ids, texts):
+        """Index texts as the next rows, ids[i] being the document id of texts[i]"""
+        postings = array("i")
+        for doc_id, text in zip(ids, texts):
+            counts = Counter(tokenize(text))
+            for term, tf in counts.items():
+                number = self._terms.get(term)
+                if number is None:
+                    number = self._terms[term] = len(self._df)
+                    self._df.append(0)
+                self._df[number] += 1
+                postings.extend((number, self.count, tf))
+            self._lengths.append(sum(counts.values()))
+            encoded = doc_id.encode("utf-8")
+            self._id_width = max(self._id_width, len(encoded))
+            self._ids_file.write(doc_id + "\n")
+            self.count += 1
+        postings.tofile(self._spill)
+
+    def close(self):
+        """Write the index files and swap the directory in at path"""
+        self._ids_file.close()
+        self._spill.close()
+        tmp = self._tmp
+        try:
+            lengths = np.frombuffer(self._lengths, dtype=np.int32) if self.count else np.zeros(0, np.int32)
+            avgdl = float(lengths.mean()) if self.count and lengths.sum() else 1.0
+            terms = sorted(self._terms)
+            df = np.array(self._df, dtype=np.int64)
+            rank = np.empty(len(terms), dtype=np.int64)  # term number -> position in terms
+            rank[[self._terms[t] for t in terms]] = np.arange(len(terms))
+            sorted_df = np.zeros(len(terms), dtype=np.int64)
+            sorted_df[rank] = df
+            starts = np.zeros(len(terms) + 1, dtype=np.int64)
+            np.cumsum(sorted_df, out=starts[1:])
+            idf = np.log(1 + (self.count - sorted_df + 0.5) / (sorted_df + 0.5))
+
+            rows = np.lib.format.open_memmap(os.path.join(tmp, "post_rows.npy"), mode="w+",
+                                             dtype=np.int32, shape=(int(starts[-1]),))
+            scores = np.lib.format.open_memmap(os.path.join(tmp, "post_scores.npy"), mode="w+",
+                                               dtype=np.float32, shape=(int(starts[-1]),))
+            spill_path = os.path.join(tmp, "postings.bin")
+            if starts[-1]:
+                spill = np.memmap(spill_path, dtype=np.int32, mode="r").reshape(-1, 3)
+                cursor = starts[:-1].copy()
+                for block in range(0, len(spill), SPILL_BLOCK):
+                    chunk = np.asarray(spill[block:block + SPILL_BLOCK])
+                    term_ranks = rank[chunk[:, 0]]
+                    # Stable, so each term's rows stay in ascending order
+                    order = np.argsort(term_ranks, kind="stable")
+                    term_ranks, row, tf = term_ranks[order], chunk[order, 1], chunk[order, 2].astype(np.float64)
+                    unique, first, counts = np.unique(term_ranks, return_index=True, return_counts=True)
+                    positions = cursor[term_ranks] + np.arange(len(term_ranks)) - np.repeat(first, counts)
+                    cursor[unique] += counts
+                    dl = lengths[row]
+                    rows[positions] = row
+                    scores[positions] = idf[term_ranks] * tf * (self.k1 + 1) / (
+                        tf + self.k1 * (1 - self.b + self.b * dl / avgdl))
+                del spill
+            rows.flush()
+            scores.flush()
+            del rows, scores
+            os.remove(spill_path)
+
+            ids = np.lib.format.open_memmap(os.path.join(tmp, "ids.npy"), mode="w+",
+                                            dtype=f"S{self._id_width}", shape=(self.count,))
+            with open(os.path.join(tmp, "ids.txt"), "r", encoding="utf-8") as f:
+                for row, line in enumerate(f):
+                    ids[row] = line[:-1].encode("utf-8")
+            ids.flush()
+            del ids
+            os.remove(os.path.join(tmp, "ids.txt"))
+            np.save(os.path.join(tmp, "terms.npy"), np.array([t.encode("utf-8") for t in terms], dtype=bytes))
+            np.save(os.path.join(tmp, "term_starts.npy"), starts)
+            with open(os.path.join(tmp, "header.json"), "w") as f:
+                json.dump({"version": FORMAT_VERSION, "count": self.count, "avgdl": avgdl,
+                           "k1": self.k1, "b": self.b}, f)
+            old = None
+            if os.path.exists(self.path):
+                old = f"{self.path.rstrip(os.sep)}.old-{uuid.uuid4().hex[:8]}"
+                os.rename(self.path, old)
+            os.rename(tmp, self.path)
+        finally:
+            if os.path.exists(tmp):
+                shutil.rmtree(tmp)
+        if old:
+            shutil.rmtree(old)
+
+
+def write_bm25(path, ids, texts, k1=1.2, b=0.75):
+    """Build the index for ids/texts (row i is ids[i]) into the directory path"""
+    writer = BM25Writer(path, k1=k1, b=b)
+    writer.add(ids, texts)
+    writer.close()
+
+
+class BM25Index:
+    """Read-only, memory-mapped view of a directory written by write_bm25."""
+
+    def __init__(self, path):
+        with open(os.path.join(path, "header.json")) as f:
+            header = json.load(f)
+        if header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported BM25 index version {header.get('version')} in {path}")
+        self.path = path
+        self.count = header["count"]
+        self._ids = np.load(os.path.join(path, "ids.npy"), mmap_mode="r")
+        self._terms = np.load(os.path.join(path, "terms.npy"), mmap_mode="r")
+        self._starts = np.load(os.path.join(path, "term_starts.npy"), mmap_mode="r")
+        self._rows = np.load(os.path.join(path, "post_rows.npy"), mmap_mode="r")
+        self._scores = np.load(os.path.join(path, "post_scores.npy"), mmap_mode="r")
+
+    def _postings(self, term):
+        key = term.encode("utf-8")
+        i = int(np.searchsorted(self._terms, key))
+        if i < len(self._terms) and self._terms[i] == key:
+            return slice(int(self._starts[i]), int(self._starts[i + 1]))
+        return None
+
+    def search_rows(self, query, k=10):
+        """Top-k (row, score) for query, best first"""
+        slices = [s for s in map(self._postings, set(tokenize(query))) if s is not None]
+        if not slices:
+            return []
+        rows = np.concatenate([self._rows[s] for s in slices])
+        scores = np.concatenate([self._scores[s] for s in slices])
+        unique, inverse = np.unique(rows, return_inverse=True)
+        totals = np.bincount(inverse, weights=scores)
+        top = np.argsort(-totals, kind="stable")[:k]
+        return [(int(unique[i]), float(totals[i])) for i in top]
+
+    def search(self, query, k=10):
+        """Top-k (document id, score) for query, best first"""
+        return [(self._ids[row].decode("utf-8"), score) for row, score in self.search_rows(query, k)]
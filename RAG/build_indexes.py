@@ -0,0 +1,244 @@
+#!/usr/bin/python3
+"""Build FAISS and Chroma stores for one corpus from a single embedding pass.
+
+The corpus is loaded, split, deduplicated and embedded once, and every batch
+of vectors is written to each requested target. All targets therefore hold
+exactly the same chunks under the same ids (also kept in the chunk_id
+metadata), and nothing is embedded more than once per run.
+
+The CV chunks go to their own "cv_chunks" collection: "cv_collection" in the
+same directory belongs to meta_cv_rag.py, which stores one document per CV.
+
+    python build_indexes.py --corpus books --targets faiss,chroma,chroma_meta
+    python build_indexes.py --corpus cvs --targets faiss,chroma
+"""
+import argparse
+import hashlib
+import os
+import sys
+import time
+
+import chromadb
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_community.vectorstores import FAISS
+from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from adaptive_batching import BucketedEmbeddings
+from bm25_index import BM25Writer, chroma_bm25_dir
+from chunk_dedup import Deduplicator, add_aliases, dedup_documents
+from faiss_index import save_faiss
+from streaming_splitter import StreamingCharacterTextSplitter, batched
+from token_splitter import MiniLMTokenSplitter
+from vector_cache import CachedEmbeddings
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+db_dir = os.path.join(current_dir, "db")
+books_dir = os.path.join(current_dir, "books")
+cv_project_dir = os.path.join(os.path.dirname(current_dir), "CV RAG Project")
+
+# target name -> (backend, persistent directory, collection name, hnsw space)
+TARGETS = {
+    "books": {
+        "faiss": ("faiss", os.path.join(db_dir, "faiss_db"), None, None),
+        "chroma": ("chroma", os.path.join(db_dir, "chroma_db"), "langchain", "l2"),
+        "chroma_meta": ("chroma", os.path.join(db_dir, "chroma_db_with_metadata"), "langchain", "l2"),
+    },
+    "cvs": {
+        "faiss": ("faiss", os.path.join(cv_project_dir, "faiss_index"), None, None),
+        "chroma": ("chroma", os.path.join(cv_project_dir, "chroma_db"), "cv_chunks", "cosine"),
+    },
+}
+
+
+def chunk_id(doc):
+    """Deterministic id for a chunk, identical in every target"""
+    key = f"{doc.metadata.get('source')}:{doc.metadata.get('start_index')}:{doc.page_content}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def iter_book_chunks(token_chunks=False):
+    """Stream every book in books/ through the shared splitter"""
+    if not os.path.exists(books_dir):
+        raise FileNotFoundError(
+            f"The directory: {books_dir} does not exist. Please check the path"
+        )
+    if token_chunks:
+        text_splitter = MiniLMTokenSplitter(overlap_tokens=50)
+    else:
+        text_splitter = StreamingCharacterTextSplitter(chunk_size=1000, chunk_overlap=200, separator="\n")
+    for book_file in sorted(f for f in os.listdir(books_dir) if f.endswith(".txt")):
+        yield from text_splitter.split_file(
+            os.path.join(books_dir, book_file), metadata={"source": book_file}
+        )
+
+
+def iter_cv_chunks(token_chunks=False):
+    """Load each CV with its candidate metadata and split it like create_vector.py does"""
+    sys.path.append(cv_project_dir)
+    from create_vector import attach_candidate_info
+
+    pdfs_dir = os.path.join(cv_project_dir, "cvs")
+    if token_chunks:
+        text_splitter = MiniLMTokenSplitter(overlap_tokens=50)
+    else:
+        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200, add_start_index=True)
+    for filename in sorted(f for f in os.listdir(pdfs_dir) if f.endswith(".pdf")):
+        try:
+            pages = PyPDFLoader(os.path.join(pdfs_dir, filename)).load()
+        except Exception as e:
+            print(f"Error processing {filename}: {str(e)}")
+            continue
+        attach_candidate_info(pages, filename)
+        # Deduplicate per CV, as create_vector.py does
+        chunks, _ = dedup_documents(text_splitter.split_documents(pages))
+        yield from chunks
+
+
+def iter_chunk_batches(corpus, dedup, batch_size=256, token_chunks=False):
+    """(ids, texts, metadatas) for every batch of the corpus that build() writes.
+
+    Book chunks go through dedup (one Deduplicator for the whole corpus) a batch
+    at a time, which knows each kept chunk by its chunk_id; CV chunks were
+    already deduplicated per CV by iter_cv_chunks.
+    """
+    chunks = iter_book_chunks(token_chunks) if corpus == "books" else iter_cv_chunks(token_chunks)
+    for batch in batched(chunks, batch_size):
+        for doc in batch:
+            doc.id = chunk_id(doc)
+        if corpus == "books":
+            batch, _ = dedup.dedup(batch)
+            if not batch:
+                continue
+        ids = [doc.id for doc in batch]
+        yield ids, [doc.page_content for doc in batch], [{**doc.metadata, "chunk_id": doc_id}
+                                                         for doc, doc_id in zip(batch, ids)]
+
+
+def _chroma_metadata(metadata):
+    """Chroma only accepts str/int/float/bool metadata values"""
+    return {k: v for k, v in metadata.items() if isinstance(v, (str, int, float, bool))}
+
+
+class FaissTarget:
+    def __init__(self, path, embeddings):
+        self.path = path
+        self.embeddings = embeddings
+        self.store = None
+
+    def add(self, texts, vectors, metadatas, ids):
+        text_embeddings = list(zip(texts, vectors))
+        if self.store is None:
+            self.store = FAISS.from_embeddings(text_embeddings, self.embeddings, metadatas=metadatas, ids=ids)
+        else:
+            self.store.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+
+    def add_aliases(self, late_aliases):
+        """Record duplicates dropped after their kept chunk's batch was written"""
+        for doc_id, aliases in late_aliases.items():
+            add_aliases(self.store.docstore.search(doc_id).metadata, aliases)
+
+    def finish(self):
+        if self.store is None:
+            return
+        save_faiss(self.store, self.path)
+        # A manifest from create_vector.py would point at ids that no longer exist
+        manifest_path = os.path.join(self.path, "manifest.json")
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+
+
+class ChromaTarget:
+    def __init__(self, path, collection_name, space):
+        # Postings are spilled to disk as batches arrive, so no text is kept here
+        self.bm25 = BM25Writer(chroma_bm25_dir(path, collection_name))
+        client = chromadb.PersistentClient(path=path)
+        try:
+            client.delete_collection(collection_name)
+        except Exception:
+            pass  # Collection didn't exist
+        self.collection = client.create_collection(
+            name=collection_name, metadata={"hnsw:space": space}
+        )
+
+    def add(self, texts, vectors, metadatas, ids):
+        # Vectors are passed in, so Chroma never runs an embedding function here
+        self.collection.upsert(
+            ids=ids, embeddings=vectors, documents=texts,
+            metadatas=[_chroma_metadata(m) for m in metadatas]
+        )
+        self.bm25.add(ids, texts)
+
+    def add_aliases(self, late_aliases, batch_size=256):
+        """Record duplicates dropped after their kept chunk's batch was written"""
+        doc_ids = list(late_aliases)
+        for start in range(0, len(doc_ids), batch_size):
+            found = self.collection.get(ids=doc_ids[start:start + batch_size], include=["metadatas"])
+            for doc_id, metadata in zip(found["ids"], found["metadatas"]):
+                add_aliases(metadata, late_aliases[doc_id])
+            self.collection.update(ids=found["ids"], metadatas=found["metadatas"])
+
+    def finish(self):
+        self.bm25.close()
+
+
+def build(corpus, target_names, batch_size=256, token_chunks=False):
+    """Embed the corpus once and write every batch to each target"""
+    # MiniLM already returns unit vectors, so one normalized pass serves every store
+    embeddings = CachedEmbeddings(BucketedEmbeddings(HuggingFaceEmbeddings(
+        model_name="all-MiniLM-L6-v2",
+        model_kwargs={'device': 'cpu'},
+        encode_kwargs={'normalize_embeddings': True}
+    )))
+
+    targets = {}
+    for name in target_names:
+        backend, path, collection_name, space = TARGETS[corpus][name]
+        if backend == "faiss":
+            targets[name] = FaissTarget(path, embeddings)
+        else:
+            targets[name] = ChromaTarget(path, collection_name, space)
+
+    started = time.perf_counter()
+    num_chunks = 0
+    # One dedup state for the whole corpus, so repeats across batches are caught too
+    dedup = Deduplicator()
+    for ids, texts, metadatas in iter_chunk_batches(corpus, dedup, batch_size, token_chunks):
+        vectors = embeddings.embed_documents(texts)
+        for target in targets.values():
+            target.add(texts, vectors, metadatas, ids)
+        num_chunks += len(ids)
+    num_dropped = dedup.stats["exact"] + dedup.stats["near"]
+
+    for target in targets.values():
+        if dedup.late_aliases:
+            target.add_aliases(dedup.late_aliases)
+        target.finish()
+
+    print(f"[+] Wrote {num_chunks} chunks ({num_dropped} duplicates dropped) to "
+          f"{', '.join(target_names)} in {time.perf_counter() - started:.1f}s")
+    print(f"Embedding cache: {embeddings.cache.hits} hits, {embeddings.cache.misses} misses")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embed a corpus once and write it to several vector stores")
+    parser.add_argument("--corpus", choices=sorted(TARGETS), default="books")
+    parser.add_argument("--targets", default=None,
+                        help="comma-separated targets (default: all for the corpus)")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--token-chunks", action="store_true",
+                        help="size chunks in model tokens so none exceed MiniLM's 256-token window")
+    args = parser.parse_args()
+
+    available = TARGETS[args.corpus]
+    target_names = args.targets.split(",") if args.targets else list(available)
+    unknown = [name for name in target_names if name not in available]
+    if unknown:
+        parser.error(f"unknown targets for {args.corpus}: {', '.join(unknown)} "
+                     f"(choose from {', '.join(available)})")
+
+    build(args.corpus, target_names, batch_size=args.batch_size, token_chunks=args.token_chunks)
+
+
+if __name__ == "__main__":
+    main()
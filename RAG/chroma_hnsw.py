@@ -0,0 +1,226 @@
+#!/usr/bin/python3
+"""HNSW build/search parameters and auto-tuning for Chroma collections.
+
+Chroma reads its HNSW settings from collection metadata when the collection
+is created. hnsw_metadata builds that dict:
+
+    hnsw:space            distance ("cosine", "l2" or "ip")
+    hnsw:M                graph neighbours per node (memory, recall)
+    hnsw:construction_ef  candidate list size while building (build time, recall)
+    hnsw:search_ef        candidate list size while querying (latency, recall)
+
+M and construction_ef are fixed once a collection exists. The auto-tune
+command therefore sweeps the grid on throwaway in-memory copies of the
+collection's vectors. It measures recall@k against exact search and the
+p95 latency of single queries over a held-out query set. It keeps the
+setting that meets the recall target at the lowest p95, then recreates the
+collection under those parameters from its stored embeddings, so nothing
+is re-embedded.
+
+    python chroma_hnsw.py --path "../CV RAG Project/chroma_db" --collection cv_collection
+"""
+import argparse
+import itertools
+import time
+import uuid
+
+import chromadb
+import numpy as np
+
+HNSW_KEYS = ("hnsw:M", "hnsw:construction_ef", "hnsw:search_ef")
+DEFAULT_GRID = {
+    "M": (8, 16, 32),
+    "construction_ef": (64, 128, 256),
+    "search_ef": (10, 20, 40, 80, 160),
+}
+COPY_BATCH_SIZE = 1000
+
+
+class _StoredVectorsOnly(chromadb.EmbeddingFunction):
+    """Stands in for a collection's custom embedding function while it is rebuilt.
+
+    Chroma records custom functions as "legacy" in the collection
+    configuration, and refuses to reopen the collection with one if the rebuilt
+    copy records a different function. The rebuild only copies stored vectors,
+    so this is never called.
+    """
+
+    def __init__(self):
+        pass
+
+    def __call__(self, input):
+        raise RuntimeError("collection rebuilds only copy stored embeddings")
+
+
+def hnsw_metadata(space="cosine", M=None, construction_ef=None, search_ef=None, metadata=None):
+    """Collection metadata with the given HNSW parameters (None keeps Chroma's default)"""
+    result = dict(metadata or {})
+    result["hnsw:space"] = space
+    for key, value in zip(HNSW_KEYS, (M, construction_ef, search_ef)):
+        if value is not None:
+            result[key] = value
+    return result
+
+
+def collection_hnsw_params(collection):
+    """HNSW parameters a collection was created with, as hnsw_metadata keyword arguments"""
+    config = (collection.configuration or {}).get("hnsw") or {}
+    metadata = collection.metadata or {}
+    return {
+        "space": metadata.get("hnsw:space", config.get("space", "l2")),
+        "M": metadata.get("hnsw:M", config.get("max_neighbors")),
+        "construction_ef": metadata.get("hnsw:construction_ef", config.get("ef_construction")),
+        "search_ef": metadata.get("hnsw:search_ef", config.get("ef_search")),
+    }
+
+
+def _exact_neighbours(vectors, queries, k, space):
+    if space == "cosine":
+        vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+        scores = -queries @ vectors.T
+    elif space == "ip":
+        scores = -queries @ vectors.T
+    else:
+        scores = (queries ** 2).sum(1)[:, None] - 2 * queries @ vectors.T + (vectors ** 2).sum(1)[None, :]
+    return np.argsort(scores, axis=1)[:, :k]
+
+
+def _trial(ids, vectors, queries, truth, k, space, M, construction_ef, search_efs):
+    """Build one in-memory collection and measure every search_ef on it"""
+    client = chromadb.EphemeralClient()
+    name = f"tune-{uuid.uuid4().hex[:12]}"
+    collection = client.create_collection(name=name, metadata=hnsw_metadata(space, M, construction_ef))
+    for start in range(0, len(ids), COPY_BATCH_SIZE):
+        collection.add(ids=ids[start:start + COPY_BATCH_SIZE],
+                       embeddings=vectors[start:start + COPY_BATCH_SIZE].tolist())
+    position = {doc_id: i for i, doc_id in enumerate(ids)}
+
+    results = []
+    for search_ef in search_efs:
+        collection.modify(configuration={"hnsw": {"ef_search": search_ef}})
+        latencies, hits = [], 0
+        for query, expected in zip(queries, truth):
+            start = time.perf_counter()
+            found = collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])
+            latencies.append(time.perf_counter() - start)
+            hits += len({position[i] for i in found["ids"][0]} & set(expected.tolist()))
+        results.append({
+            "M": M, "construction_ef": construction_ef, "search_ef": search_ef,
+            "recall": hits / (len(queries) * k),
+            "p95_ms": float(np.percentile(latencies, 95)) * 1000,
+        })
+    client.delete_collection(name)
+    return results
+
+
+def auto_tune(collection, query_embeddings=None, k=5, target_recall=0.95, grid=None,
+              num_queries=100, seed=0):
+    """Sweep M, construction_ef and search_ef and return (best, all_results).
+
+    Without query_embeddings, num_queries stored vectors are held out of the
+    trial collections and used as queries.
+    """
+    grid = {**DEFAULT_GRID, **(grid or {})}
+    space = collection_hnsw_params(collection)["space"]
+    stored = collection.get(include=["embeddings"])
+    ids = list(stored["ids"])
+    vectors = np.asarray(stored["embeddings"], dtype=np.float32)
+
+    if query_embeddings is None:
+        rng = np.random.default_rng(seed)
+        held_out = rng.choice(len(ids), size=min(num_queries, len(ids) // 5 or 1), replace=False)
+        keep = np.setdiff1d(np.arange(len(ids)), held_out)
+        queries = vectors[held_out]
+        ids, vectors = [ids[i] for i in keep], vectors[keep]
+    else:
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+    k = min(k, len(ids))
+    truth = _exact_neighbours(vectors, queries, k, space)
+
+    results = []
+    for M, construction_ef in itertools.product(grid["M"], grid["construction_ef"]):
+        results.extend(_trial(ids, vectors, queries, truth, k, space, M, construction_ef, grid["search_ef"]))
+
+    passing = [r for r in results if r["recall"] >= target_recall]
+    if passing:
+        best = min(passing, key=lambda r: (r["p95_ms"], r["M"], r["construction_ef"]))
+    else:
+        # Nothing reaches the target; take the highest recall
+        best = max(results, key=lambda r: (r["recall"], -r["p95_ms"]))
+    return best, results
+
+
+def recreate_collection(client, name, metadata, embedding_function=None):
+    """Rebuild a collection under new metadata from its stored embeddings.
+
+    The rebuilt collection keeps the embedding function recorded in the
+    original's configuration unless embedding_function is given.
+    """
+    old = client.get_collection(name)
+    data = old.get(include=["embeddings", "documents", "metadatas"])
+    temp_name = f"{name}-rebuild-{uuid.uuid4().hex[:8]}"
+    if embedding_function is None:
+        recorded = (old.configuration_json or {}).get("embedding_function") or {}
+        embedding_function = _StoredVectorsOnly() if recorded.get("type") == "legacy" else old._embedding_function
+    kwargs = {"embedding_function": embedding_function}
+
+    # Fill a new collection first so a failure never leaves the old one half-copied
+    temp = client.create_collection(name=temp_name, metadata=metadata, **kwargs)
+    for start in range(0, len(data["ids"]), COPY_BATCH_SIZE):
+        end = start + COPY_BATCH_SIZE
+        temp.add(ids=data["ids"][start:end], embeddings=data["embeddings"][start:end],
+                 documents=data["documents"][start:end], metadatas=data["metadatas"][start:end])
+    client.delete_collection(name)
+    temp.modify(name=name)
+    return temp
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Auto-tune HNSW parameters of a Chroma collection")
+    parser.add_argument("--path", required=True, help="Chroma persist directory")
+    parser.add_argument("--collection", default="langchain")
+    parser.add_argument("--queries", default=None,
+                        help="file with one held-out query per line (default: hold out stored vectors)")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="embedding model for --queries")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--target-recall", type=float, default=0.95)
+    parser.add_argument("--dry-run", action="store_true", help="only print the recommendation")
+    args = parser.parse_args()
+
+    client = chromadb.PersistentClient(path=args.path)
+    collection = client.get_collection(args.collection)
+    print(f"[+] {collection.count()} vectors, current parameters {collection_hnsw_params(collection)}")
+
+    query_embeddings = None
+    if args.queries:
+        from langchain_huggingface import HuggingFaceEmbeddings
+        with open(args.queries, "r", encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+        query_embeddings = HuggingFaceEmbeddings(model_name=args.model).embed_documents(queries)
+
+    best, results = auto_tune(collection, query_embeddings, k=args.k, target_recall=args.target_recall)
+    print(f"{'M':>4} {'c_ef':>5} {'s_ef':>5} {'recall':>7} {'p95 ms':>8}")
+    for r in results:
+        marker = " <-" if r is best else ""
+        print(f"{r['M']:>4} {r['construction_ef']:>5} {r['search_ef']:>5} "
+              f"{r['recall']:>7.3f} {r['p95_ms']:>8.2f}{marker}")
+    if best["recall"] < args.target_recall:
+        print(f"[!] No setting reached recall {args.target_recall}; recommending the highest recall")
+
+    if args.dry_run:
+        return
+    metadata = {k: v for k, v in (collection.metadata or {}).items()
+                if not k.startswith("hnsw:") and not k.startswith("tuned:")}
+    metadata = hnsw_metadata(collection_hnsw_params(collection)["space"], best["M"],
+                             best["construction_ef"], best["search_ef"], metadata=metadata)
+    # Keep a record of what the setting achieved
+    metadata.update({"tuned:recall": round(best["recall"], 4), "tuned:p95_ms": round(best["p95_ms"], 3),
+                     "tuned:k": args.k})
+    recreate_collection(client, args.collection, metadata)
+    print(f"[+] Recreated {args.collection} with M={best['M']}, construction_ef={best['construction_ef']}, "
+          f"search_ef={best['search_ef']}")
+
+
+if __name__ == "__main__":
+    main()
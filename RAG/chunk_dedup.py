@@ -0,0 +1,178 @@
+#!/usr/bin/python3
+"""Exact and near-duplicate chunk elimination before embedding.
+
+Overlapping splits, repeated page headers/footers and re-uploaded files leave
+many chunks that are identical or almost identical. A Deduplicator keeps the
+first occurrence of each across a whole stream of batches, and drops the rest
+before they are embedded (dedup_documents does the same for a single list):
+
+- exact duplicates are caught by hashing the whitespace/case-normalized text;
+- near duplicates are caught with MinHash signatures over word shingles,
+  bucketed with LSH so each chunk is only compared with likely matches.
+
+Every dropped chunk is recorded on the chunk that was kept, in its "aliases"
+metadata (a "; "-separated string so it is valid for both FAISS and Chroma)
+and its "duplicate_count". When the kept chunk came in an earlier batch, the
+alias waits in Deduplicator.late_aliases for the caller to add to the stored
+chunk with add_aliases.
+"""
+import hashlib
+import zlib
+
+import numpy as np
+
+_PRIME = (1 << 31) - 1  # a*x + b stays below 2**63 for 31-bit a, b and x
+
+
+def _normalize(text):
+    return " ".join(text.lower().split())
+
+
+def _shingle_hashes(words, shingle_size):
+    if len(words) <= shingle_size:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)}
+    return np.fromiter((zlib.crc32(s.encode("utf-8")) % _PRIME for s in shingles),
+                       dtype=np.uint64, count=len(shingles))
+
+
+def _alias(metadata):
+    """Short description of where a dropped chunk came from"""
+    alias = str(metadata.get("source", "unknown"))
+    if "page" in metadata:
+        alias += f" p{metadata['page']}"
+    if "start_index" in metadata:
+        alias += f" @{metadata['start_index']}"
+    return alias
+
+
+def chunk_key(doc):
+    """Id a Deduplicator knows a kept chunk by: doc.id, else its source and position"""
+    return doc.id if doc.id is not None else _alias(doc.metadata)
+
+
+def add_aliases(metadata, aliases):
+    """Record the aliases of dropped duplicates on the metadata of the chunk that was kept"""
+    existing = metadata.get("aliases")
+    joined = "; ".join(aliases)
+    metadata["aliases"] = f"{existing}; {joined}" if existing else joined
+    metadata["duplicate_count"] = metadata.get("duplicate_count", 0) + len(aliases)
+
+
+class MinHashLSH:
+    """MinHash signatures with banded locality-sensitive hashing."""
+
+    def __init__(self, num_perm=64, bands=16, shingle_size=5, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.buckets = [{} for _ in range(bands)]
+        self.signatures = []
+
+    def signature(self, normalized_text):
+        hashes = _shingle_hashes(normalized_text.split(" "), self.shingle_size)
+        permuted = (self.a[:, None] * hashes[None, :] + self.b[:, None]) % _PRIME
+        return permuted.min(axis=1)
+
+    def query(self, signature, threshold):
+        """Return the index of an inserted signature with estimated Jaccard >= threshold"""
+        seen = set()
+        for band, buckets in enumerate(self.buckets):
+            key = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            for candidate in buckets.get(key, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                if np.mean(self.signatures[candidate] == signature) >= threshold:
+                    return candidate
+        return None
+
+    def insert(self, signature):
+        index = len(self.signatures)
+        self.signatures.append(signature)
+        for band, buckets in enumerate(self.buckets):
+            key = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            buckets.setdefault(key, []).append(index)
+        return index
+
+
+class Deduplicator:
+    """Dedup state for a stream of chunk batches.
+
+    Keep one instance for the whole corpus and pass it each batch before it is
+    embedded, so a chunk is dropped when it repeats one from any earlier batch,
+    not just its own. Only hashes, MinHash signatures and the id (chunk_key)
+    of each kept chunk are remembered, never the chunks themselves. A dropped
+    chunk's alias goes straight onto its kept copy when that is in the same
+    batch. Earlier batches are already written, so aliases for them collect in
+    late_aliases (kept chunk id -> aliases) for the caller to apply.
+
+    threshold is the estimated Jaccard similarity of word shingles above which
+    two chunks count as near duplicates; pass None to only drop exact copies.
+    """
+
+    def __init__(self, threshold=0.85, num_perm=64, bands=16, shingle_size=5):
+        self.threshold = threshold
+        self.lsh = MinHashLSH(num_perm=num_perm, bands=bands, shingle_size=shingle_size) if threshold else None
+        self.by_hash = {}  # normalized text digest -> kept chunk id
+        self.lsh_owner = []  # LSH signature index -> kept chunk id
+        self.late_aliases = {}  # kept chunk id -> aliases of duplicates from later batches
+        self.stats = {"kept": 0, "exact": 0, "near": 0}
+
+    def dedup(self, docs):
+        """Drop chunks of docs already seen; returns (kept_docs, stats for this batch)"""
+        kept = []
+        batch_owners = {}  # kept chunk id -> metadata, for chunks of this batch
+        stats = {"kept": 0, "exact": 0, "near": 0}
+
+        for doc in docs:
+            normalized = _normalize(doc.page_content)
+            digest = hashlib.sha1(normalized.encode("utf-8")).digest()
+            match = self.by_hash.get(digest)
+            kind = "exact"
+            signature = None
+            if match is None and self.lsh is not None and normalized:
+                signature = self.lsh.signature(normalized)
+                candidate = self.lsh.query(signature, self.threshold)
+                if candidate is not None:
+                    match = self.lsh_owner[candidate]
+                    kind = "near"
+
+            if match is not None:
+                alias = _alias(doc.metadata)
+                if match in batch_owners:
+                    add_aliases(batch_owners[match], [alias])
+                else:
+                    self.late_aliases.setdefault(match, []).append(alias)
+                stats[kind] += 1
+                continue
+
+            key = chunk_key(doc)
+            self.by_hash[digest] = key
+            if signature is not None:
+                self.lsh.insert(signature)
+                self.lsh_owner.append(key)
+            batch_owners[key] = doc.metadata
+            kept.append(doc)
+
+        stats["kept"] = len(kept)
+        for key, value in stats.items():
+            self.stats[key] += value
+        return kept, stats
+
+
+def dedup_documents(docs, threshold=0.85, num_perm=64, bands=16, shingle_size=5):
+    """Drop exact and near-duplicate chunks, keeping the first of each group.
+
+    docs are deduplicated among themselves only; use a Deduplicator to carry
+    the state across batches. Returns (kept_docs, stats) where stats counts
+    kept, exact and near chunks.
+    """
+    return Deduplicator(threshold=threshold, num_perm=num_perm, bands=bands,
+                        shingle_size=shingle_size).dedup(docs)
@@ -1,17 +1,18 @@
 #!/usr/bin/python3
 import os
-from langchain_community.vectorstores import FAISS
 from langchain_huggingface import HuggingFaceEmbeddings  # Updated import
+from embedding_daemon import daemon_or_local
+from faiss_index import load_faiss
 
 # Define paths
 current_dir = os.path.dirname(os.path.abspath(__file__))
 persistent_directory = os.path.join(current_dir, "db", "faiss_db")
 
-# Load embeddings
-embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+# Load embeddings, from the embedding daemon if one is running
+embeddings = daemon_or_local(lambda: HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2"), "all-MiniLM-L6-v2")
 
 # Load FAISS
-db = FAISS.load_local(persistent_directory, embeddings, allow_dangerous_deserialization=True)
+db = load_faiss(persistent_directory, embeddings)
 
 # Query
 query = "Who had gone off to the Ethiopians?"
@@ -2,6 +2,7 @@
 import os
 from langchain_chroma import Chroma
 from langchain_huggingface import HuggingFaceEmbeddings  # Updated import
+from embedding_daemon import daemon_or_local
 
 def normalize_scores(docs_with_scores):
     """Invert and normalize scores since lower is better in this case"""
@@ -28,12 +29,12 @@ def normalize_scores(docs_with_scores):
 current_dir = os.path.dirname(os.path.abspath(__file__))
 persistent_directory = os.path.join(current_dir, "db", "chroma_db")
 
-# Load embeddings with proper settings
-embeddings = HuggingFaceEmbeddings(
+# Load embeddings with proper settings, from the embedding daemon if one is running
+embeddings = daemon_or_local(lambda: HuggingFaceEmbeddings(
     model_name="all-MiniLM-L6-v2",
     model_kwargs={'device': 'cpu'},
     encode_kwargs={'normalize_embeddings': False}  # Chroma handles normalization
-)
+), "all-MiniLM-L6-v2")
 
 # Load Chroma
 db = Chroma(
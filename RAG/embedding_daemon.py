@@ -0,0 +1,294 @@
+#!/usr/bin/python3
+"""Long-lived embedding service over a Unix domain socket.
+
+Loading sentence-transformers and the MiniLM weights costs every CLI seconds
+and a few hundred MB. Run this daemon once and it keeps one copy of the
+model resident:
+
+    python embedding_daemon.py                  # PyTorch backend
+    python embedding_daemon.py --backend onnx   # int8 ONNX backend
+
+Scripts then use DaemonEmbeddings, a drop-in LangChain Embeddings client, or
+daemon_or_local(), which falls back to loading the model in-process when no
+daemon is listening or the daemon serves a different model. Texts that arrive from different connections within a
+few milliseconds of each other are encoded together in one model call.
+
+Wire protocol (all integers little-endian):
+
+    request   "EMB1" | op u8 | flags u8 | count u32 | count x len u32 | utf-8 text bytes
+    response  status u8 | rows u32 | dim u32 | rows*dim float32
+              status 0 with rows 0 carries dim bytes of JSON (OP_INFO);
+              status 1 carries dim bytes of utf-8 error message
+
+op is OP_DOCUMENTS, OP_QUERY or OP_INFO; flags bit 0 asks for unit-normalized
+vectors. The socket defaults to $EMBEDDING_SOCKET or a file in the temp dir.
+"""
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import tempfile
+import threading
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_SOCKET_PATH = os.getenv("EMBEDDING_SOCKET") or os.path.join(
+    tempfile.gettempdir(), "minilm-embeddings.sock"
+)
+MAGIC = b"EMB1"
+OP_DOCUMENTS, OP_QUERY, OP_INFO = 1, 2, 3
+FLAG_NORMALIZE = 1
+STATUS_OK, STATUS_ERROR = 0, 1
+
+_REQUEST = struct.Struct("<4sBBI")
+_RESPONSE = struct.Struct("<BII")
+
+
+def _read_exact(stream, size):
+    data = stream.read(size)
+    if len(data) != size:
+        raise ConnectionError("connection closed mid-message")
+    return data
+
+
+def pack_request(op, texts=(), normalize=False):
+    encoded = [t.encode("utf-8") for t in texts]
+    lengths = struct.pack(f"<{len(encoded)}I", *map(len, encoded))
+    flags = FLAG_NORMALIZE if normalize else 0
+    return _REQUEST.pack(MAGIC, op, flags, len(encoded)) + lengths + b"".join(encoded)
+
+
+def read_request(stream):
+    """Return (op, flags, texts), or None if the client closed the connection"""
+    header = stream.read(_REQUEST.size)
+    if not header:
+        return None
+    if len(header) != _REQUEST.size:
+        raise ConnectionError("connection closed mid-message")
+    magic, op, flags, count = _REQUEST.unpack(header)
+    if magic != MAGIC:
+        raise ValueError("not an embedding request")
+    lengths = struct.unpack(f"<{count}I", _read_exact(stream, 4 * count))
+    data = _read_exact(stream, sum(lengths))
+    texts, offset = [], 0
+    for length in lengths:
+        texts.append(data[offset:offset + length].decode("utf-8"))
+        offset += length
+    return op, flags, texts
+
+
+class _BatchingEncoder:
+    """Single model thread that merges requests waiting in its queue into one encode call."""
+
+    def __init__(self, embeddings, max_batch=256, max_wait=0.005):
+        self.embeddings = embeddings
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.jobs = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def encode(self, texts):
+        job = {"texts": texts, "done": threading.Event()}
+        self.jobs.put(job)
+        job["done"].wait()
+        if "error" in job:
+            raise job["error"]
+        return job["vectors"]
+
+    def _run(self):
+        while True:
+            jobs = [self.jobs.get()]
+            size = len(jobs[0]["texts"])
+            # Give concurrent clients a moment to join this batch
+            while size < self.max_batch:
+                try:
+                    job = self.jobs.get(timeout=self.max_wait)
+                except queue.Empty:
+                    break
+                jobs.append(job)
+                size += len(job["texts"])
+
+            texts = [t for job in jobs for t in job["texts"]]
+            try:
+                vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+                start = 0
+                for job in jobs:
+                    job["vectors"] = vectors[start:start + len(job["texts"])]
+                    start += len(job["texts"])
+            except Exception as e:
+                for job in jobs:
+                    job["error"] = e
+            for job in jobs:
+                job["done"].set()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                request = read_request(self.rfile)
+            except (ConnectionError, ValueError):
+                return
+            if request is None:
+                return
+            op, flags, texts = request
+            try:
+                self.wfile.write(self.server.respond(op, flags, texts))
+            except Exception as e:
+                message = str(e).encode("utf-8")
+                self.wfile.write(_RESPONSE.pack(STATUS_ERROR, 0, len(message)) + message)
+            self.wfile.flush()
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128  # Many CLI sessions may connect at once
+
+    def __init__(self, socket_path, embeddings, max_batch=256):
+        if os.path.exists(socket_path):
+            os.remove(socket_path)  # Left behind by a daemon that didn't shut down cleanly
+        old_umask = os.umask(0o077)  # Only the owner may connect
+        try:
+            super().__init__(socket_path, _Handler)
+        finally:
+            os.umask(old_umask)
+        self.socket_path = socket_path
+        self.embeddings = embeddings
+        self.encoder = _BatchingEncoder(embeddings, max_batch=max_batch)
+        self.info = json.dumps({
+            "model_name": embeddings.model_name,
+            "normalize_embeddings": getattr(embeddings, "encode_kwargs", {}).get("normalize_embeddings", False),
+        }).encode("utf-8")
+
+    def respond(self, op, flags, texts):
+        if op == OP_INFO:
+            return _RESPONSE.pack(STATUS_OK, 0, len(self.info)) + self.info
+        if op not in (OP_DOCUMENTS, OP_QUERY):
+            raise ValueError(f"unknown op {op}")
+        if op == OP_QUERY and len(texts) != 1:
+            raise ValueError("a query request carries exactly one text")
+        vectors = self.encoder.encode(texts) if texts else np.empty((0, 0), dtype=np.float32)
+        if flags & FLAG_NORMALIZE and len(vectors):
+            vectors = vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        rows, dim = vectors.shape
+        return _RESPONSE.pack(STATUS_OK, rows, dim) + vectors.astype("<f4").tobytes()
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+class DaemonEmbeddings(Embeddings):
+    """LangChain Embeddings client for a running embedding daemon."""
+
+    def __init__(self, socket_path=None, normalize_embeddings=False, timeout=60.0):
+        self.socket_path = socket_path or DEFAULT_SOCKET_PATH
+        self.normalize = normalize_embeddings
+        self.timeout = timeout
+        self._local = threading.local()  # One connection per thread
+        info = json.loads(self._call(OP_INFO, []))
+        self.model_name = info["model_name"]
+        self.encode_kwargs = {"normalize_embeddings": normalize_embeddings or info["normalize_embeddings"]}
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self._local.sock = sock
+        self._local.stream = sock.makefile("rb")
+        return sock
+
+    def _disconnect(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            self._local.stream.close()
+            sock.close()
+        self._local.sock = None
+
+    def _call(self, op, texts):
+        request = pack_request(op, texts, self.normalize)
+        for attempt in range(2):
+            sock = getattr(self._local, "sock", None)
+            try:
+                if sock is None:
+                    sock = self._connect()
+                sock.sendall(request)
+                status, rows, dim = _RESPONSE.unpack(_read_exact(self._local.stream, _RESPONSE.size))
+                break
+            except (ConnectionError, BrokenPipeError, socket.timeout):
+                # The daemon may have restarted since this connection was opened
+                self._disconnect()
+                if attempt:
+                    raise
+        if status == STATUS_ERROR:
+            raise RuntimeError(f"embedding daemon: {_read_exact(self._local.stream, dim).decode('utf-8')}")
+        if rows == 0:
+            return _read_exact(self._local.stream, dim)
+        data = _read_exact(self._local.stream, 4 * rows * dim)
+        return np.frombuffer(data, dtype="<f4").reshape(rows, dim)
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        if not texts:
+            return []
+        return self._call(OP_DOCUMENTS, texts).tolist()
+
+    def embed_query(self, text):
+        return self._call(OP_QUERY, [text])[0].tolist()
+
+
+def daemon_or_local(load_local, model_name, normalize_embeddings=False, socket_path=None):
+    """Connect to the embedding daemon if one is serving model_name, else return load_local()
+
+    model_name is what load_local() would load ("-onnx-int8" suffix included for
+    the ONNX backend); vectors from any other model don't match the stored index.
+    """
+    socket_path = socket_path or DEFAULT_SOCKET_PATH
+    if os.path.exists(socket_path):
+        try:
+            embeddings = DaemonEmbeddings(socket_path, normalize_embeddings=normalize_embeddings)
+        except OSError:
+            embeddings = None  # Stale socket file, no daemon behind it
+        if embeddings is not None:
+            if embeddings.model_name == model_name:
+                return embeddings
+            embeddings._disconnect()
+            print(f"[!] Embedding daemon serves {embeddings.model_name}, not {model_name}; loading the model locally")
+    return load_local()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve MiniLM embeddings over a Unix socket")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH)
+    parser.add_argument("--backend", choices=["torch", "onnx"], default="torch")
+    parser.add_argument("--cache-folder", default=None, help="huggingface cache folder holding the model")
+    parser.add_argument("--max-batch", type=int, default=256, help="most texts merged into one encode call")
+    args = parser.parse_args()
+
+    if args.backend == "onnx":
+        from onnx_embeddings import OnnxMiniLMEmbeddings
+        embeddings = OnnxMiniLMEmbeddings(cache_folder=args.cache_folder or "./embedding_cache")
+    else:
+        from langchain_huggingface import HuggingFaceEmbeddings
+        embeddings = HuggingFaceEmbeddings(
+            model_name="all-MiniLM-L6-v2",
+            model_kwargs={'device': 'cpu'},
+            cache_folder=args.cache_folder
+        )
+    embeddings.embed_query("warm up")
+
+    with EmbeddingServer(args.socket, embeddings, max_batch=args.max_batch) as server:
+        print(f"[+] Serving {embeddings.model_name} embeddings on {args.socket}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\n[+] Shutting down")
+
+
+if __name__ == "__main__":
+    main()
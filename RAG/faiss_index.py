@@ -0,0 +1,258 @@
+#!/usr/bin/python3
+"""Compressed and partitioned FAISS indexes behind LangChain's FAISS store.
+
+FAISS.from_documents always builds an exact IndexFlatL2, so memory and search
+time grow linearly with the corpus. compress_vectorstore swaps in one of:
+
+    ivf     IVF{nlist},Flat   inverted lists, exact vectors
+    ivfpq   IVF{nlist},PQ{m}  inverted lists, product-quantized vectors
+    hnsw    HNSW{M}           graph search, exact vectors
+    sq8     SQ8               8-bit scalar quantization
+    sqfp16  SQfp16            16-bit float storage
+
+Indexes that need training are trained on a random sample of the vectors.
+nprobe (IVF) or efSearch (HNSW) is then tuned until recall@k against exact
+search reaches the target, using queries held out of a copy of the index so
+that they cannot trivially find themselves. If the index type cannot reach the
+target, a warning is printed and the best it can do is used.
+
+save_faiss writes the index, the memory-mapped docstore from mmap_docstore.py, the BM25 index
+from bm25_index.py and an index_params.json sidecar holding the index type and search parameters.
+load_faiss reads any of these back and applies the parameters, so flat
+indexes without a sidecar load exactly as before. Read-only loads map the
+index and docstore instead of reading them, and nothing is unpickled.
+
+Vectors are rebuilt from the shared embedding cache rather than reconstructed
+from the index, so a lossy index is never retrained on its own approximations.
+"""
+import json
+import math
+import os
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+
+from bm25_index import BM25_DIR, BM25Writer
+from mmap_docstore import DOCSTORE_DIR, MmapDocstore, has_docstore, write_docstore
+
+INDEX_PARAMS_NAME = "index_params.json"
+INDEX_TYPES = ("flat", "ivf", "ivfpq", "hnsw", "sq8", "sqfp16")
+_MIN_POINTS_PER_CENTROID = 39  # Below this faiss warns that k-means is unreliable
+# Fewer vectors than this can't train the index type; such stores stay flat
+_MIN_TRAIN_POINTS = {"ivf": 2 * _MIN_POINTS_PER_CENTROID, "ivfpq": 256}
+TUNABLE_INDEX_TYPES = ("ivf", "ivfpq", "hnsw")
+_TUNING_QUERIES = 200
+_BM25_BATCH = 1024  # Docstore texts read per BM25 batch when saving
+
+
+def _index_texts(vectorstore):
+    return [vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]).page_content
+            for i in range(vectorstore.index.ntotal)]
+
+
+def factory_string(index_type, dim, ntotal, nlist=None, pq_m=None, hnsw_m=32):
+    """faiss.index_factory description for index_type sized for ntotal vectors"""
+    if index_type == "flat":
+        return "Flat"
+    if index_type in ("ivf", "ivfpq"):
+        if nlist is None:
+            nlist = int(4 * math.sqrt(ntotal))
+        nlist = max(1, min(nlist, ntotal // _MIN_POINTS_PER_CENTROID))
+        if index_type == "ivf":
+            return f"IVF{nlist},Flat"
+        if pq_m is None:
+            pq_m = next(m for m in (48, 32, 24, 16, 12, 8, 4, 2, 1) if dim % m == 0)
+        # 8-bit codes mean 256 centroids per sub-quantizer to train; smaller corpora get 4-bit codes
+        nbits = 8 if ntotal >= 256 * _MIN_POINTS_PER_CENTROID else 4
+        return f"IVF{nlist},PQ{pq_m}x{nbits}"
+    if index_type == "hnsw":
+        return f"HNSW{hnsw_m}"
+    if index_type == "sq8":
+        return "SQ8"
+    if index_type == "sqfp16":
+        return "SQfp16"
+    raise ValueError(f"Unknown index type {index_type!r} (choose from {', '.join(INDEX_TYPES)})")
+
+
+def build_index(vectors, index_type, train_size=50000, seed=0, add=True, **factory_kwargs):
+    """Create, train and (unless add=False) fill a faiss index of index_type from an (n, dim) float32 array"""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    ntotal, dim = vectors.shape
+    index = faiss.index_factory(dim, factory_string(index_type, dim, ntotal, **factory_kwargs),
+                                faiss.METRIC_L2)
+    if not index.is_trained:
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(ntotal, size=min(train_size, ntotal), replace=False)]
+        index.train(sample)
+    if add:
+        index.add(vectors)
+    return index
+
+
+def apply_search_params(index, params):
+    """Set nprobe / efSearch from params on an index of any type"""
+    if "nprobe" in params:
+        faiss.extract_index_ivf(index).nprobe = params["nprobe"]
+    if "efSearch" in params:
+        faiss.downcast_index(index).hnsw.efSearch = params["efSearch"]
+
+
+def _recall(index, queries, truth, k):
+    _, found = index.search(queries, k)
+    return np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+
+
+def tune_search_params(index, vectors, queries, index_type, k=4, target_recall=0.95):
+    """Smallest nprobe / efSearch whose recall@k against exact search reaches target_recall.
+
+    index holds exactly vectors; queries should not be among them, or every
+    query finds itself and the recall is optimistic. Quantized indexes may
+    never reach the target: a warning is printed and the smallest setting
+    within 0.01 of the best recall is used instead.
+    """
+    if index_type not in TUNABLE_INDEX_TYPES:
+        return {}
+    k = min(k, len(vectors))
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+
+    if index_type == "hnsw":
+        name, candidates = "efSearch", [16, 32, 64, 128, 256, 512]
+    else:
+        nlist = faiss.extract_index_ivf(index).nlist
+        name, candidates = "nprobe", [p for p in (1, 2, 4, 8, 16, 32, 64, 128, 256) if p < nlist] + [nlist]
+    recalls = []
+    for value in candidates:
+        apply_search_params(index, {name: value})
+        recalls.append(_recall(index, queries, truth, k))
+        if recalls[-1] >= target_recall:
+            break
+    target = target_recall
+    if max(recalls) < target_recall:
+        print(f"[!] {index_type} reaches recall@{k} {max(recalls):.2f} at best, below the target "
+              f"{target_recall:.2f}; use a less compressed index type if that is too low")
+        target = max(recalls) - 0.01
+    value, recall = next((v, r) for v, r in zip(candidates, recalls) if r >= target)
+    params = {name: value, "recall": round(float(recall), 4)}
+    apply_search_params(index, params)
+    return params
+
+
+def flatten_vectorstore(vectorstore, embeddings):
+    """Replace the store's index with an exact IndexFlatL2 so it can be edited in place"""
+    vectors = np.asarray(embeddings.embed_documents(_index_texts(vectorstore)), dtype=np.float32)
+    index = faiss.IndexFlatL2(vectors.shape[1])
+    index.add(vectors)
+    vectorstore.index = index
+    return vectorstore
+
+
+def compress_vectorstore(vectorstore, embeddings, index_type, target_recall=0.95, **build_kwargs):
+    """Rebuild the store's index as index_type and return its params for the sidecar"""
+    texts = _index_texts(vectorstore)
+    vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    if len(vectors) < _MIN_TRAIN_POINTS.get(index_type, 0):
+        print(f"[!] {len(vectors)} vectors are too few to train a {index_type} index, keeping it flat")
+        index_type = "flat"
+    dim = vectors.shape[1]
+    factory = factory_string(index_type, dim, len(vectors), **{
+        k: v for k, v in build_kwargs.items() if k in ("nlist", "pq_m", "hnsw_m")})
+    index = build_index(vectors, index_type, add=False, **build_kwargs)
+    search = {}
+    num_queries = min(_TUNING_QUERIES, len(vectors) // 10)
+    if index_type in TUNABLE_INDEX_TYPES and num_queries:
+        # Tune on a copy of the trained index that leaves the query vectors out
+        rng = np.random.default_rng(0)
+        held_out = np.zeros(len(vectors), dtype=bool)
+        held_out[rng.choice(len(vectors), size=num_queries, replace=False)] = True
+        probe = faiss.clone_index(index)
+        probe.add(vectors[~held_out])
+        search = tune_search_params(probe, vectors[~held_out], vectors[held_out], index_type,
+                                    target_recall=target_recall)
+    index.add(vectors)
+    apply_search_params(index, search)
+    vectorstore.index = index
+    return {"index_type": index_type, "factory": factory, "search": search}
+
+
+def save_faiss(vectorstore, folder_path, params=None):
+    """Write index.faiss, the mapped docstore, the BM25 index and the index_params.json sidecar.
+
+    The sidecar is removed for plain flat indexes, and any index.pkl from
+    save_local is removed since it would go stale. Files are replaced by rename
+    so readers that have the old ones mapped are unaffected.
+    """
+    os.makedirs(folder_path, exist_ok=True)
+    index_path = os.path.join(folder_path, "index.faiss")
+    faiss.write_index(vectorstore.index, f"{index_path}.tmp")
+    os.replace(f"{index_path}.tmp", index_path)
+    write_docstore(folder_path, vectorstore.docstore, vectorstore.index_to_docstore_id)
+    bm25 = BM25Writer(os.path.join(folder_path, BM25_DIR))
+    for start in range(0, vectorstore.index.ntotal, _BM25_BATCH):
+        ids = [vectorstore.index_to_docstore_id[i]
+               for i in range(start, min(start + _BM25_BATCH, vectorstore.index.ntotal))]
+        bm25.add(ids, [vectorstore.docstore.search(doc_id).page_content for doc_id in ids])
+    bm25.close()
+    pickle_path = os.path.join(folder_path, "index.pkl")
+    if os.path.exists(pickle_path):
+        os.remove(pickle_path)
+    sidecar = os.path.join(folder_path, INDEX_PARAMS_NAME)
+    if params and params.get("index_type", "flat") != "flat":
+        with open(sidecar, "w") as f:
+            json.dump(params, f, indent=2)
+    elif os.path.exists(sidecar):
+        os.remove(sidecar)
+
+
+def load_index_params(folder_path):
+    try:
+        with open(os.path.join(folder_path, INDEX_PARAMS_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"index_type": "flat"}
+
+
+def index_version(folder_path):
+    """Token that changes whenever save_faiss rewrites the folder.
+
+    The index, docstore and BM25 files are replaced by rename on every save, so
+    their inode, size and mtime identify the saved index without reading it.
+    """
+    parts = []
+    for name in ("index.faiss", os.path.join(DOCSTORE_DIR, "header.json"), os.path.join(BM25_DIR, "header.json")):
+        try:
+            st = os.stat(os.path.join(folder_path, name))
+        except FileNotFoundError:
+            parts.append("-")
+            continue
+        parts.append(f"{st.st_ino}:{st.st_size}:{st.st_mtime_ns}")
+    return "|".join(parts)
+
+
+def load_faiss(folder_path, embeddings, editable=False, **search_overrides):
+    """Open a folder written by save_faiss, with the tuned search parameters applied.
+
+    By default the index and docstore are memory-mapped read-only. Pass
+    editable=True to read them into memory for add/delete.
+    """
+    if not has_docstore(folder_path):
+        if os.path.exists(os.path.join(folder_path, "index.pkl")):
+            raise FileNotFoundError(
+                f"{folder_path} still has a pickled docstore; convert it with: "
+                f"python mmap_docstore.py \"{folder_path}\" --remove-pickle"
+            )
+        raise FileNotFoundError(f"No FAISS index in {folder_path}")
+    index_path = os.path.join(folder_path, "index.faiss")
+    docstore = MmapDocstore(folder_path)
+    if editable:
+        index = faiss.read_index(index_path)
+        docstore, index_to_docstore_id = docstore.to_in_memory()
+    else:
+        index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        index_to_docstore_id = docstore.index_to_docstore_id
+    vectorstore = FAISS(embeddings, index, docstore, index_to_docstore_id)
+    search = {**load_index_params(folder_path).get("search", {}), **search_overrides}
+    apply_search_params(vectorstore.index, {k: v for k, v in search.items() if k in ("nprobe", "efSearch")})
+    return vectorstore
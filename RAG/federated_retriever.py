@@ -0,0 +1,169 @@
+#!/usr/bin/python3
+"""Reciprocal-rank-fusion retriever over several persisted stores at once.
+
+FederatedRetriever sends the query to every member retriever concurrently,
+each store on its own single-thread executor, and fuses the rankings it gets
+back with reciprocal rank fusion:
+
+    score(doc) = sum over stores of 1 / (rrf_k + rank of doc in that store)
+
+Chunks with the same text (after whitespace folding) count as one document,
+keyed by a content hash, so a chunk stored in both FAISS and Chroma is boosted
+rather than repeated. Stores that have not answered within timeout seconds are
+left out of that query; a slow or failing backend costs at most the timeout.
+A call that timed out cannot be cancelled once running, so while it is still
+running its store is skipped without waiting. A hung backend therefore ties up
+only its own thread and never delays the other stores.
+Given the embeddings the stores share (ideally a QueryCachedEmbeddings), the
+query is embedded once up front and every store reuses that vector.
+
+It is a LangChain BaseRetriever, so it drops in wherever as_retriever() was
+used, including create_history_aware_retriever:
+
+    retriever = FederatedRetriever(retrievers=open_stores(["faiss_db", "chroma_db"], embeddings), k=4)
+
+    python federated_retriever.py "Who had gone off to the Ethiopians?" --stores faiss_db,chroma_db
+"""
+import argparse
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict
+
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict, PrivateAttr
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+cv_project_dir = os.path.join(os.path.dirname(current_dir), "CV RAG Project")
+
+# store name -> (backend, persistent directory, collection name)
+STORES = {
+    "faiss_db": ("faiss", os.path.join(current_dir, "db", "faiss_db"), None),
+    "chroma_db": ("chroma", os.path.join(current_dir, "db", "chroma_db"), "langchain"),
+    "chroma_db_with_metadata": ("chroma", os.path.join(current_dir, "db", "chroma_db_with_metadata"), "langchain"),
+    "cv_faiss_index": ("faiss", os.path.join(cv_project_dir, "faiss_index"), None),
+    "cv_chroma_db": ("chroma", os.path.join(cv_project_dir, "chroma_db"), "cv_collection"),
+    "cv_chroma_chunks": ("chroma", os.path.join(cv_project_dir, "chroma_db"), "cv_chunks"),
+}
+
+
+def content_hash(doc):
+    return hashlib.sha1(" ".join(doc.page_content.split()).encode("utf-8")).hexdigest()
+
+
+def open_vectorstore(name, embeddings):
+    """The LangChain vector store for a persisted store in STORES"""
+    backend, path, collection_name = STORES[name]
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"The store {name} does not exist at {path}")
+    if backend == "faiss":
+        from faiss_index import load_faiss
+        return load_faiss(path, embeddings)
+    from langchain_chroma import Chroma
+    return Chroma(persist_directory=path, embedding_function=embeddings, collection_name=collection_name)
+
+
+def open_stores(names, embeddings, k=4):
+    """{name: retriever} for persisted stores in STORES, hybrid where a BM25 index exists"""
+    from bm25_index import BM25_DIR, BM25Index, chroma_bm25_dir, has_bm25
+    from hybrid_retriever import HybridRetriever
+
+    retrievers = {}
+    for name in names:
+        backend, path, collection_name = STORES[name]
+        vectorstore = open_vectorstore(name, embeddings)
+        bm25_path = os.path.join(path, BM25_DIR) if backend == "faiss" else chroma_bm25_dir(path, collection_name)
+        if has_bm25(bm25_path):
+            retrievers[name] = HybridRetriever(vectorstore=vectorstore, bm25=BM25Index(bm25_path), k=k)
+        else:
+            retrievers[name] = vectorstore.as_retriever(search_kwargs={"k": k})
+    return retrievers
+
+
+class FederatedRetriever(BaseRetriever):
+    """Query several retrievers concurrently and fuse their rankings with RRF."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    retrievers: Dict[str, BaseRetriever]
+    k: int = 4
+    rrf_k: int = 60
+    timeout: float = 2.0
+    embeddings: Any = None
+    _pools: Dict[str, ThreadPoolExecutor] = PrivateAttr(default=None)
+    _running: Dict[str, Any] = PrivateAttr(default=None)
+    _lock: Any = PrivateAttr(default=None)
+
+    def model_post_init(self, __context):
+        self._pools = {name: ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"federated-{name}")
+                       for name in self.retrievers}
+        self._running = {}  # store name -> its latest future
+        self._lock = threading.Lock()
+
+    def _get_relevant_documents(self, query, *, run_manager):
+        if self.embeddings is not None:
+            self.embeddings.embed_query(query)
+        futures = {}
+        with self._lock:
+            for name, retriever in self.retrievers.items():
+                previous = self._running.get(name)
+                if previous is not None and not previous.done():
+                    print(f"[!] {name} is still busy with an earlier query, skipped")
+                    continue
+                future = self._pools[name].submit(retriever.invoke, query)
+                self._running[name] = future
+                futures[future] = name
+        # Every store started together, so one deadline is a per-store timeout
+        done, pending = wait(futures, timeout=self.timeout)
+        for future in pending:
+            future.cancel()
+            print(f"[!] {futures[future]} did not answer within {self.timeout}s, skipped")
+
+        scores = {}
+        docs = {}
+        for future in done:
+            try:
+                ranking = future.result()
+            except Exception as e:
+                print(f"[!] {futures[future]} failed: {e}")
+                continue
+            for rank, doc in enumerate(ranking, 1):
+                key = content_hash(doc)
+                docs.setdefault(key, doc)
+                scores[key] = scores.get(key, 0.0) + 1.0 / (self.rrf_k + rank)
+        ranked = sorted(scores, key=scores.get, reverse=True)[:self.k]
+        return [docs[key] for key in ranked]
+
+
+def main():
+    from langchain_huggingface import HuggingFaceEmbeddings
+    from embedding_daemon import daemon_or_local
+    from query_cache import QueryCachedEmbeddings
+
+    parser = argparse.ArgumentParser(description="Query several vector stores at once with RRF")
+    parser.add_argument("query")
+    parser.add_argument("--stores", default="faiss_db,chroma_db,chroma_db_with_metadata",
+                        help=f"comma-separated stores ({', '.join(STORES)})")
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=2.0, help="seconds to wait for each store")
+    args = parser.parse_args()
+
+    names = args.stores.split(",")
+    unknown = [name for name in names if name not in STORES]
+    if unknown:
+        parser.error(f"unknown stores: {', '.join(unknown)} (choose from {', '.join(STORES)})")
+
+    embeddings = QueryCachedEmbeddings(daemon_or_local(lambda: HuggingFaceEmbeddings(
+        model_name="all-MiniLM-L6-v2",
+        model_kwargs={'device': 'cpu'},
+        encode_kwargs={'normalize_embeddings': True}
+    ), "all-MiniLM-L6-v2", normalize_embeddings=True))
+    retriever = FederatedRetriever(retrievers=open_stores(names, embeddings, k=args.k),
+                                   k=args.k, timeout=args.timeout, embeddings=embeddings)
+    for i, doc in enumerate(retriever.invoke(args.query), 1):
+        print(f"Document {i} ({doc.metadata.get('source', 'Unknown')}):\n{doc.page_content}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/python3
+"""Metadata pre-filtered similarity search for FAISS and Chroma stores.
+
+similarity_search(query, filter=lambda doc: ...) on FAISS searches the whole
+index for fetch_k hits and filters them afterwards. It misses matches whenever
+the wanted documents are not among those hits, and costs a full search
+regardless. filtered_search restricts the search to matching documents first:
+
+    FAISS   the matching index positions come from a metadata -> positions
+            index: the postings stored with the memory-mapped docstore, or one
+            built once per in-memory store. Their vectors are scored directly,
+            so the cost follows the number of matching chunks, not the corpus.
+            IVF indexes get a direct map (one int per vector) on first use so
+            their vectors can be looked up too.
+    Chroma  a native where filter ({"source": {"$in": [...]}}).
+
+Both return [(Document, score)] with each backend's usual score: L2 distance
+(or inner product) for FAISS and distance for Chroma.
+
+    filtered_search(vectorstore, "what are John's skills?", {"source": ["john.pdf"]}, k=3)
+"""
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_core.documents import Document
+
+
+def _values(values):
+    return list(values) if isinstance(values, (list, tuple, set, frozenset)) else [values]
+
+
+def _in_memory_postings(vectorstore, key):
+    """{value: positions} for an in-memory docstore, rebuilt only after the store changes"""
+    cache = vectorstore.__dict__.setdefault("_metadata_postings", {})
+    version = (key, vectorstore.index.ntotal, id(vectorstore.index_to_docstore_id))
+    if version not in cache:
+        postings = {}
+        for position, doc_id in vectorstore.index_to_docstore_id.items():
+            value = vectorstore.docstore.search(doc_id).metadata.get(key)
+            if isinstance(value, (str, int, float, bool)):
+                postings.setdefault(value, []).append(position)
+        cache.clear()
+        cache[version] = {value: np.array(rows, dtype=np.int64) for value, rows in postings.items()}
+    return cache[version]
+
+
+def matching_positions(vectorstore, where):
+    """Sorted FAISS positions whose metadata matches every key of where (value or list of values)"""
+    docstore = vectorstore.docstore
+    result = None
+    for key, values in where.items():
+        if hasattr(docstore, "rows_where"):
+            rows = [docstore.rows_where(key, value) for value in _values(values)]
+        else:
+            postings = _in_memory_postings(vectorstore, key)
+            rows = [postings.get(value, np.empty(0, dtype=np.int64)) for value in _values(values)]
+        rows = np.unique(np.concatenate(rows)) if rows else np.empty(0, dtype=np.int64)
+        result = rows if result is None else np.intersect1d(result, rows, assume_unique=True)
+    return result
+
+
+def _reconstruct(index, positions):
+    try:
+        return index.reconstruct_batch(positions)
+    except RuntimeError:
+        # IVF indexes need a position -> inverted list map before they can reconstruct
+        faiss.extract_index_ivf(index).make_direct_map()
+        return index.reconstruct_batch(positions)
+
+
+def _faiss_filtered(vectorstore, embedding, positions, k):
+    query = np.asarray(embedding, dtype=np.float32)
+    if vectorstore._normalize_L2:
+        query = query / np.linalg.norm(query)
+    inner_product = vectorstore.distance_strategy == DistanceStrategy.MAX_INNER_PRODUCT
+    k = min(k, len(positions))
+    vectors = _reconstruct(vectorstore.index, positions)
+    scores = vectors @ query if inner_product else ((vectors - query) ** 2).sum(axis=1)
+    order = np.argsort(-scores if inner_product else scores, kind="stable")[:k]
+    docs = []
+    for position, score in ((int(positions[i]), float(scores[i])) for i in order):
+        doc = vectorstore.docstore.search(vectorstore.index_to_docstore_id[position])
+        if not isinstance(doc, Document):
+            raise ValueError(f"Could not find document for position {position}, got {doc}")
+        docs.append((doc, score))
+    return docs
+
+
+def chroma_where(where):
+    """Chroma where clause for {key: value or list of values}"""
+    clauses = [{key: {"$in": _values(values)}} for key, values in where.items()]
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def filtered_search(store, query, where, k=4):
+    """Top-k documents among those whose metadata matches where, as [(Document, score)].
+
+    store is a LangChain FAISS or Chroma vector store; where maps metadata keys
+    to a value or a list of accepted values.
+    """
+    if isinstance(store, FAISS):
+        positions = matching_positions(store, where)
+        if not len(positions):
+            return []
+        return _faiss_filtered(store, store._embed_query(query), positions, k)
+    # LangChain Chroma passes where straight through to the collection query
+    return store.similarity_search_with_score(query, k=k, filter=chroma_where(where))
@@ -0,0 +1,87 @@
+#!/usr/bin/python3
+"""Hybrid lexical + vector retrieval over a vector store and its BM25 index.
+
+Both legs fetch fetch_k candidates: the vector store by its raw distance (or
+inner product) and the BM25 index (bm25_index.py) from its posting lists.
+Vector scores are min-max scaled over the fetched hits (closest 1, farthest
+0) and BM25 scores are scaled by the best hit, so both legs lie in 0..1
+whatever the metric. LangChain's relevance scores are not used: on FAISS's
+squared L2 they go negative for distant chunks. A document's fused score is
+
+    alpha * scaled vector similarity + (1 - alpha) * scaled BM25
+
+where a leg that did not return the document contributes 0. An exact skill
+or certification match therefore lifts a chunk that MiniLM alone would rank
+low, and a small k is enough to get it into the prompt.
+"""
+from typing import Any
+
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict
+
+
+def _lexical_documents(vectorstore, ids):
+    """Documents for BM25 hit ids, from the store's own docstore or collection"""
+    if isinstance(vectorstore, FAISS):
+        docs = [vectorstore.docstore.search(doc_id) for doc_id in ids]
+        return {doc_id: doc for doc_id, doc in zip(ids, docs) if isinstance(doc, Document)}
+    found = vectorstore.get(ids=ids, include=["documents", "metadatas"])
+    return {doc_id: Document(id=doc_id, page_content=text, metadata=metadata or {})
+            for doc_id, text, metadata in zip(found["ids"], found["documents"], found["metadatas"])}
+
+
+def _key(doc):
+    return doc.id or doc.page_content
+
+
+def _vector_similarities(vectorstore, query, fetch_k):
+    """[(Document, similarity in 0..1)] for the fetch_k nearest chunks, min-max scaled"""
+    hits = vectorstore.similarity_search_with_score(query, k=fetch_k)
+    if not hits:
+        return []
+    # Distances (lower is better) everywhere except a FAISS inner-product index
+    higher_is_better = (isinstance(vectorstore, FAISS)
+                        and vectorstore.distance_strategy == DistanceStrategy.MAX_INNER_PRODUCT)
+    scores = [float(score) if higher_is_better else -float(score) for _, score in hits]
+    best, worst = max(scores), min(scores)
+    spread = best - worst
+    return [(doc, (score - worst) / spread if spread else 1.0) for (doc, _), score in zip(hits, scores)]
+
+
+def hybrid_search(vectorstore, bm25, query, k=4, fetch_k=20, alpha=0.5):
+    """Top-k [(Document, fused score)] from the vector store and its BM25 index"""
+    fused = {}
+    for doc, similarity in _vector_similarities(vectorstore, query, fetch_k):
+        fused[_key(doc)] = [doc, alpha * similarity]
+
+    lexical = bm25.search(query, k=fetch_k)
+    if lexical:
+        best = lexical[0][1]
+        docs = _lexical_documents(vectorstore, [doc_id for doc_id, _ in lexical])
+        for doc_id, score in lexical:
+            if doc_id not in docs:
+                continue  # Index rebuilt since the BM25 files were written
+            entry = fused.setdefault(_key(docs[doc_id]), [docs[doc_id], 0.0])
+            entry[1] += (1 - alpha) * score / best
+
+    ranked = sorted(fused.values(), key=lambda entry: entry[1], reverse=True)
+    return [(doc, score) for doc, score in ranked[:k]]
+
+
+class HybridRetriever(BaseRetriever):
+    """LangChain retriever that fuses a vector store with its BM25 index."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    vectorstore: Any
+    bm25: Any
+    k: int = 4
+    fetch_k: int = 20
+    alpha: float = 0.5
+
+    def _get_relevant_documents(self, query, *, run_manager):
+        return [doc for doc, _ in hybrid_search(self.vectorstore, self.bm25, query, k=self.k,
+                                                fetch_k=self.fetch_k, alpha=self.alpha)]
@@ -0,0 +1,289 @@
+#!/usr/bin/python3
+"""Columnar, memory-mapped docstore for FAISS folders, without pickle.
+
+FAISS.save_local pickles the whole docstore into index.pkl. Loading it means
+allow_dangerous_deserialization=True and building every Document up front, so
+startup time and memory grow with the corpus. write_docstore stores the same
+data as a docstore/ directory next to index.faiss instead:
+
+    header.json           row count plus the metadata columns and their encodings
+    text.bin              utf-8 page_content of every row, back to back
+    text_offsets.npy      uint64 byte offsets into text.bin (rows + 1)
+    ids.npy               docstore id of each index position, fixed-width bytes
+    ids_sorted.npy        the same ids sorted, with
+    ids_order.npy         the position of each sorted id, for id -> row lookups
+    meta_<n>.npy          int32 codes into header values for a low-cardinality
+                          metadata key (-1 when a row lacks the key), with
+    meta_<n>_rows.npy     the rows grouped by code and
+    meta_<n>_starts.npy   where each code's rows start, for value -> rows lookups, or
+    meta_<n>.bin/_offsets.npy   one JSON value per row, empty when missing
+
+MmapDocstore maps these files read-only, so opening it costs the same whatever
+the corpus size, and a Document is only built when FAISS asks for a hit. Nothing
+is unpickled, so loaders no longer need the dangerous deserialization flag.
+
+Convert an existing pickled folder once (this unpickles it, so only convert
+folders you built yourself):
+
+    python mmap_docstore.py "../CV RAG Project/faiss_index" --remove-pickle
+"""
+import argparse
+import json
+import os
+import shutil
+import uuid
+from collections.abc import Mapping
+
+import numpy as np
+from langchain_community.docstore.base import Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.documents import Document
+
+DOCSTORE_DIR = "docstore"
+FORMAT_VERSION = 1
+# A metadata key with at most this many distinct values is stored as codes into a value table
+MAX_DICT_VALUES = 4096
+
+
+def _write_blob(folder, name, chunks):
+    """Write byte strings back to back as <name>.bin with <name>_offsets.npy"""
+    offsets = np.zeros(len(chunks) + 1, dtype=np.uint64)
+    np.cumsum([len(c) for c in chunks], out=offsets[1:])
+    with open(os.path.join(folder, f"{name}.bin"), "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+    np.save(os.path.join(folder, f"{name}_offsets.npy"), offsets)
+
+
+def _metadata_columns(metadatas):
+    """Split row metadata into one column per key, dictionary-encoded where that pays"""
+    keys = list(dict.fromkeys(key for metadata in metadatas for key in metadata))
+    columns = []
+    for key in keys:
+        encoded = [json.dumps(m[key], sort_keys=True) if key in m else None for m in metadatas]
+        values = list(dict.fromkeys(v for v in encoded if v is not None))
+        if len(values) <= MAX_DICT_VALUES:
+            position = {value: i for i, value in enumerate(values)}
+            codes = np.array([position[v] if v is not None else -1 for v in encoded], dtype=np.int32)
+            columns.append(({"name": key, "kind": "dict", "values": [json.loads(v) for v in values]}, codes))
+        else:
+            columns.append(({"name": key, "kind": "json"},
+                            [v.encode("utf-8") if v is not None else b"" for v in encoded]))
+    return columns
+
+
+def _postings(codes, num_values):
+    """Rows grouped by code, and the start of each code's group (rows missing the key go last)"""
+    codes = np.asarray(codes)
+    order = np.argsort(np.where(codes < 0, num_values, codes), kind="stable")
+    starts = np.searchsorted(np.where(codes < 0, num_values, codes)[order], np.arange(num_values + 1))
+    return order.astype(np.int64), starts.astype(np.int64)
+
+
+def write_docstore(folder_path, docstore, index_to_docstore_id):
+    """Write the documents of a FAISS store, in index order, as folder_path/docstore/.
+
+    The new directory is filled beside the old one and swapped in by rename, so a
+    process that has the old files mapped keeps reading a consistent copy.
+    """
+    ids = [index_to_docstore_id[i] for i in range(len(index_to_docstore_id))]
+    docs = [docstore.search(doc_id) for doc_id in ids]
+    for doc_id, doc in zip(ids, docs):
+        if not isinstance(doc, Document):
+            raise ValueError(f"Could not find document for id {doc_id}, got {doc}")
+
+    target = os.path.join(folder_path, DOCSTORE_DIR)
+    tmp = f"{target}.tmp-{uuid.uuid4().hex[:8]}"
+    os.makedirs(tmp)
+    try:
+        _write_blob(tmp, "text", [doc.page_content.encode("utf-8") for doc in docs])
+        id_bytes = np.array([doc_id.encode("utf-8") for doc_id in ids], dtype=bytes)
+        order = np.argsort(id_bytes, kind="stable")
+        np.save(os.path.join(tmp, "ids.npy"), id_bytes)
+        np.save(os.path.join(tmp, "ids_sorted.npy"), id_bytes[order])
+        np.save(os.path.join(tmp, "ids_order.npy"), order.astype(np.int64))
+
+        header_columns = []
+        for n, (column, data) in enumerate(_metadata_columns([doc.metadata for doc in docs])):
+            if column["kind"] == "dict":
+                np.save(os.path.join(tmp, f"meta_{n}.npy"), data)
+                rows, starts = _postings(data, len(column["values"]))
+                np.save(os.path.join(tmp, f"meta_{n}_rows.npy"), rows)
+                np.save(os.path.join(tmp, f"meta_{n}_starts.npy"), starts)
+            else:
+                _write_blob(tmp, f"meta_{n}", data)
+            header_columns.append(column)
+        with open(os.path.join(tmp, "header.json"), "w") as f:
+            json.dump({"version": FORMAT_VERSION, "count": len(ids), "columns": header_columns}, f)
+
+        old = None
+        if os.path.exists(target):
+            old = f"{target}.old-{uuid.uuid4().hex[:8]}"
+            os.rename(target, old)
+        os.rename(tmp, target)
+    finally:
+        if os.path.exists(tmp):
+            shutil.rmtree(tmp)
+    if old:
+        shutil.rmtree(old)
+
+
+def has_docstore(folder_path):
+    return os.path.exists(os.path.join(folder_path, DOCSTORE_DIR, "header.json"))
+
+
+class _Blob:
+    """Row-addressable view of a <name>.bin / <name>_offsets.npy pair"""
+
+    def __init__(self, folder, name):
+        self.offsets = np.load(os.path.join(folder, f"{name}_offsets.npy"), mmap_mode="r")
+        path = os.path.join(folder, f"{name}.bin")
+        # np.memmap refuses empty files
+        self.data = np.memmap(path, dtype=np.uint8, mode="r") if os.path.getsize(path) else b""
+
+    def __getitem__(self, row):
+        return bytes(self.data[int(self.offsets[row]):int(self.offsets[row + 1])])
+
+
+class _PositionIds(Mapping):
+    """index_to_docstore_id backed by the mapped ids column"""
+
+    def __init__(self, ids):
+        self._ids = ids
+
+    def __getitem__(self, position):
+        position = int(position)
+        if not 0 <= position < len(self._ids):
+            raise KeyError(position)
+        return self._ids[position].decode("utf-8")
+
+    def __iter__(self):
+        return iter(range(len(self._ids)))
+
+    def __len__(self):
+        return len(self._ids)
+
+
+class MmapDocstore(Docstore):
+    """Read-only docstore over a docstore/ directory written by write_docstore."""
+
+    def __init__(self, folder_path):
+        self.path = os.path.join(folder_path, DOCSTORE_DIR)
+        with open(os.path.join(self.path, "header.json")) as f:
+            header = json.load(f)
+        if header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported docstore version {header.get('version')} in {self.path}")
+        self.count = header["count"]
+        self._text = _Blob(self.path, "text")
+        self._ids = np.load(os.path.join(self.path, "ids.npy"), mmap_mode="r")
+        self._ids_sorted = np.load(os.path.join(self.path, "ids_sorted.npy"), mmap_mode="r")
+        self._ids_order = np.load(os.path.join(self.path, "ids_order.npy"), mmap_mode="r")
+        self._columns = []
+        self._postings = {}
+        for n, column in enumerate(header["columns"]):
+            if column["kind"] == "dict":
+                data = np.load(os.path.join(self.path, f"meta_{n}.npy"), mmap_mode="r")
+                column["codes"] = {json.dumps(v, sort_keys=True): i for i, v in enumerate(column["values"])}
+                column["n"] = n
+            else:
+                data = _Blob(self.path, f"meta_{n}")
+            self._columns.append((column, data))
+        self.index_to_docstore_id = _PositionIds(self._ids)
+
+    def row(self, doc_id):
+        """Index position of doc_id, or None"""
+        key = doc_id.encode("utf-8")
+        i = int(np.searchsorted(self._ids_sorted, key))
+        if i < self.count and self._ids_sorted[i] == key:
+            return int(self._ids_order[i])
+        return None
+
+    def document(self, row):
+        metadata = {}
+        for column, data in self._columns:
+            if column["kind"] == "dict":
+                code = int(data[row])
+                if code >= 0:
+                    metadata[column["name"]] = column["values"][code]
+            else:
+                value = data[row]
+                if value:
+                    metadata[column["name"]] = json.loads(value)
+        doc_id = self._ids[row].decode("utf-8")
+        return Document(id=doc_id, page_content=self._text[row].decode("utf-8"), metadata=metadata)
+
+    def rows_where(self, key, value):
+        """Index positions of the rows whose metadata[key] == value, in ascending order"""
+        column, data = next(((c, d) for c, d in self._columns if c["name"] == key), (None, None))
+        if column is None:
+            return np.empty(0, dtype=np.int64)
+        if column["kind"] != "dict":
+            wanted = json.dumps(value, sort_keys=True)
+            return np.array([row for row in range(self.count)
+                             if data[row] and json.dumps(json.loads(data[row]), sort_keys=True) == wanted],
+                            dtype=np.int64)
+        code = column["codes"].get(json.dumps(value, sort_keys=True))
+        if code is None:
+            return np.empty(0, dtype=np.int64)
+        if key not in self._postings:
+            rows_path = os.path.join(self.path, f"meta_{column['n']}_rows.npy")
+            if os.path.exists(rows_path):
+                self._postings[key] = (np.load(rows_path, mmap_mode="r"), np.load(
+                    os.path.join(self.path, f"meta_{column['n']}_starts.npy"), mmap_mode="r"))
+            else:
+                # Written before postings were stored; group the codes once
+                self._postings[key] = _postings(data, len(column["values"]))
+        rows, starts = self._postings[key]
+        # The grouping sort is stable, so each group is already in row order
+        return np.asarray(rows[int(starts[code]):int(starts[code + 1])])
+
+    def distinct(self, *keys):
+        """Distinct tuples of the given metadata values across all rows (None where missing).
+
+        Dictionary-encoded columns are answered from their codes alone, without
+        building any Document.
+        """
+        columns = {column["name"]: (column, data) for column, data in self._columns}
+        if all(key in columns and columns[key][0]["kind"] == "dict" for key in keys):
+            codes = np.stack([np.asarray(columns[key][1]) for key in keys], axis=1)
+            return {tuple(columns[key][0]["values"][c] if c >= 0 else None for key, c in zip(keys, row))
+                    for row in np.unique(codes, axis=0).tolist()}
+        return {tuple(self.document(row).metadata.get(key) for key in keys) for row in range(self.count)}
+
+    def search(self, search):
+        row = self.row(search)
+        if row is None:
+            return f"ID {search} not found."
+        return self.document(row)
+
+    def to_in_memory(self):
+        """Materialize every row as (InMemoryDocstore, index_to_docstore_id) for editing"""
+        ids = dict(self.index_to_docstore_id)
+        return InMemoryDocstore({doc_id: self.document(row) for row, doc_id in ids.items()}), ids
+
+
+def main():
+    from langchain_community.vectorstores import FAISS
+
+    parser = argparse.ArgumentParser(description="Convert pickled FAISS docstores to memory-mapped ones")
+    parser.add_argument("folders", nargs="+", help="FAISS folders holding index.faiss and index.pkl")
+    parser.add_argument("--remove-pickle", action="store_true", help="delete index.pkl after converting")
+    args = parser.parse_args()
+
+    for folder in args.folders:
+        # The one place a pickle is still read: folders this project built itself
+        vectorstore = FAISS.load_local(folder, None, allow_dangerous_deserialization=True)
+        write_docstore(folder, vectorstore.docstore, vectorstore.index_to_docstore_id)
+        check = MmapDocstore(folder)
+        for i, doc_id in vectorstore.index_to_docstore_id.items():
+            original = vectorstore.docstore.search(doc_id)
+            converted = check.search(check.index_to_docstore_id[i])
+            if (converted.page_content, converted.metadata) != (original.page_content, original.metadata):
+                raise SystemExit(f"[-] {folder}: row {i} did not round-trip, index.pkl kept")
+        if args.remove_pickle:
+            os.remove(os.path.join(folder, "index.pkl"))
+        print(f"[+] {folder}: {check.count} documents converted")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/python3
+"""Int8-quantized ONNX Runtime backend for all-MiniLM-L6-v2 on CPU.
+
+OnnxMiniLMEmbeddings is a drop-in LangChain Embeddings class that runs the
+sentence-transformers snapshot in an embedding_cache folder (the same
+cache_folder HuggingFaceEmbeddings uses) without importing PyTorch. It needs
+only onnxruntime, the fast tokenizer from tokenizers and numpy. Tokenization
+uses the snapshot's tokenizer.json, and pooling and normalization follow its
+modules.json, so the vectors line up with the ones HuggingFaceEmbeddings
+produces.
+
+The quantized graph is exported once, into <cache_folder>/onnx/<model>/,
+by export_quantized_model. Only that one step needs torch and transformers.
+
+Dynamic int8 quantization moves the vectors slightly. Every vector must keep
+a cosine similarity of at least MIN_COSINE_SIMILARITY with the fp32 vector
+stored for the same text in an existing index; bench_onnx_embeddings.py --check
+verifies this against faiss_index. Because the vectors are not bit-identical,
+model_name carries an "-onnx-int8" suffix so the shared vector cache keeps
+them apart from fp32 vectors.
+"""
+import json
+import os
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+MIN_COSINE_SIMILARITY = 0.99
+QUANTIZED_MODEL_NAME = "model_int8.onnx"
+
+
+def find_snapshot(cache_folder, model_name="all-MiniLM-L6-v2"):
+    """Path of the snapshot a huggingface cache folder holds for a sentence-transformers model"""
+    model_dir = os.path.join(cache_folder, f"models--sentence-transformers--{model_name}")
+    refs_main = os.path.join(model_dir, "refs", "main")
+    if not os.path.exists(refs_main):
+        raise FileNotFoundError(
+            f"No snapshot of {model_name} in {cache_folder}. Run any script with "
+            f"HuggingFaceEmbeddings(cache_folder=\"{cache_folder}\") once to download it"
+        )
+    with open(refs_main) as f:
+        return os.path.join(model_dir, "snapshots", f.read().strip())
+
+
+def quantized_model_path(cache_folder, model_name="all-MiniLM-L6-v2"):
+    return os.path.join(cache_folder, "onnx", model_name, QUANTIZED_MODEL_NAME)
+
+
+def export_quantized_model(cache_folder, model_name="all-MiniLM-L6-v2", opset=14):
+    """Export the transformer to ONNX and quantize its weights to int8 (needs torch and transformers)"""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+
+    output_path = quantized_model_path(cache_folder, model_name)
+    fp32_path = output_path.replace(".onnx", "_fp32.onnx")
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+    repo_id = f"sentence-transformers/{model_name}"
+    tokenizer = AutoTokenizer.from_pretrained(repo_id, cache_dir=cache_folder)
+    model = AutoModel.from_pretrained(repo_id, cache_dir=cache_folder)
+    model.eval()
+
+    sample = tokenizer(["export sample", "a second, longer export sample"], padding=True, return_tensors="pt")
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(
+            model, tuple(sample[name] for name in input_names), fp32_path,
+            input_names=input_names, output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes, opset_version=opset
+        )
+
+    quantize_dynamic(fp32_path, output_path, weight_type=QuantType.QInt8)
+    os.remove(fp32_path)
+    return output_path
+
+
+class OnnxMiniLMEmbeddings(Embeddings):
+    """LangChain Embeddings backed by an int8 ONNX graph of a sentence-transformers snapshot."""
+
+    def __init__(self, cache_folder="./embedding_cache", model_name="all-MiniLM-L6-v2",
+                 normalize_embeddings=None, batch_size=32, num_threads=None, export=True):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        snapshot = find_snapshot(cache_folder, model_name)
+        model_path = quantized_model_path(cache_folder, model_name)
+        if not os.path.exists(model_path):
+            if not export:
+                raise FileNotFoundError(f"No quantized model at {model_path}")
+            print(f"[+] Exporting int8 ONNX model to {model_path}")
+            export_quantized_model(cache_folder, model_name)
+
+        with open(os.path.join(snapshot, "sentence_bert_config.json")) as f:
+            max_seq_length = json.load(f).get("max_seq_length", 256)
+        with open(os.path.join(snapshot, "modules.json")) as f:
+            module_types = [module["type"] for module in json.load(f)]
+        if normalize_embeddings is None:
+            normalize_embeddings = any(t.endswith(".Normalize") for t in module_types)
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(snapshot, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_seq_length)
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id("[PAD]"), pad_token="[PAD]")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.model_name = f"{model_name}-onnx-int8"
+        self.encode_kwargs = {"normalize_embeddings": bool(normalize_embeddings)}
+        self.batch_size = batch_size
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feed = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": attention_mask,
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(None, {k: v for k, v in feed.items() if k in self.input_names})[0]
+
+        # Mean pooling over real tokens, as in the snapshot's 1_Pooling config
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.encode_kwargs["normalize_embeddings"]:
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled
+
+    def encode(self, texts):
+        """Return an (n, dim) float32 array, batching texts of similar length together"""
+        # Same preprocessing as HuggingFaceEmbeddings.embed_documents
+        texts = [t.replace("\n", " ") for t in texts]
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+        vectors = None
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            pooled = self._encode_batch([texts[i] for i in batch])
+            if vectors is None:
+                vectors = np.empty((len(texts), pooled.shape[1]), dtype=np.float32)
+            vectors[batch] = pooled
+        return vectors if vectors is not None else np.empty((0, 0), dtype=np.float32)
+
+    def embed_documents(self, texts):
+        return self.encode(list(texts)).tolist()
+
+    def embed_query(self, text):
+        return self.encode([text])[0].tolist()
@@ -2,17 +2,18 @@
 import os
 from langchain_community.vectorstores import Chroma
 from langchain_huggingface import HuggingFaceEmbeddings
+from embedding_daemon import daemon_or_local
 
 # Define persistent directory
 current_dir = os.path.dirname(os.path.abspath(__file__))
 persistent_directory = os.path.join(current_dir, "db", "chroma_db_with_metadata")
 
-# Define the embedding model
-embeddings = HuggingFaceEmbeddings(
+# Define the embedding model, from the embedding daemon if one is running
+embeddings = daemon_or_local(lambda: HuggingFaceEmbeddings(
     model_name="all-MiniLM-L6-v2",
     model_kwargs={'device': 'cpu'},
     encode_kwargs={'normalize_embeddings': True}
-)
+), "all-MiniLM-L6-v2", normalize_embeddings=True)
 
 # Load the existing vector store with embedding function
 db = Chroma(
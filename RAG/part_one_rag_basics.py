@@ -1,9 +1,11 @@
 #!/usr/bin/python3
-from langchain.text_splitter import CharacterTextSplitter
-from langchain_community.document_loaders import TextLoader
 from langchain_community.vectorstores import FAISS
 from sentence_transformers import SentenceTransformer
 from langchain.embeddings import HuggingFaceEmbeddings
+from vector_cache import CachedEmbeddings
+from streaming_splitter import StreamingCharacterTextSplitter, batched
+from chunk_dedup import Deduplicator
+from faiss_index import save_faiss
 import os
 
 #define the directory containing the file and the persistent directory
@@ -22,25 +24,41 @@ if not os.path.exists(persistent_directory):
             f"The file {file_path} does not exist. Please check the path."
         )
 
-    #read the text content of the file
-    loader=TextLoader(file_path)
-    documents=loader.load()
-
-    #now lets split the document into chunks
-    text_splitter=CharacterTextSplitter(chunk_size=1000, chunk_overlap=0)
-    docs=text_splitter.split_documents(documents)
-
-    #display information about the split documents
-    print("\n--- Document Chunks Information---")
-    print(f"Number of document chunks: {len(docs)}")
-    print(f"Sample chunk: \n {docs[0].page_content}\n")
+    #stream the file and split it into chunks without loading the whole book
+    text_splitter=StreamingCharacterTextSplitter(chunk_size=1000, chunk_overlap=0)
+    docs=text_splitter.split_file(file_path)
 
     #create embeddings i.e numerical representation of text
     print("===================================================")
     print("\n--- Creating Embeddings---")
-    embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-    db = FAISS.from_documents(docs, embeddings)
-    db.save_local(persistent_directory)
+    embeddings = CachedEmbeddings(HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2"))
+
+    #embed and index the chunks batch by batch
+    db = None
+    num_chunks = 0
+    num_dropped = 0
+    # One dedup state for the whole stream, so repeats across batches are caught too
+    dedup = Deduplicator()
+    for batch in batched(docs, 256):
+        # Drop exact and near-duplicate chunks before they are embedded
+        batch, stats = dedup.dedup(batch)
+        num_dropped += stats["exact"] + stats["near"]
+        if not batch:
+            continue
+        if db is None:
+            print(f"Sample chunk: \n {batch[0].page_content}\n")
+            db = FAISS.from_documents(batch, embeddings)
+        else:
+            db.add_documents(batch)
+        num_chunks += len(batch)
+
+    #display information about the split documents
+    print("\n--- Document Chunks Information---")
+    print(f"Number of document chunks: {num_chunks} ({num_dropped} duplicates dropped)")
+    if db is None:
+        # Nothing was embedded, so there is no index to save
+        raise SystemExit(f"[-] No chunks to index in {file_path}, vector store not created")
+    save_faiss(db, persistent_directory)
 
     print("[+] FAISS vector store created and saved.")
 
@@ -4,6 +4,7 @@ from langchain_community.document_loaders import TextLoader
 from langchain_community.vectorstores import Chroma
 from sentence_transformers import SentenceTransformer
 from langchain.embeddings import HuggingFaceEmbeddings
+from vector_cache import CachedEmbeddings
 import os
 
 #define the directory containing the file and the persistent directory
@@ -37,7 +38,7 @@ if not os.path.exists(persistent_directory):
     #create embeddings i.e numerical representation of text
     print("===================================================")
     print("\n--- Creating Embeddings---")
-    embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+    embeddings = CachedEmbeddings(HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2"))
     print("\n--- Finished creating embeddings ---")
     # Create the vector store and persist it automatically
     print("\n--- Creating vector store ---")
@@ -2,17 +2,18 @@
 import os
 from langchain_chroma import Chroma
 from langchain_huggingface import HuggingFaceEmbeddings
+from embedding_daemon import daemon_or_local
 
 # Define the persistent directory (must match the one used during vector creation)
 current_dir = os.path.dirname(os.path.abspath(__file__))
 persistent_directory = os.path.join(current_dir, "db", "chroma_db")
 
-# Load embeddings with proper settings
-embeddings = HuggingFaceEmbeddings(
+# Load embeddings with proper settings, from the embedding daemon if one is running
+embeddings = daemon_or_local(lambda: HuggingFaceEmbeddings(
     model_name="all-MiniLM-L6-v2",
     model_kwargs={'device': 'cpu'},
     encode_kwargs={'normalize_embeddings': False}  # Chroma handles normalization
-)
+), "all-MiniLM-L6-v2")
 
 # Load Chroma
 db = Chroma(
@@ -0,0 +1,109 @@
+#!/usr/bin/python3
+"""In-process LRU cache of query embeddings for the retrieval hot path.
+
+QueryCachedEmbeddings wraps any LangChain Embeddings and memoizes embed_query,
+so asking the same question again skips the model entirely. Keys are the
+model id plus the query with case and whitespace folded. MiniLM's tokenizer is
+uncased and splits on whitespace, so folding never changes the vector.
+
+The cache holds at most maxsize queries and counts hits and misses. Given a
+path, it is loaded from that file on start and written back (atomically) when
+the process exits. The file is plain JSON with float32 vectors in base64.
+"""
+import atexit
+import base64
+import json
+import os
+import threading
+from array import array
+from collections import OrderedDict
+
+from langchain_core.embeddings import Embeddings
+
+from vector_cache import canonical_model_name
+
+CACHE_VERSION = 1
+
+
+def normalize_query(text):
+    return " ".join(text.lower().split())
+
+
+class QueryCachedEmbeddings(Embeddings):
+    """LangChain Embeddings wrapper with an LRU cache in front of embed_query."""
+
+    def __init__(self, embeddings, maxsize=1024, path=None, model_id=None):
+        self.embeddings = embeddings
+        self.model_name = embeddings.model_name
+        self.encode_kwargs = getattr(embeddings, "encode_kwargs", {})
+        if model_id is None:
+            normalized = self.encode_kwargs.get("normalize_embeddings", False)
+            model_id = f"{canonical_model_name(self.model_name)}:{'norm' if normalized else 'raw'}"
+        self.model_id = model_id
+        self.maxsize = maxsize
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        if path:
+            self.load()
+            atexit.register(self.save)
+
+    def embed_query(self, text):
+        key = normalize_query(text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return list(vector)
+            self.misses += 1
+        vector = self.embeddings.embed_query(text)
+        with self._lock:
+            self._entries[key] = list(vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return list(vector)
+
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+    def load(self):
+        """Read cached queries for this model from path, if the file exists"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        if data.get("version") != CACHE_VERSION:
+            return
+        with self._lock:
+            # Oldest first, so the most recently used entries survive the size bound
+            for query, encoded in data.get("models", {}).get(self.model_id, []):
+                vector = array("f")
+                vector.frombytes(base64.b64decode(encoded))
+                self._entries[query] = vector.tolist()
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def save(self):
+        """Write this model's entries to path, keeping other models' entries in the file"""
+        if not self.path:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != CACHE_VERSION:
+                data = {}
+        except (FileNotFoundError, ValueError):
+            data = {}
+        with self._lock:
+            entries = [[query, base64.b64encode(array("f", vector).tobytes()).decode("ascii")]
+                       for query, vector in self._entries.items()]
+        data = {"version": CACHE_VERSION, "models": {**data.get("models", {}), self.model_id: entries}}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
@@ -1,17 +1,18 @@
 #!/usr/bin/python3
 import os
-from langchain_community.vectorstores import FAISS
 from langchain.embeddings import HuggingFaceEmbeddings
+from embedding_daemon import daemon_or_local
+from faiss_index import load_faiss
 
 # Define the persistent directory (must match the one used during vector creation)
 current_dir = os.path.dirname(os.path.abspath(__file__))
 persistent_directory = os.path.join(current_dir, "db", "faiss_db")  # Changed from chroma_db to faiss_db
 
-# Load the same embedding model
-embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+# Load the same embedding model, from the embedding daemon if one is running
+embeddings = daemon_or_local(lambda: HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2"), "all-MiniLM-L6-v2")
 
-# Load the existing FAISS vector store
-db = FAISS.load_local(persistent_directory, embeddings, allow_dangerous_deserialization=True)
+# Load the existing FAISS vector store, whatever its index type
+db = load_faiss(persistent_directory, embeddings)
 
 # Define your semantic query
 query = "Who had gone off to the Ethiopians?"
@@ -1,9 +1,10 @@
 #!/usr/bin/python3
-from langchain.text_splitter import CharacterTextSplitter
-from langchain_community.document_loaders import TextLoader
 import os
 from langchain_chroma import Chroma
 from langchain_huggingface import HuggingFaceEmbeddings
+from vector_cache import CachedEmbeddings
+from streaming_splitter import StreamingCharacterTextSplitter, batched
+from chunk_dedup import Deduplicator
 
 # Define the directory containing the text files and the persistent directory
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -27,49 +28,53 @@ if not os.path.exists(persist_directory):
     # List all text files in the directory
     books_files = [f for f in os.listdir(books_dir) if f.endswith(".txt")]
 
-    # Read the text content from each file and store it with metadata
-    documents = []
-
-    for book_file in books_files:
-        file_path = os.path.join(books_dir, book_file)
-        loader = TextLoader(file_path)
-        book_docs = loader.load()
-        for doc in book_docs:
-            # Add metadata to each document indicating its source
-            doc.metadata = {"source": book_file}
-            documents.append(doc)
-
-    # Split documents into chunks
-    text_splitter = CharacterTextSplitter(
+    # Split documents into chunks, streaming each book from disk
+    text_splitter = StreamingCharacterTextSplitter(
         chunk_size=1000,
         chunk_overlap=200,
         separator="\n"
     )
-    docs = text_splitter.split_documents(documents)
 
-    # Display information about the split documents
-    print("\n--- Document chunk information ---")
-    print(f"Number of document chunks: {len(docs)}")
-    if docs:
-        print(f"\nSample metadata: {docs[0].metadata}")
-        print(f"Sample content (first 100 chars): {docs[0].page_content[:100]}...")
+    def iter_docs():
+        for book_file in books_files:
+            file_path = os.path.join(books_dir, book_file)
+            # Add metadata to each chunk indicating its source
+            yield from text_splitter.split_file(file_path, metadata={"source": book_file})
 
     # Create embeddings
     print("\n=== Create Embeddings ===")
-    embeddings = HuggingFaceEmbeddings(
+    embeddings = CachedEmbeddings(HuggingFaceEmbeddings(
         model_name="all-MiniLM-L6-v2",
         model_kwargs={'device': 'cpu'},
         encode_kwargs={'normalize_embeddings': True}
-    )
+    ))
     print("--- Finished creating embeddings ---")
 
-    # Create and persist vector store
+    # Create and persist vector store, adding chunks batch by batch
     print("\n[+] Creating vector store ---")
-    db = Chroma.from_documents(
-        documents=docs,
-        embedding=embeddings,
+    db = Chroma(
+        embedding_function=embeddings,
         persist_directory=persist_directory
     )
+    num_chunks = 0
+    num_dropped = 0
+    # One dedup state for the whole stream, so repeats across batches are caught too
+    dedup = Deduplicator()
+    for batch in batched(iter_docs(), 256):
+        # Drop exact and near-duplicate chunks before they are embedded
+        batch, stats = dedup.dedup(batch)
+        num_dropped += stats["exact"] + stats["near"]
+        if not batch:
+            continue
+        if num_chunks == 0:
+            print(f"\nSample metadata: {batch[0].metadata}")
+            print(f"Sample content (first 100 chars): {batch[0].page_content[:100]}...")
+        db.add_documents(batch)
+        num_chunks += len(batch)
+
+    # Display information about the split documents
+    print("\n--- Document chunk information ---")
+    print(f"Number of document chunks: {num_chunks} ({num_dropped} duplicates dropped)")
     # No need for explicit persist() in newer versions - it's automatic
     print("Vector store created successfully. Persistence is automatic.")
 
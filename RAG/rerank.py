@@ -0,0 +1,111 @@
+#!/usr/bin/python3
+"""Cross-encoder reranking of retrieved chunks on CPU.
+
+Vector search scores the query and each chunk separately; a cross-encoder
+reads them together and ranks far better, but costs a model call per pair.
+RerankingRetriever therefore fetches N candidates from a cheap base retriever
+and has CrossEncoderReranker rescore them in batches before keeping the top k.
+A better top 3 lets the chains send fewer chunks to the LLM.
+
+Scores are kept in an LRU keyed by the normalized query and a hash of the
+chunk text, so a repeated question (or a chunk that comes back for a
+follow-up) is never scored twice. The reranker also tracks what a pair costs
+on this machine; given latency_budget_ms, N shrinks to what fits the budget
+(never below k).
+
+    retriever = RerankingRetriever(base_retriever=db.as_retriever(), reranker=CrossEncoderReranker(), k=3)
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict
+
+from query_cache import normalize_query
+
+DEFAULT_RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+class CrossEncoderReranker:
+    """Batched CPU cross-encoder with an LRU cache of (query, chunk) scores."""
+
+    def __init__(self, model_name=DEFAULT_RERANK_MODEL, cache_folder=None, batch_size=16,
+                 max_length=256, cache_size=4096):
+        from sentence_transformers import CrossEncoder
+
+        self.model = CrossEncoder(model_name, device="cpu", max_length=max_length, cache_folder=cache_folder)
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self.seconds_per_pair = None  # Moving average of measured model time
+        self._lock = threading.Lock()
+        self._scores = OrderedDict()
+
+    def score(self, query, texts):
+        """Relevance score of each text for query (higher is better)"""
+        query_key = normalize_query(query)
+        keys = [(query_key, hashlib.sha1(text.encode("utf-8")).hexdigest()) for text in texts]
+        scores = [None] * len(texts)
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in self._scores:
+                    self._scores.move_to_end(key)
+                    scores[i] = self._scores[key]
+        missing = [i for i, score in enumerate(scores) if score is None]
+        with self._lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+        if missing:
+            started = time.perf_counter()
+            predicted = self.model.predict([(query, texts[i]) for i in missing], batch_size=self.batch_size)
+            per_pair = (time.perf_counter() - started) / len(missing)
+            with self._lock:
+                self.seconds_per_pair = per_pair if self.seconds_per_pair is None else (
+                    0.8 * self.seconds_per_pair + 0.2 * per_pair)
+                for i, value in zip(missing, predicted):
+                    scores[i] = float(value)
+                    self._scores[keys[i]] = scores[i]
+                while len(self._scores) > self.cache_size:
+                    self._scores.popitem(last=False)
+        return scores
+
+    def candidates_for_budget(self, budget_ms, k, max_candidates):
+        """How many candidates can be scored within budget_ms, between k and max_candidates"""
+        if budget_ms is None or self.seconds_per_pair is None:
+            return max_candidates
+        return max(k, min(max_candidates, int(budget_ms / 1000 / self.seconds_per_pair)))
+
+
+class RerankingRetriever(BaseRetriever):
+    """Fetch candidates from base_retriever and keep the k the cross-encoder ranks highest."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    base_retriever: BaseRetriever
+    reranker: Any
+    k: int = 3
+    max_candidates: int = 20
+    latency_budget_ms: Optional[float] = None
+
+    def _fetch(self, query, n):
+        """Ask the base retriever for n documents, whichever way it takes its k"""
+        base = self.base_retriever
+        if hasattr(base, "search_kwargs"):
+            base = base.model_copy(update={"search_kwargs": {**base.search_kwargs, "k": n}})
+        elif "k" in type(base).model_fields:
+            base = base.model_copy(update={"k": n})
+        return base.invoke(query)
+
+    def _get_relevant_documents(self, query, *, run_manager):
+        n = self.reranker.candidates_for_budget(self.latency_budget_ms, self.k, self.max_candidates)
+        docs = self._fetch(query, n)
+        if len(docs) <= 1:
+            return docs
+        scores = self.reranker.score(query, [doc.page_content for doc in docs])
+        ranked = sorted(zip(scores, range(len(docs))), reverse=True)[:self.k]
+        return [docs[i] for _, i in ranked]
@@ -0,0 +1,113 @@
+#!/usr/bin/python3
+"""Bounded-memory text splitting for large book files.
+
+StreamingCharacterTextSplitter reads a file block by block and yields chunks
+as Documents, producing the same chunks as CharacterTextSplitter with the same
+chunk_size, chunk_overlap and separator. It never holds more than one read
+block plus one chunk of text, so memory does not grow with the size of the
+book. start_index is taken from the exact position of each piece in the file
+rather than searched for afterwards.
+"""
+import itertools
+from collections import deque
+
+from langchain_core.documents import Document
+
+
+def iter_file_blocks(file_path, block_size=1 << 20, encoding="utf-8"):
+    """Yield the text of a file in blocks of block_size characters"""
+    with open(file_path, "r", encoding=encoding) as f:
+        for block in iter(lambda: f.read(block_size), ""):
+            yield block
+
+
+def batched(iterable, size):
+    """Yield lists of up to size items from iterable"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class StreamingCharacterTextSplitter:
+    """Split text on a separator and merge the pieces into overlapping chunks."""
+
+    def __init__(self, chunk_size=1000, chunk_overlap=200, separator="\n\n", strip_whitespace=True):
+        if chunk_overlap > chunk_size:
+            raise ValueError(
+                f"Got a larger chunk overlap ({chunk_overlap}) than chunk size ({chunk_size})"
+            )
+        if not separator:
+            raise ValueError("A non-empty separator is required to split a stream")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separator = separator
+        self.strip_whitespace = strip_whitespace
+
+    def _iter_pieces(self, blocks):
+        """Yield (offset, piece) for every non-empty piece between separators"""
+        separator = self.separator
+        pending = ""
+        pending_offset = 0
+        for block in blocks:
+            # Only the unfinished piece at the end of the previous block is carried over
+            pending += block
+            parts = pending.split(separator)
+            offset = pending_offset
+            for part in parts[:-1]:
+                if part:
+                    yield offset, part
+                offset += len(part) + len(separator)
+            pending = parts[-1]
+            pending_offset = offset
+        if pending:
+            yield pending_offset, pending
+
+    def _make_chunk(self, pieces):
+        text = self.separator.join(piece for _, piece in pieces)
+        start = pieces[0][0]
+        if self.strip_whitespace:
+            text = text.strip()
+            if not text:
+                return None
+            # Pieces are not always adjacent in the file, so locate the first
+            # non-whitespace character piece by piece
+            for offset, piece in pieces:
+                stripped = piece.lstrip()
+                if stripped:
+                    start = offset + len(piece) - len(stripped)
+                    break
+        return (start, text) if text else None
+
+    def split_blocks(self, blocks):
+        """Yield (start_index, chunk_text) for text arriving as an iterable of blocks"""
+        sep_len = len(self.separator)
+        current = deque()
+        total = 0
+        for offset, piece in self._iter_pieces(blocks):
+            piece_len = len(piece)
+            if total + piece_len + (sep_len if current else 0) > self.chunk_size and current:
+                chunk = self._make_chunk(current)
+                if chunk is not None:
+                    yield chunk
+                # Keep at most chunk_overlap characters as the start of the next chunk
+                while total > self.chunk_overlap or (
+                    total + piece_len + (sep_len if current else 0) > self.chunk_size and total > 0
+                ):
+                    _, dropped = current.popleft()
+                    total -= len(dropped) + (sep_len if current else 0)
+            current.append((offset, piece))
+            total += piece_len + (sep_len if len(current) > 1 else 0)
+        if current:
+            chunk = self._make_chunk(current)
+            if chunk is not None:
+                yield chunk
+
+    def split_file(self, file_path, metadata=None, block_size=1 << 20, encoding="utf-8"):
+        """Lazily yield Documents for a text file, with start_index in characters"""
+        metadata = {"source": file_path} if metadata is None else metadata
+        blocks = iter_file_blocks(file_path, block_size=block_size, encoding=encoding)
+        for start, text in self.split_blocks(blocks):
+            yield Document(page_content=text, metadata={**metadata, "start_index": start})
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The RAG helpers are imported as top-level modules, as the scripts next to them do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
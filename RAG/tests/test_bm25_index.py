@@ -0,0 +1,38 @@
+import numpy as np
+
+import bm25_index
+from bm25_index import BM25Index, BM25Writer, write_bm25
+
+TEXTS = [
+    "Python, Django and MySQL backend development",
+    "Network administration, CCNA and cloud security",
+    "Penetration testing with Hashcat, Burp Suite and NMAP",
+    "",
+    "Data analysis in Python with Power BI and Excel",
+    "Django REST APIs, node.js and c++ tooling",
+]
+IDS = [f"chunk-{i}" for i in range(len(TEXTS))]
+
+
+def test_batched_writer_matches_a_single_batch(tmp_path, monkeypatch):
+    write_bm25(str(tmp_path / "whole"), IDS, TEXTS)
+    # Tiny spill blocks so the counting sort runs over several blocks
+    monkeypatch.setattr(bm25_index, "SPILL_BLOCK", 4)
+    writer = BM25Writer(str(tmp_path / "batched"))
+    for start in range(0, len(TEXTS), 2):
+        writer.add(IDS[start:start + 2], TEXTS[start:start + 2])
+    writer.close()
+
+    for name in ("ids.npy", "terms.npy", "term_starts.npy", "post_rows.npy"):
+        assert np.array_equal(np.load(tmp_path / "whole" / name), np.load(tmp_path / "batched" / name))
+    assert np.allclose(np.load(tmp_path / "whole" / "post_scores.npy"),
+                       np.load(tmp_path / "batched" / "post_scores.npy"))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["batched", "whole"]
+
+
+def test_search_finds_exact_skill_terms(tmp_path):
+    write_bm25(str(tmp_path), IDS, TEXTS)
+    index = BM25Index(str(tmp_path))
+    assert [doc_id for doc_id, _ in index.search("django", k=5)] == ["chunk-0", "chunk-5"]
+    assert index.search("c++ hashcat", k=5)[0][0] in ("chunk-2", "chunk-5")
+    assert index.search("fortran") == []
@@ -0,0 +1,69 @@
+from langchain_core.documents import Document
+
+from chunk_dedup import Deduplicator, add_aliases, chunk_key, dedup_documents
+from streaming_splitter import batched
+
+PARAGRAPH = ("Odysseus sat on the shore of the island and wept, looking out over the "
+             "barren sea, for the nymph Calypso kept him there against his will and "
+             "he longed to see the smoke rising from his own land again")
+
+
+def chunk(text, n):
+    return Document(page_content=text, metadata={"source": "odyssey.txt", "start_index": n})
+
+
+def filler(n):
+    return chunk(f"filler chunk number {n} with words unique to chunk {n} only", n)
+
+
+def test_duplicates_across_a_batch_boundary_are_dropped():
+    docs = [filler(n) for n in range(3)] + [chunk(PARAGRAPH, 3)]
+    docs += [chunk("  " + PARAGRAPH.upper(), 4)]  # exact after normalization, next batch
+    docs += [chunk(PARAGRAPH + ".", 5)]  # near duplicate, next batch
+    docs += [filler(n) for n in range(6, 8)] + [filler(0)]  # exact copy of the first batch
+
+    dedup = Deduplicator()
+    kept = []
+    for batch in batched(docs, 4):
+        batch, _ = dedup.dedup(batch)
+        kept.extend(batch)
+
+    assert [doc.metadata["start_index"] for doc in kept] == [0, 1, 2, 3, 6, 7]
+    assert dedup.stats == {"kept": 6, "exact": 2, "near": 1}
+
+
+def test_batch_stats_and_aliases_within_a_batch():
+    dedup = Deduplicator()
+    kept, stats = dedup.dedup([chunk(PARAGRAPH, 0), chunk(PARAGRAPH, 1)])
+    assert stats == {"kept": 1, "exact": 1, "near": 0}
+    assert kept[0].metadata["aliases"] == "odyssey.txt @1"
+
+    kept, stats = dedup.dedup([chunk(PARAGRAPH, 2), filler(3)])
+    assert [doc.metadata["start_index"] for doc in kept] == [3]
+    assert stats == {"kept": 1, "exact": 1, "near": 0}
+    assert dedup.late_aliases == {"odyssey.txt @0": ["odyssey.txt @2"]}
+
+
+def test_provenance_does_not_depend_on_batch_size():
+    docs = [chunk(PARAGRAPH, 0), filler(1), chunk(PARAGRAPH.upper(), 2), filler(3),
+            chunk(PARAGRAPH + ".", 4), filler(1)]
+
+    def provenance(batch_size):
+        dedup = Deduplicator()
+        kept = {}
+        for batch in batched([doc.model_copy(deep=True) for doc in docs], batch_size):
+            kept.update((chunk_key(doc), doc) for doc in dedup.dedup(batch)[0])
+        for key, aliases in dedup.late_aliases.items():
+            add_aliases(kept[key].metadata, aliases)
+        return {key: doc.metadata for key, doc in kept.items()}, dedup.stats
+
+    assert provenance(1) == provenance(2) == provenance(len(docs))
+    metadata, stats = provenance(1)
+    assert metadata["odyssey.txt @0"]["aliases"] == "odyssey.txt @2; odyssey.txt @4"
+    assert metadata["odyssey.txt @0"]["duplicate_count"] == 2
+    assert stats == {"kept": 3, "exact": 2, "near": 1}
+
+
+def test_dedup_documents_only_sees_its_own_list():
+    assert len(dedup_documents([chunk(PARAGRAPH, 0)])[0]) == 1
+    assert len(dedup_documents([chunk(PARAGRAPH, 1)])[0]) == 1
@@ -0,0 +1,54 @@
+import threading
+import time
+
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict
+
+from federated_retriever import FederatedRetriever
+
+
+class StaticRetriever(BaseRetriever):
+    texts: list
+
+    def _get_relevant_documents(self, query, *, run_manager):
+        return [Document(page_content=text) for text in self.texts]
+
+
+class HangingRetriever(BaseRetriever):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    release: threading.Event
+    calls: int = 0
+
+    def _get_relevant_documents(self, query, *, run_manager):
+        self.calls += 1
+        self.release.wait()
+        return [Document(page_content="late")]
+
+
+def test_a_hanging_store_does_not_starve_the_others():
+    release = threading.Event()
+    hanging = HangingRetriever(release=release)
+    retriever = FederatedRetriever(retrievers={
+        "hanging": hanging,
+        "books": StaticRetriever(texts=["Odysseus", "Penelope"]),
+        "cvs": StaticRetriever(texts=["Penelope", "Telemachus"]),
+    }, k=3, timeout=0.3)
+    try:
+        for attempt in range(5):
+            started = time.perf_counter()
+            docs = retriever.invoke("who waits in Ithaca?")
+            elapsed = time.perf_counter() - started
+            assert [doc.page_content for doc in docs] == ["Penelope", "Odysseus", "Telemachus"]
+            # Only the first query waits out the timeout; later ones skip the busy store
+            assert elapsed < (0.6 if attempt == 0 else 0.2)
+        assert hanging.calls == 1
+    finally:
+        release.set()
+
+    # Once the hung call returns, the store is queried again
+    time.sleep(0.05)
+    docs = retriever.invoke("who waits in Ithaca?")
+    assert "late" in [doc.page_content for doc in docs]
+    assert hanging.calls == 2
@@ -0,0 +1,54 @@
+import warnings
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+
+from bm25_index import BM25Index
+from faiss_index import load_faiss, save_faiss
+from hybrid_retriever import hybrid_search
+
+
+def unit(cosine, axis):
+    """Unit vector at the given cosine to the first axis, tilted towards axis"""
+    vector = np.zeros(4)
+    vector[0] = cosine
+    vector[axis] = np.sqrt(1 - cosine ** 2)
+    return vector.tolist()
+
+
+VECTORS = {
+    "Networking lab work with routers and switches": unit(0.9, 1),
+    "Password auditing with hashcat and john the ripper": unit(0.2, 2),
+    "Quarterly sales report for the retail team": unit(0.1, 3),
+    "security tools": unit(1.0, 1),
+    "security tools hashcat": unit(1.0, 1),
+}
+
+
+class FixedEmbeddings(Embeddings):
+    def embed_documents(self, texts):
+        return [VECTORS[text] for text in texts]
+
+    def embed_query(self, text):
+        return VECTORS[text]
+
+
+def test_fused_order_on_a_normalized_faiss_store(tmp_path):
+    texts = list(VECTORS)[:3]
+    store = FAISS.from_texts(texts, FixedEmbeddings(), metadatas=[{"source": f"{i}.pdf"} for i in range(3)])
+    save_faiss(store, str(tmp_path))
+    store = load_faiss(str(tmp_path), FixedEmbeddings())
+    bm25 = BM25Index(str(tmp_path / "bm25"))
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        # The low-cosine chunks used to get negative relevance and a LangChain warning
+        vector_only = hybrid_search(store, bm25, "security tools", k=3, alpha=1.0)
+        fused = hybrid_search(store, bm25, "security tools hashcat", k=3, alpha=0.5)
+
+    assert [doc.page_content for doc, _ in vector_only] == texts
+    assert all(0.0 <= score <= 1.0 for _, score in vector_only)
+    # The exact hashcat match outranks the closer chunk; the unrelated one stays last
+    assert [doc.page_content for doc, _ in fused] == [texts[1], texts[0], texts[2]]
+    assert all(0.0 <= score <= 1.0 for _, score in fused)
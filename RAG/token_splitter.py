@@ -0,0 +1,198 @@
+#!/usr/bin/python3
+"""Token-aware chunking sized to all-MiniLM-L6-v2's 256-token window.
+
+The character splitters (chunk_size=1000) can produce chunks longer than
+the model's max_seq_length, and the model silently drops everything past the
+window. MiniLMTokenSplitter counts tokens with the tokenizer.json of the local
+embedding_cache snapshot and cuts chunks of at most max_seq_length - 2 tokens
+(room for [CLS] and [SEP]). Every stored character is therefore part of the
+vector. Chunks end on word boundaries, and prefer line breaks near the end of
+the window.
+
+Each text is tokenized once, in batches through the Rust tokenizer. Chunk text
+is sliced from the original string using the token offsets.
+
+    python token_splitter.py    # report truncation under the current character splitters
+"""
+import argparse
+import json
+import os
+
+from langchain_core.documents import Document
+
+from onnx_embeddings import find_snapshot
+from streaming_splitter import iter_file_blocks
+
+DEFAULT_CACHE_FOLDER = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "CV RAG Project", "embedding_cache"
+)
+_SPECIAL_TOKENS = 2  # [CLS] and [SEP]
+
+
+def load_tokenizer(cache_folder=DEFAULT_CACHE_FOLDER, model_name="all-MiniLM-L6-v2"):
+    """Return (tokenizer, max_seq_length) for a snapshot, with padding and truncation off"""
+    from tokenizers import Tokenizer
+
+    snapshot = find_snapshot(cache_folder, model_name)
+    tokenizer = Tokenizer.from_file(os.path.join(snapshot, "tokenizer.json"))
+    # The snapshot's tokenizer.json pads and truncates to 128; we need the full length
+    tokenizer.no_padding()
+    tokenizer.no_truncation()
+    with open(os.path.join(snapshot, "sentence_bert_config.json")) as f:
+        max_seq_length = json.load(f).get("max_seq_length", 256)
+    return tokenizer, max_seq_length
+
+
+class MiniLMTokenSplitter:
+    """Split text into overlapping chunks measured in model tokens."""
+
+    def __init__(self, chunk_tokens=None, overlap_tokens=50, tokenizer=None,
+                 cache_folder=DEFAULT_CACHE_FOLDER, add_start_index=True):
+        if tokenizer is None:
+            tokenizer, max_seq_length = load_tokenizer(cache_folder)
+        else:
+            max_seq_length = 256
+        self.tokenizer = tokenizer
+        self.chunk_tokens = chunk_tokens or max_seq_length - _SPECIAL_TOKENS
+        if overlap_tokens >= self.chunk_tokens:
+            raise ValueError(
+                f"Got a larger chunk overlap ({overlap_tokens}) than chunk size ({self.chunk_tokens})"
+            )
+        self.overlap_tokens = overlap_tokens
+        self.add_start_index = add_start_index
+
+    def count_tokens(self, texts):
+        """Tokens each text costs the model, including [CLS] and [SEP]"""
+        encodings = self.tokenizer.encode_batch(list(texts), add_special_tokens=False)
+        return [len(e.ids) + _SPECIAL_TOKENS for e in encodings]
+
+    def _windows(self, text, encoding):
+        """Yield (start_index, chunk_text) for one tokenized text"""
+        offsets = encoding.offsets
+        word_ids = encoding.word_ids
+        n = len(offsets)
+        lookback = self.chunk_tokens // 8
+        start = 0
+        while start < n:
+            end = min(start + self.chunk_tokens, n)
+            if end < n:
+                # Prefer cutting after a line break close to the end of the window
+                for cut in range(end, max(start + 1, end - lookback), -1):
+                    if "\n" in text[offsets[cut - 1][1]:offsets[cut][0]]:
+                        end = cut
+                        break
+                else:
+                    # Otherwise never cut a word into word pieces
+                    cut = end
+                    while cut > start + 1 and word_ids[cut] == word_ids[cut - 1]:
+                        cut -= 1
+                    if cut > start + 1:
+                        end = cut
+            yield offsets[start][0], text[offsets[start][0]:offsets[end - 1][1]]
+            if end >= n:
+                return
+            next_start = max(end - self.overlap_tokens, start + 1)
+            while next_start < end and word_ids[next_start] == word_ids[next_start - 1]:
+                next_start += 1
+            start = next_start
+
+    def split_text(self, text):
+        return [chunk for _, chunk in self._windows(text, self.tokenizer.encode(text, add_special_tokens=False))]
+
+    def split_documents(self, documents):
+        documents = list(documents)
+        encodings = self.tokenizer.encode_batch([d.page_content for d in documents], add_special_tokens=False)
+        chunks = []
+        for doc, encoding in zip(documents, encodings):
+            for start, text in self._windows(doc.page_content, encoding):
+                metadata = dict(doc.metadata)
+                if self.add_start_index:
+                    metadata["start_index"] = start
+                chunks.append(Document(page_content=text, metadata=metadata))
+        return chunks
+
+    def split_file(self, file_path, metadata=None, block_size=1 << 20, encoding="utf-8"):
+        """Lazily yield Documents for a text file, tokenizing it block by block.
+
+        Blocks are cut at the last paragraph (or line) break so no word is split
+        between two tokenizer calls; only one block is held in memory at a time.
+        """
+        metadata = {"source": file_path} if metadata is None else metadata
+        pending = ""
+        pending_offset = 0
+        for block in iter_file_blocks(file_path, block_size=block_size, encoding=encoding):
+            pending += block
+            cut = pending.rfind("\n\n")
+            if cut < 0:
+                cut = pending.rfind("\n")
+            if cut < 0:
+                continue
+            segment, pending = pending[:cut], pending[cut:]
+            yield from self._segment_documents(segment, pending_offset, metadata)
+            pending_offset += len(segment)
+        if pending:
+            yield from self._segment_documents(pending, pending_offset, metadata)
+
+    def _segment_documents(self, segment, offset, metadata):
+        for start, text in self._windows(segment, self.tokenizer.encode(segment, add_special_tokens=False)):
+            yield Document(page_content=text, metadata={**metadata, "start_index": offset + start})
+
+
+def truncation_report(texts, tokenizer, max_seq_length=256):
+    """How much of each chunk falls past the model's window and is never embedded"""
+    encodings = tokenizer.encode_batch(list(texts), add_special_tokens=False)
+    window = max_seq_length - _SPECIAL_TOKENS
+    report = {"chunks": 0, "truncated_chunks": 0, "chars": 0, "truncated_chars": 0,
+              "tokens": 0, "truncated_tokens": 0}
+    for text, encoding in zip(texts, encodings):
+        report["chunks"] += 1
+        report["chars"] += len(text)
+        report["tokens"] += len(encoding.ids)
+        if len(encoding.ids) > window:
+            report["truncated_chunks"] += 1
+            report["truncated_tokens"] += len(encoding.ids) - window
+            report["truncated_chars"] += len(text) - encoding.offsets[window - 1][1]
+    return report
+
+
+def _print_report(label, report):
+    chunks, chars = report["chunks"] or 1, report["chars"] or 1
+    print(f"{label}: {report['chunks']} chunks, {report['truncated_chunks']} truncated "
+          f"({report['truncated_chunks'] / chunks:.0%}); {report['truncated_chars']} of "
+          f"{report['chars']} chars ({report['truncated_chars'] / chars:.1%}) never reach the model")
+
+
+def main():
+    from langchain_community.document_loaders import PyPDFLoader
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    from streaming_splitter import StreamingCharacterTextSplitter
+
+    parser = argparse.ArgumentParser(description="Report text lost to the MiniLM token window")
+    parser.add_argument("--overlap", type=int, default=50, help="token overlap for the token splitter")
+    args = parser.parse_args()
+
+    tokenizer, max_seq_length = load_tokenizer()
+    splitter = MiniLMTokenSplitter(chunk_tokens=max_seq_length - _SPECIAL_TOKENS,
+                                   overlap_tokens=args.overlap, tokenizer=tokenizer)
+
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    pdfs_dir = os.path.join(os.path.dirname(current_dir), "CV RAG Project", "cvs")
+    pages = [page for f in sorted(os.listdir(pdfs_dir)) if f.endswith(".pdf")
+             for page in PyPDFLoader(os.path.join(pdfs_dir, f)).load()]
+    char_chunks = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200).split_documents(pages)
+    _print_report("cvs, 1000/200 chars", truncation_report([d.page_content for d in char_chunks], tokenizer, max_seq_length))
+    token_chunks = splitter.split_documents(pages)
+    _print_report(f"cvs, {splitter.chunk_tokens}/{args.overlap} tokens",
+                  truncation_report([d.page_content for d in token_chunks], tokenizer, max_seq_length))
+
+    book_path = os.path.join(current_dir, "books", "odyssey.txt")
+    if os.path.exists(book_path):
+        char_chunks = StreamingCharacterTextSplitter(chunk_size=1000, chunk_overlap=0).split_file(book_path)
+        _print_report("odyssey, 1000/0 chars", truncation_report([d.page_content for d in char_chunks], tokenizer, max_seq_length))
+        token_chunks = list(splitter.split_file(book_path))
+        _print_report(f"odyssey, {splitter.chunk_tokens}/{args.overlap} tokens",
+                      truncation_report([d.page_content for d in token_chunks], tokenizer, max_seq_length))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/python3
+"""Persistent on-disk cache of chunk embeddings shared by all store builders.
+
+Vectors are stored in a SQLite file as float32 blobs, keyed by
+(model name, normalization flag, SHA-256 of the chunk text). Any builder that
+wraps its embeddings with CachedEmbeddings (LangChain) or
+CachedEmbeddingFunction (chromadb) reuses vectors computed by any other
+builder, so rebuilding a FAISS or Chroma store only embeds new text.
+
+The cache file defaults to RAG/db/embedding_vectors.sqlite and can be moved
+with the EMBEDDING_CACHE_PATH environment variable.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+
+from langchain_core.embeddings import Embeddings
+
+try:
+    from chromadb import EmbeddingFunction as _ChromaEmbeddingFunction
+except ImportError:  # chromadb is only needed for CachedEmbeddingFunction
+    _ChromaEmbeddingFunction = object
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "db", "embedding_vectors.sqlite"
+)
+_LOOKUP_BATCH = 500  # Keeps "IN (...)" below SQLite's host parameter limit
+
+
+def canonical_model_name(model_name):
+    """Treat "all-MiniLM-L6-v2" and "sentence-transformers/all-MiniLM-L6-v2" as one model"""
+    prefix = "sentence-transformers/"
+    return model_name[len(prefix):] if model_name.startswith(prefix) else model_name
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """SQLite table of float32 vectors, safe to share between threads."""
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("EMBEDDING_CACHE_PATH") or DEFAULT_CACHE_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " normalized INTEGER NOT NULL,"
+            " text_hash BLOB NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " PRIMARY KEY (model, normalized, text_hash)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, model, normalized, hashes):
+        """Return {text_hash: vector} for the hashes that are cached"""
+        found = {}
+        unique = list(set(hashes))
+        with self._lock:
+            for start in range(0, len(unique), _LOOKUP_BATCH):
+                batch = unique[start:start + _LOOKUP_BATCH]
+                rows = self._conn.execute(
+                    "SELECT text_hash, vector FROM embeddings WHERE model = ? AND normalized = ?"
+                    f" AND text_hash IN ({','.join('?' * len(batch))})",
+                    [model, int(normalized), *batch],
+                )
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+        return found
+
+    def put_many(self, model, normalized, items):
+        """Store (text_hash, vector) pairs"""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, normalized, text_hash, vector)"
+                " VALUES (?, ?, ?, ?)",
+                [(model, int(normalized), key, array("f", vector).tobytes()) for key, vector in items],
+            )
+            self._conn.commit()
+
+    def embed(self, model, normalized, texts, compute):
+        """Return vectors for texts, calling compute(missing_texts) only for cache misses"""
+        hashes = [text_hash(t) for t in texts]
+        found = self.get_many(model, normalized, hashes)
+
+        missing = {}
+        for key, text in zip(hashes, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        self.hits += sum(1 for key in hashes if key in found)
+        self.misses += len(missing)
+
+        if missing:
+            vectors = compute(list(missing.values()))
+            computed = list(zip(missing.keys(), (list(map(float, v)) for v in vectors)))
+            self.put_many(model, normalized, computed)
+            found.update(computed)
+        return [found[key] for key in hashes]
+
+
+class CachedEmbeddings(Embeddings):
+    """LangChain Embeddings wrapper that reads and writes the shared vector cache."""
+
+    def __init__(self, embeddings, model_name=None, normalize=None, cache=None):
+        self.embeddings = embeddings
+        self.model_name = canonical_model_name(model_name or embeddings.model_name)
+        if normalize is None:
+            normalize = getattr(embeddings, "encode_kwargs", {}).get("normalize_embeddings", False)
+        self.normalize = bool(normalize)
+        self.cache = cache or EmbeddingCache()
+
+    def embed_documents(self, texts):
+        return self.cache.embed(self.model_name, self.normalize, list(texts),
+                                self.embeddings.embed_documents)
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
+
+
+class CachedEmbeddingFunction(_ChromaEmbeddingFunction):
+    """chromadb embedding function wrapper that reads and writes the shared vector cache."""
+
+    def __init__(self, embedding_function, model_name, normalize=False, cache=None):
+        self.embedding_function = embedding_function
+        self.model_name = canonical_model_name(model_name)
+        self.normalize = bool(normalize)
+        self.cache = cache or EmbeddingCache()
+
+    def __call__(self, input):
+        return self.cache.embed(self.model_name, self.normalize, list(input),
+                                self.embedding_function)
@@ -1,9 +1,10 @@
 #!/usr/bin/python3
 import os
-from langchain.text_splitter import CharacterTextSplitter
-from langchain_community.document_loaders import TextLoader
 from langchain_community.vectorstores import Chroma
 from langchain_community.embeddings import HuggingFaceEmbeddings  # Changed from langchain_openai
+from vector_cache import CachedEmbeddings
+from streaming_splitter import StreamingCharacterTextSplitter, batched
+from chunk_dedup import Deduplicator
 
 # Define the directory containing the file and the persistent directory
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -20,38 +21,47 @@ if not os.path.exists(persistent_directory):
             f"The file {file_path} does not exist. Please check the path."
         )
 
-    # Read and split the document
-    loader = TextLoader(file_path)
-    documents = loader.load()
-    
-    text_splitter = CharacterTextSplitter(
+    # Stream and split the document without loading the whole book
+    text_splitter = StreamingCharacterTextSplitter(
         chunk_size=1000,
         chunk_overlap=200,  # Recommended to have some overlap
         separator="\n"
     )
-    docs = text_splitter.split_documents(documents)
-
-    # Display information
-    print("\n--- Document Chunks Information ---")
-    print(f"Number of document chunks: {len(docs)}")
-    print(f"Sample chunk: \n{docs[0].page_content[:200]}...\n")  # Show first 200 chars
+    docs = text_splitter.split_file(file_path)
 
     # Create embeddings
     print("===================================================")
     print("\n--- Creating Embeddings ---")
-    embeddings = HuggingFaceEmbeddings(
+    embeddings = CachedEmbeddings(HuggingFaceEmbeddings(
         model_name="all-MiniLM-L6-v2",
         model_kwargs={'device': 'cpu'},  # Specify device
         encode_kwargs={'normalize_embeddings': True}  # Helps with similarity
-    )
+    ))
     
-    # Create and persist the vector store
+    # Create the vector store and add the chunks batch by batch
     print("\n--- Creating vector store ---")
-    db = Chroma.from_documents(
-        documents=docs,
-        embedding=embeddings,
+    db = Chroma(
+        embedding_function=embeddings,
         persist_directory=persistent_directory
     )
+    num_chunks = 0
+    num_dropped = 0
+    # One dedup state for the whole stream, so repeats across batches are caught too
+    dedup = Deduplicator()
+    for batch in batched(docs, 256):
+        # Drop exact and near-duplicate chunks before they are embedded
+        batch, stats = dedup.dedup(batch)
+        num_dropped += stats["exact"] + stats["near"]
+        if not batch:
+            continue
+        if num_chunks == 0:
+            print(f"Sample chunk: \n{batch[0].page_content[:200]}...\n")  # Show first 200 chars
+        db.add_documents(batch)
+        num_chunks += len(batch)
+
+    # Display information
+    print("\n--- Document Chunks Information ---")
+    print(f"Number of document chunks: {num_chunks} ({num_dropped} duplicates dropped)")
     
     # Explicitly persist (good practice)
     db.persist()